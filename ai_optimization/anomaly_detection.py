@@ -21,8 +21,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import logging
 from collections import deque
+from bisect import bisect_left, insort
 import threading
 import time
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
 
 # ML and Statistics
 from sklearn.ensemble import IsolationForest
@@ -40,24 +43,101 @@ from statsmodels.stats.diagnostic import acorr_ljungbox
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
+class StreamingWindowStats:
+    """Fixed-size sliding window with O(1) mean/variance and O(log w) percentiles"""
+
+    def __init__(self, window_size: int = 100):
+        self.window_size = window_size
+        self.values = deque(maxlen=window_size)
+        self._sorted: List[float] = []
+
+        # Windowed Welford state
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._removals = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def push(self, value: float):
+        """Add a value, evicting the oldest one when the window is full"""
+        value = float(value)
+
+        if len(self.values) == self.window_size:
+            oldest = self.values[0]
+            self._remove(oldest)
+            del self._sorted[bisect_left(self._sorted, oldest)]
+
+        self.values.append(value)
+        insort(self._sorted, value)
+
+        n = len(self.values)
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value: float):
+        n = len(self.values)
+        if n <= 1:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+
+        old_mean = self._mean
+        self._mean = (n * old_mean - value) / (n - 1)
+        self._m2 -= (value - old_mean) * (value - self._mean)
+
+        # Recompute from the window periodically so rounding drift never accumulates
+        self._removals += 1
+        if self._removals >= self.window_size:
+            self._removals = 0
+            data = np.fromiter(self.values, dtype=float, count=n)[1:]
+            self._mean = float(np.mean(data))
+            self._m2 = float(np.sum((data - self._mean) ** 2))
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (same as np.std)"""
+        n = len(self.values)
+        if n == 0:
+            return 0.0
+        return float(np.sqrt(max(self._m2, 0.0) / n))
+
+    def percentile(self, q: float) -> float:
+        """Percentile with linear interpolation (same as np.percentile)"""
+        data = self._sorted
+        position = (len(data) - 1) * q / 100.0
+        lower = int(position)
+        upper = min(lower + 1, len(data) - 1)
+        return data[lower] + (data[upper] - data[lower]) * (position - lower)
+
 class StatisticalAnomalyDetector:
     """Statistical-based anomaly detection"""
 
     def __init__(self, window_size: int = 100, z_threshold: float = 3.0):
         self.window_size = window_size
         self.z_threshold = z_threshold
-        self.data_buffer = deque(maxlen=window_size)
+        self.window = StreamingWindowStats(window_size)
+        self.data_buffer = self.window.values
 
-    def detect_z_score_anomaly(self, value: float) -> Dict:
-        """Detect anomalies using Z-score"""
-        self.data_buffer.append(value)
+    def detect_z_score_anomaly(self, value: float, update: bool = True) -> Dict:
+        """Detect anomalies using Z-score
 
-        if len(self.data_buffer) < 10:
+        update=False evaluates against the current window without adding the value
+        (used when another detector already recorded this tick).
+        """
+        if update:
+            self.window.push(value)
+
+        if len(self.window) < 10:
             return {'is_anomaly': False, 'score': 0.0, 'method': 'z_score'}
 
-        data = np.array(self.data_buffer)
-        mean = np.mean(data)
-        std = np.std(data)
+        mean = self.window.mean
+        std = self.window.std
 
         if std == 0:
             return {'is_anomaly': False, 'score': 0.0, 'method': 'z_score'}
@@ -74,16 +154,16 @@ class StatisticalAnomalyDetector:
             'std': std
         }
 
-    def detect_iqr_anomaly(self, value: float) -> Dict:
+    def detect_iqr_anomaly(self, value: float, update: bool = True) -> Dict:
         """Detect anomalies using Interquartile Range"""
-        self.data_buffer.append(value)
+        if update:
+            self.window.push(value)
 
-        if len(self.data_buffer) < 10:
+        if len(self.window) < 10:
             return {'is_anomaly': False, 'score': 0.0, 'method': 'iqr'}
 
-        data = np.array(self.data_buffer)
-        q1 = np.percentile(data, 25)
-        q3 = np.percentile(data, 75)
+        q1 = self.window.percentile(25)
+        q3 = self.window.percentile(75)
         iqr = q3 - q1
 
         lower_bound = q1 - 1.5 * iqr
@@ -139,15 +219,93 @@ class StatisticalAnomalyDetector:
             'anomaly_value': data[anomaly_index] if anomaly_index >= 0 else None
         }
 
+class MLModelSet:
+    """Scaler and models fitted together in one training run (read-only once built)"""
+
+    def __init__(self, scaler: StandardScaler, models: Dict, version: int, n_samples: int):
+        self.scaler = scaler
+        self.models = models
+        self.version = version
+        self.n_samples = n_samples
+        self.trained_at = datetime.now()
+
+def fit_model_set(X: np.ndarray, version: int = 1) -> Optional[MLModelSet]:
+    """Fit the scaler and the three anomaly models (module-level so a worker process can run it)"""
+    if len(X) < 50:
+        return None
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train Isolation Forest
+    isolation_forest = IsolationForest(
+        contamination=0.1,
+        random_state=42
+    )
+    isolation_forest.fit(X_scaled)
+
+    # Train One-Class SVM
+    one_class_svm = OneClassSVM(
+        kernel='rbf',
+        gamma='scale',
+        nu=0.1
+    )
+    one_class_svm.fit(X_scaled)
+
+    # Train Elliptic Envelope
+    elliptic_envelope = EllipticEnvelope(
+        contamination=0.1,
+        random_state=42
+    )
+    elliptic_envelope.fit(X_scaled)
+
+    models = {
+        'isolation_forest': isolation_forest,
+        'one_class_svm': one_class_svm,
+        'elliptic_envelope': elliptic_envelope
+    }
+    return MLModelSet(scaler, models, version, len(X))
+
 class MLAnomalyDetector:
-    """Machine learning-based anomaly detection"""
+    """Machine learning-based anomaly detection
+
+    The fitted scaler and models live in one MLModelSet that is replaced as a
+    whole, so scoring always uses a consistent set even while a retrain swaps
+    in a new one.
+    """
+
+    MODEL_NAMES = ('isolation_forest', 'one_class_svm', 'elliptic_envelope')
 
     def __init__(self):
-        self.isolation_forest = None
-        self.one_class_svm = None
-        self.elliptic_envelope = None
-        self.scaler = StandardScaler()
-        self.is_trained = False
+        self.model_set: Optional[MLModelSet] = None
+        self._swap_lock = threading.Lock()
+
+    @property
+    def is_trained(self) -> bool:
+        return self.model_set is not None
+
+    @property
+    def version(self) -> int:
+        model_set = self.model_set
+        return model_set.version if model_set is not None else 0
+
+    @property
+    def scaler(self) -> Optional[StandardScaler]:
+        model_set = self.model_set
+        return model_set.scaler if model_set is not None else None
+
+    @property
+    def isolation_forest(self):
+        return self.models().get('isolation_forest')
+
+    @property
+    def one_class_svm(self):
+        return self.models().get('one_class_svm')
+
+    @property
+    def elliptic_envelope(self):
+        return self.models().get('elliptic_envelope')
 
     def prepare_features(self, df: pd.DataFrame) -> np.ndarray:
         """Prepare features for ML anomaly detection"""
@@ -175,70 +333,56 @@ class MLAnomalyDetector:
 
         return np.column_stack(features)
 
+    def install_models(self, model_set: MLModelSet) -> bool:
+        """Swap in a fitted model set (ignored if a newer version is already installed)"""
+        with self._swap_lock:
+            if self.model_set is not None and model_set.version <= self.model_set.version:
+                return False
+            self.model_set = model_set
+            return True
+
     def train_models(self, X: np.ndarray):
         """Train anomaly detection models"""
-        if len(X) < 50:
+        model_set = fit_model_set(X, self.version + 1)
+        if model_set is None:
             return False
-
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-
-        # Train Isolation Forest
-        self.isolation_forest = IsolationForest(
-            contamination=0.1,
-            random_state=42
-        )
-        self.isolation_forest.fit(X_scaled)
-
-        # Train One-Class SVM
-        self.one_class_svm = OneClassSVM(
-            kernel='rbf',
-            gamma='scale',
-            nu=0.1
-        )
-        self.one_class_svm.fit(X_scaled)
-
-        # Train Elliptic Envelope
-        self.elliptic_envelope = EllipticEnvelope(
-            contamination=0.1,
-            random_state=42
-        )
-        self.elliptic_envelope.fit(X_scaled)
-
-        self.is_trained = True
-        return True
+        return self.install_models(model_set)
+
+    def models(self) -> Dict:
+        """Trained models by name"""
+        model_set = self.model_set
+        if model_set is None:
+            return {name: None for name in self.MODEL_NAMES}
+        return dict(model_set.models)
+
+    @staticmethod
+    def score_model(model, X_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score samples once and derive the label from the score
+
+        All three estimators predict an outlier when score_samples - offset_ < 0,
+        so predict() does not need to be called separately.
+        """
+        scores = model.score_samples(X_scaled)
+        return scores, (scores - model.offset_) < 0
+
+    def score_batch(self, X: np.ndarray, model_names: Optional[List[str]] = None,
+                    model_set: Optional[MLModelSet] = None) -> Dict:
+        """Score a batch of feature rows with each model (one call per model)"""
+        model_set = model_set or self.model_set
+        X_scaled = model_set.scaler.transform(np.atleast_2d(X))
+        models = model_set.models
+        return {name: self.score_model(models[name], X_scaled) for name in (model_names or models)}
 
     def detect_anomaly(self, features: np.ndarray) -> Dict:
         """Detect anomalies using trained ML models"""
-        if not self.is_trained:
+        model_set = self.model_set
+        if model_set is None:
             return {'error': 'Models not trained'}
 
-        features_scaled = self.scaler.transform(features.reshape(1, -1))
-
-        results = {}
-
-        # Isolation Forest
-        if_prediction = self.isolation_forest.predict(features_scaled)[0]
-        if_score = self.isolation_forest.score_samples(features_scaled)[0]
-        results['isolation_forest'] = {
-            'is_anomaly': if_prediction == -1,
-            'score': if_score
-        }
-
-        # One-Class SVM
-        svm_prediction = self.one_class_svm.predict(features_scaled)[0]
-        svm_score = self.one_class_svm.score_samples(features_scaled)[0]
-        results['one_class_svm'] = {
-            'is_anomaly': svm_prediction == -1,
-            'score': svm_score
-        }
-
-        # Elliptic Envelope
-        ee_prediction = self.elliptic_envelope.predict(features_scaled)[0]
-        ee_score = self.elliptic_envelope.score_samples(features_scaled)[0]
-        results['elliptic_envelope'] = {
-            'is_anomaly': ee_prediction == -1,
-            'score': ee_score
+        results = {
+            name: {'is_anomaly': bool(is_anomaly[0]), 'score': scores[0]}
+            for name, (scores, is_anomaly) in self.score_batch(features.reshape(1, -1),
+                                                              model_set=model_set).items()
         }
 
         # Ensemble decision
@@ -253,9 +397,401 @@ class MLAnomalyDetector:
         return {
             'ensemble_decision': ensemble_decision,
             'anomaly_votes': anomaly_votes,
+            'model_version': model_set.version,
             'individual_results': results
         }
 
+class _RollingMean:
+    """Online rolling mean with the same arithmetic as pandas rolling(window).mean()"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = np.nan
+
+    def update(self, value: float) -> float:
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                if np.signbit(old):
+                    self.neg_ct -= 1
+
+        self.values.append(value)
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if np.signbit(value):
+                self.neg_ct += 1
+            if value == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = value
+
+        if self.nobs < self.window:
+            return np.nan
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+class _RollingStd:
+    """Online rolling std (ddof=1) with the same arithmetic as pandas rolling(window).std()"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = np.nan
+
+    def update(self, value: float) -> float:
+        # Welford with Kahan-compensated mean, removal before addition
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean_x - self.compensation_remove
+                    y = old - self.compensation_remove
+                    t = y - self.mean_x
+                    self.compensation_remove = t + self.mean_x - y
+                    self.mean_x -= t / self.nobs
+                    self.ssqdm_x -= (old - prev_mean) * (old - self.mean_x)
+                else:
+                    self.mean_x = 0.0
+                    self.ssqdm_x = 0.0
+
+        self.values.append(value)
+        if value == value:
+            self.nobs += 1
+            prev_mean = self.mean_x - self.compensation_add
+            y = value - self.compensation_add
+            t = y - self.mean_x
+            self.compensation_add = t + self.mean_x - y
+            self.mean_x += t / self.nobs
+            self.ssqdm_x += (value - prev_mean) * (value - self.mean_x)
+            if value == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = value
+            # A window of identical values has no spread; drop the rounding residue
+            if self.num_consecutive_same_value >= self.nobs:
+                self.mean_x = value
+                self.ssqdm_x = 0.0
+
+        if self.nobs < self.window or self.nobs <= 1:
+            return np.nan
+        if self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        variance = self.ssqdm_x / (self.nobs - 1)
+        return float(np.sqrt(variance)) if variance > 0 else 0.0
+
+class _SymbolFeatureState:
+    """Per-symbol rolling state for OnlineFeatureExtractor"""
+
+    def __init__(self):
+        self.previous: Optional[Tuple[float, float, float, float]] = None
+        self.returns_std = _RollingStd(20)
+        self.volume_mean = _RollingMean(20)
+
+class OnlineFeatureExtractor:
+    """Per-tick feature vectors identical to MLAnomalyDetector.prepare_features
+
+    Feeding a symbol's candles one by one yields, row for row, the same values
+    prepare_features computes on the DataFrame of those candles (training frame
+    and live stream must start from the same candle for the rolling windows).
+    """
+
+    def __init__(self, include_rsi: bool = False, include_macd: bool = False):
+        self.include_rsi = include_rsi
+        self.include_macd = include_macd
+        self._states: Dict[str, _SymbolFeatureState] = {}
+
+    @property
+    def n_features(self) -> int:
+        return 7 + int(self.include_rsi) + int(self.include_macd)
+
+    @staticmethod
+    def _pct_change(value: float, previous: float) -> float:
+        """pct_change().fillna(0) for one row"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.float64(value) / np.float64(previous) - 1
+        return 0.0 if np.isnan(change) else float(change)
+
+    def update(self, symbol: str, close: float, high: float, low: float, volume: float,
+               rsi: Optional[float] = None, macd: Optional[float] = None) -> np.ndarray:
+        """Add one candle for a symbol and return its feature vector"""
+        state = self._states.get(symbol)
+        if state is None:
+            state = _SymbolFeatureState()
+            self._states[symbol] = state
+
+        current = (float(close), float(high), float(low), float(volume))
+        if state.previous is None:
+            changes = [0.0, 0.0, 0.0, 0.0]
+        else:
+            changes = [self._pct_change(value, previous)
+                       for value, previous in zip(current, state.previous)]
+        state.previous = current
+
+        features = changes
+        if self.include_rsi:
+            features.append(50.0 if rsi is None or np.isnan(rsi) else float(rsi))
+        if self.include_macd:
+            features.append(0.0 if macd is None or np.isnan(macd) else float(macd))
+
+        returns = changes[0]
+        volatility = state.returns_std.update(returns)
+        volume_mean = state.volume_mean.update(current[3])
+        features.append(0.0 if np.isnan(volatility) else volatility)
+        features.append(abs(returns))
+        features.append(0.0 if np.isnan(volume_mean) else volume_mean)
+
+        return np.array(features, dtype=np.float64)
+
+    def reset(self, symbol: Optional[str] = None):
+        """Drop rolling state for one symbol (or all)"""
+        if symbol is None:
+            self._states.clear()
+        else:
+            self._states.pop(symbol, None)
+
+class MLScoringService:
+    """Micro-batched ML anomaly scoring across symbols
+
+    Feature vectors submitted during a tick are scored together on flush(). Models
+    run cheapest first; with a latency budget, a model whose recent cost would push
+    the tick over budget is skipped for that tick (the RBF SVM is normally the first
+    to go). The ensemble needs 2 votes, or every vote when fewer models ran.
+    """
+
+    def __init__(self, detector: MLAnomalyDetector, latency_budget_ms: Optional[float] = None,
+                 timing_window: int = 100):
+        self.detector = detector
+        self.latency_budget_ms = latency_budget_ms
+
+        self._pending: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self.model_timings = {name: deque(maxlen=timing_window) for name in detector.models()}
+        self.model_skips = {name: 0 for name in detector.models()}
+        self.tick_timings = deque(maxlen=timing_window)
+
+    def submit(self, symbol: str, features: np.ndarray):
+        """Queue a feature vector for the next flush (latest vector per symbol wins)"""
+        with self._lock:
+            self._pending[symbol] = np.asarray(features, dtype=float).ravel()
+
+    def _expected_ms(self, name: str) -> float:
+        timings = self.model_timings[name]
+        return float(np.mean(timings)) if timings else 0.0
+
+    def flush(self) -> Dict[str, Dict]:
+        """Score all queued vectors in one batch"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        # One model set for the whole batch, even if a retrain swaps in a new one meanwhile
+        model_set = self.detector.model_set
+        if not pending or model_set is None:
+            return {}
+
+        start = time.perf_counter()
+        symbols = list(pending)
+        X_scaled = model_set.scaler.transform(np.vstack([pending[symbol] for symbol in symbols]))
+
+        models = model_set.models
+        results = {}
+        for name in sorted(models, key=self._expected_ms):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if (self.latency_budget_ms is not None and results
+                    and elapsed_ms + self._expected_ms(name) > self.latency_budget_ms):
+                self.model_skips[name] += 1
+                continue
+
+            model_start = time.perf_counter()
+            results[name] = self.detector.score_model(models[name], X_scaled)
+            self.model_timings[name].append((time.perf_counter() - model_start) * 1000)
+
+        votes = np.sum([is_anomaly for _, is_anomaly in results.values()], axis=0)
+        required = min(2, len(results))
+
+        output = {}
+        for i, symbol in enumerate(symbols):
+            output[symbol] = {
+                'ensemble_decision': bool(votes[i] >= required),
+                'anomaly_votes': int(votes[i]),
+                'models_used': list(results),
+                'model_version': model_set.version,
+                'individual_results': {
+                    name: {'is_anomaly': bool(is_anomaly[i]), 'score': float(scores[i])}
+                    for name, (scores, is_anomaly) in results.items()
+                }
+            }
+
+        self.tick_timings.append((time.perf_counter() - start) * 1000)
+        return output
+
+    def get_timing_stats(self) -> Dict:
+        """Per-model and per-tick scoring latency (ms)"""
+        def summarize(timings):
+            if not timings:
+                return {'count': 0, 'avg_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+            return {
+                'count': len(timings),
+                'avg_ms': float(np.mean(timings)),
+                'max_ms': float(np.max(timings)),
+                'last_ms': float(timings[-1])
+            }
+
+        return {
+            'models': {name: dict(summarize(timings), skipped=self.model_skips[name])
+                       for name, timings in self.model_timings.items()},
+            'tick': summarize(self.tick_timings),
+            'latency_budget_ms': self.latency_budget_ms
+        }
+
+class BackgroundRetrainer:
+    """Periodic refit of the ML ensemble on a rolling feature window
+
+    Fitting runs in a single worker process, so the scoring thread only pays for
+    copying the window out. The fitted MLModelSet is installed with a single
+    reference swap when it arrives; until then the detector keeps scoring with
+    the previous version.
+    """
+
+    def __init__(self, detector: MLAnomalyDetector, window_size: int = 5000,
+                 retrain_interval: float = 3600.0, min_samples: int = 500):
+        self.detector = detector
+        self.retrain_interval = retrain_interval
+        self.min_samples = max(min_samples, 50)
+
+        self._window = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._future: Optional[Future] = None
+        self._next_version = detector.version + 1
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.logger = logging.getLogger('AnomalyDetector')
+        self.retrain_count = 0
+        self.failed_count = 0
+        self.last_duration = None
+        self.last_trained_at = None
+
+    def add_features(self, features: np.ndarray):
+        """Append feature rows (one vector or a 2-D block) to the rolling window"""
+        rows = np.atleast_2d(np.asarray(features, dtype=float))
+        with self._lock:
+            self._window.extend(rows)
+
+    def add_history(self, df: pd.DataFrame):
+        """Seed the window from historical candles"""
+        self.add_features(self.detector.prepare_features(df))
+
+    @property
+    def is_running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def retrain(self) -> bool:
+        """Start a fit on the current window (False if one is running or data is short)"""
+        with self._lock:
+            if self.is_running or len(self._window) < self.min_samples:
+                return False
+            X = np.array(self._window)
+            version = max(self._next_version, self.detector.version + 1)
+            self._next_version = version + 1
+
+            if self._executor is None:
+                # spawn: forking a process that runs monitoring threads can deadlock
+                self._executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+            started = time.time()
+            self._future = self._executor.submit(fit_model_set, X, version)
+
+        self._future.add_done_callback(lambda future: self._on_trained(future, started))
+        self.logger.info(f"Retraining ML models v{version} on {len(X)} samples")
+        return True
+
+    def _on_trained(self, future: Future, started: float):
+        """Install the fitted set (runs on the executor's callback thread)"""
+        try:
+            model_set = future.result()
+        except Exception as e:
+            self.failed_count += 1
+            self.logger.error(f"ML model retraining failed: {e}")
+            return
+
+        self.last_duration = time.time() - started
+        if model_set is not None and self.detector.install_models(model_set):
+            self.retrain_count += 1
+            self.last_trained_at = model_set.trained_at
+            self.logger.info(f"ML models v{model_set.version} installed "
+                             f"({model_set.n_samples} samples, {self.last_duration:.1f}s)")
+
+    def start(self):
+        """Retrain every retrain_interval seconds in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def retrain_loop():
+            while not self._stop_event.wait(self.retrain_interval):
+                try:
+                    self.retrain()
+                except Exception as e:
+                    self.logger.error(f"Retrain scheduling error: {e}")
+
+        self._thread = threading.Thread(target=retrain_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False):
+        """Stop scheduling and shut the worker process down"""
+        self._stop_event.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def get_status(self) -> Dict:
+        """Retraining state"""
+        with self._lock:
+            window_samples = len(self._window)
+        return {
+            'model_version': self.detector.version,
+            'running': self.is_running,
+            'window_samples': window_samples,
+            'retrain_count': self.retrain_count,
+            'failed_count': self.failed_count,
+            'last_duration_s': self.last_duration,
+            'last_trained_at': self.last_trained_at.isoformat() if self.last_trained_at else None
+        }
+
 class PriceAnomalyDetector:
     """Specialized price action anomaly detection"""
 
@@ -341,19 +877,26 @@ class VolumeAnomalyDetector:
     """Volume-based anomaly detection"""
 
     def __init__(self):
-        self.volume_buffer = deque(maxlen=100)
+        self.window = StreamingWindowStats(100)
+        self.volume_buffer = self.window.values
 
-    def detect_volume_spike(self, current_volume: float, threshold_multiplier: float = 3.0) -> Dict:
+    def _previous_average(self, current_volume: float) -> float:
+        """Average volume of the window excluding the current value"""
+        n = len(self.window)
+        return (self.window.mean * n - current_volume) / (n - 1)
+
+    def detect_volume_spike(self, current_volume: float, threshold_multiplier: float = 3.0,
+                            update: bool = True) -> Dict:
         """Detect volume spikes"""
-        self.volume_buffer.append(current_volume)
+        if update:
+            self.window.push(current_volume)
 
-        if len(self.volume_buffer) < 20:
+        if len(self.window) < 20:
             return {'is_anomaly': False, 'volume_ratio': 1.0}
 
-        recent_volumes = list(self.volume_buffer)[:-1]  # Exclude current volume
-        avg_volume = np.mean(recent_volumes)
+        avg_volume = self._previous_average(current_volume)
 
-        if avg_volume == 0:
+        if avg_volume <= 0:
             return {'is_anomaly': False, 'volume_ratio': 1.0}
 
         volume_ratio = current_volume / avg_volume
@@ -367,17 +910,18 @@ class VolumeAnomalyDetector:
             'current_volume': current_volume
         }
 
-    def detect_volume_drought(self, current_volume: float, threshold_ratio: float = 0.3) -> Dict:
+    def detect_volume_drought(self, current_volume: float, threshold_ratio: float = 0.3,
+                              update: bool = True) -> Dict:
         """Detect unusually low volume (volume drought)"""
-        self.volume_buffer.append(current_volume)
+        if update:
+            self.window.push(current_volume)
 
-        if len(self.volume_buffer) < 20:
+        if len(self.window) < 20:
             return {'is_anomaly': False, 'volume_ratio': 1.0}
 
-        recent_volumes = list(self.volume_buffer)[:-1]
-        avg_volume = np.mean(recent_volumes)
+        avg_volume = self._previous_average(current_volume)
 
-        if avg_volume == 0:
+        if avg_volume <= 0:
             return {'is_anomaly': False, 'volume_ratio': 1.0}
 
         volume_ratio = current_volume / avg_volume
@@ -391,6 +935,182 @@ class VolumeAnomalyDetector:
             'current_volume': current_volume
         }
 
+class _BatchWindow:
+    """Per-symbol ring buffers stored as one (symbols x window) array"""
+
+    def __init__(self, n_symbols: int, window_size: int):
+        self.window_size = window_size
+        self.data = np.full((n_symbols, window_size), np.nan)
+        self.position = np.zeros(n_symbols, dtype=np.int64)
+        self.count = np.zeros(n_symbols, dtype=np.int64)
+
+    def push(self, values: np.ndarray) -> np.ndarray:
+        """Append one value per symbol (NaN = no tick); returns the updated-row mask"""
+        updated = ~np.isnan(values)
+        rows = np.flatnonzero(updated)
+        self.data[rows, self.position[rows]] = values[rows]
+        self.position[rows] = (self.position[rows] + 1) % self.window_size
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.window_size)
+        return updated
+
+    def mean(self) -> np.ndarray:
+        total = np.nansum(self.data, axis=1)
+        return np.divide(total, self.count, out=np.zeros_like(total), where=self.count > 0)
+
+    def std(self, mean: np.ndarray) -> np.ndarray:
+        """Population standard deviation per symbol (same as np.std)"""
+        squared = np.nansum((self.data - mean[:, None]) ** 2, axis=1)
+        variance = np.divide(squared, self.count, out=np.zeros_like(squared), where=self.count > 0)
+        return np.sqrt(variance)
+
+    def percentiles(self, qs: Tuple[float, ...]) -> List[np.ndarray]:
+        """Linear-interpolated percentiles per symbol (same as np.percentile)"""
+        ordered = np.sort(self.data, axis=1)  # NaN (unfilled slots) sort last
+        last = np.maximum(self.count - 1, 0)
+
+        results = []
+        for q in qs:
+            position = last * q / 100.0
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, last)
+            low_values = np.take_along_axis(ordered, lower[:, None], axis=1)[:, 0]
+            high_values = np.take_along_axis(ordered, upper[:, None], axis=1)[:, 0]
+            results.append(low_values + (high_values - low_values) * (position - lower))
+        return results
+
+class BatchAnomalyDetector:
+    """Vectorized anomaly detection for many symbols per tick
+
+    Applies the z-score, IQR, volume spike/drought and price spike rules of the
+    single-symbol detectors to every symbol in one pass over (symbols x window) arrays.
+    """
+
+    ANOMALY_COLUMNS = ['symbol', 'type', 'severity', 'score']
+
+    def __init__(self, symbols: List[str], window_size: int = 100, z_threshold: float = 3.0,
+                 spike_multiplier: float = 3.0, drought_ratio: float = 0.3,
+                 wick_threshold: float = 0.05):
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.z_threshold = z_threshold
+        self.spike_multiplier = spike_multiplier
+        self.drought_ratio = drought_ratio
+        self.wick_threshold = wick_threshold
+
+        self.prices = _BatchWindow(len(symbols), window_size)
+        self.volumes = _BatchWindow(len(symbols), window_size)
+
+    def to_arrays(self, market_data: Dict[str, Dict]) -> Dict[str, np.ndarray]:
+        """Convert {symbol: market_data} into symbol-aligned arrays (NaN when missing)"""
+        arrays = {key: np.full(len(self.symbols), np.nan)
+                  for key in ('price', 'volume', 'Open', 'High', 'Low', 'Close')}
+        for symbol, data in market_data.items():
+            i = self.symbol_index.get(symbol)
+            if i is None:
+                continue
+            for key, values in arrays.items():
+                if key in data:
+                    values[i] = data[key]
+        return arrays
+
+    def _price_scores(self, prices: np.ndarray, updated: np.ndarray):
+        """Z-score and IQR scores for the current prices"""
+        window = self.prices
+        ready = updated & (window.count >= 10)
+
+        mean = window.mean()
+        std = window.std(mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = np.where(ready & (std > 0), np.abs((prices - mean) / std), 0.0)
+
+        q1, q3 = window.percentiles((25, 75))
+        iqr = q3 - q1
+        lower_bound = q1 - 1.5 * iqr
+        upper_bound = q3 + 1.5 * iqr
+        with np.errstate(divide='ignore', invalid='ignore'):
+            excess = np.where(prices < lower_bound, lower_bound - prices,
+                              np.where(prices > upper_bound, prices - upper_bound, 0.0))
+            iqr_scores = np.where(ready & (excess > 0), excess / iqr, 0.0)
+        iqr_anomaly = ready & ((prices < lower_bound) | (prices > upper_bound))
+
+        return z_scores, ready & (z_scores > self.z_threshold), iqr_scores, iqr_anomaly
+
+    def _volume_ratios(self, volumes: np.ndarray, updated: np.ndarray) -> np.ndarray:
+        """Current volume over the average of the previous window values"""
+        window = self.volumes
+        ready = updated & (window.count >= 20)
+
+        total = np.nansum(window.data, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average = (total - volumes) / (window.count - 1)
+            ratios = np.where(ready & (average > 0), volumes / average, np.nan)
+        return ratios
+
+    def _price_spikes(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                      close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Candle wick spikes (largest wick ratio as score)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            upper_wick = (high - np.maximum(open_, close)) / open_
+            lower_wick = (np.minimum(open_, close) - low) / open_
+            body_size = np.abs(close - open_) / open_
+
+        upper_spike = (upper_wick > self.wick_threshold) & (upper_wick > body_size * 2)
+        lower_spike = (lower_wick > self.wick_threshold) & (lower_wick > body_size * 2)
+        return upper_spike | lower_spike, np.fmax(upper_wick, lower_wick)
+
+    def detect(self, prices: np.ndarray, volumes: Optional[np.ndarray] = None,
+               ohlc: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None) -> pd.DataFrame:
+        """Score one tick for all symbols
+
+        Inputs are arrays aligned with `symbols` (NaN = no data this tick).
+        Returns one row per detected anomaly: symbol, type, severity, score.
+        """
+        prices = np.asarray(prices, dtype=float)
+        rows, types, severities, scores = [], [], [], []
+
+        def collect(mask, anomaly_type, values, high_mask):
+            index = np.flatnonzero(mask)
+            if len(index) == 0:
+                return
+            rows.append(index)
+            types.append(np.full(len(index), anomaly_type, dtype=object))
+            severities.append(np.where(high_mask[index], 'HIGH', 'MEDIUM').astype(object))
+            scores.append(values[index])
+
+        updated = self.prices.push(prices)
+        z_scores, z_anomaly, iqr_scores, iqr_anomaly = self._price_scores(prices, updated)
+        collect(z_anomaly, 'price_z_score', z_scores, z_scores > 4)
+        collect(iqr_anomaly, 'price_iqr', iqr_scores, iqr_scores > 3)
+
+        if volumes is not None:
+            volumes = np.asarray(volumes, dtype=float)
+            ratios = self._volume_ratios(volumes, self.volumes.push(volumes))
+            with np.errstate(invalid='ignore'):
+                collect(ratios > self.spike_multiplier, 'volume_spike', ratios, ratios > 5)
+                collect(ratios < self.drought_ratio, 'volume_drought', ratios,
+                        np.zeros(len(ratios), dtype=bool))
+
+        if ohlc is not None:
+            spikes, wick_scores = self._price_spikes(*(np.asarray(values, dtype=float) for values in ohlc))
+            collect(spikes, 'price_spike', wick_scores, np.ones(len(spikes), dtype=bool))
+
+        if not rows:
+            return pd.DataFrame(columns=self.ANOMALY_COLUMNS)
+
+        index = np.concatenate(rows)
+        return pd.DataFrame({
+            'symbol': self.symbols[index],
+            'type': np.concatenate(types),
+            'severity': np.concatenate(severities),
+            'score': np.concatenate(scores)
+        })
+
+    def detect_market_data(self, market_data: Dict[str, Dict]) -> pd.DataFrame:
+        """detect() for {symbol: market_data} dicts in the detect_anomalies format"""
+        arrays = self.to_arrays(market_data)
+        ohlc = (arrays['Open'], arrays['High'], arrays['Low'], arrays['Close'])
+        return self.detect(arrays['price'], arrays['volume'], ohlc)
+
 class RealTimeAnomalyDetector:
     """Main real-time anomaly detection system"""
 
@@ -403,6 +1123,7 @@ class RealTimeAnomalyDetector:
         self.logger = self._setup_logging()
         self.alert_buffer = deque(maxlen=100)
         self.is_monitoring = False
+        self.retrainer: Optional[BackgroundRetrainer] = None
 
     def _setup_logging(self) -> logging.Logger:
         """Setup logging configuration"""
@@ -437,6 +1158,22 @@ class RealTimeAnomalyDetector:
 
         return success
 
+    def start_background_retraining(self, historical_data: Optional[pd.DataFrame] = None,
+                                    window_size: int = 5000, retrain_interval: float = 3600.0) -> BackgroundRetrainer:
+        """Retrain the ML models periodically in a worker process on the latest features"""
+        if self.retrainer is None:
+            self.retrainer = BackgroundRetrainer(self.ml_detector, window_size, retrain_interval)
+            if historical_data is not None:
+                self.retrainer.add_history(historical_data)
+        self.retrainer.start()
+        return self.retrainer
+
+    def stop_background_retraining(self):
+        """Stop periodic retraining (the installed models stay in use)"""
+        if self.retrainer is not None:
+            self.retrainer.stop()
+            self.retrainer = None
+
     def detect_anomalies(self, market_data: Dict) -> Dict:
         """Comprehensive anomaly detection"""
         timestamp = datetime.now()
@@ -459,8 +1196,8 @@ class RealTimeAnomalyDetector:
                     'details': z_result
                 })
 
-            # IQR anomaly
-            iqr_result = self.statistical_detector.detect_iqr_anomaly(price)
+            # IQR anomaly (same tick, already recorded by the z-score detector)
+            iqr_result = self.statistical_detector.detect_iqr_anomaly(price, update=False)
             if iqr_result['is_anomaly']:
                 anomalies['anomalies_detected'].append({
                     'type': 'price_iqr',
@@ -493,8 +1230,8 @@ class RealTimeAnomalyDetector:
                     'details': spike_result
                 })
 
-            # Volume drought
-            drought_result = self.volume_detector.detect_volume_drought(volume)
+            # Volume drought (same tick, already recorded by the spike detector)
+            drought_result = self.volume_detector.detect_volume_drought(volume, update=False)
             if drought_result['is_anomaly']:
                 anomalies['anomalies_detected'].append({
                     'type': 'volume_drought',
@@ -502,6 +1239,10 @@ class RealTimeAnomalyDetector:
                     'details': drought_result
                 })
 
+        # Feed the retraining window
+        if self.retrainer is not None and 'features' in market_data:
+            self.retrainer.add_features(market_data['features'])
+
         # ML-based anomalies (if models are trained)
         if self.ml_detector.is_trained and 'features' in market_data:
             ml_result = self.ml_detector.detect_anomaly(market_data['features'])
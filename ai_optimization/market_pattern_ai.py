@@ -14,11 +14,15 @@ Features:
 import os
 import sys
 import json
+import hashlib
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import logging
+import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 
 # Deep Learning
@@ -35,23 +39,48 @@ from sklearn.metrics import classification_report, accuracy_score
 import talib
 import yfinance as yf
 
+from regime_labels import trend_labels
+
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 class MarketPatternDataset(Dataset):
-    """PyTorch dataset for market pattern data"""
+    """PyTorch dataset of sliding windows over one scaled feature matrix
+
+    Window k covers rows k .. k + sequence_length - 1 and carries labels[k]. The
+    windows are strided views of the shared (rows, features) tensor, so nothing
+    is copied until the DataLoader stacks a batch.
+    """
 
-    def __init__(self, sequences, labels, sequence_length=60):
-        self.sequences = torch.FloatTensor(sequences)
-        self.labels = torch.LongTensor(labels)
+    def __init__(self, data, labels, sequence_length=60, indices=None):
+        self.data = torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32))
+        self.windows = self.data.unfold(0, sequence_length, 1).transpose(1, 2)
+        self.labels = torch.from_numpy(np.asarray(labels, dtype=np.int64))
         self.sequence_length = sequence_length
+        self.indices = np.arange(len(self.labels)) if indices is None else np.asarray(indices)
 
     def __len__(self):
-        return len(self.sequences)
+        return len(self.indices)
 
     def __getitem__(self, idx):
-        return self.sequences[idx], self.labels[idx]
+        window = self.indices[idx]
+        return self.windows[window], self.labels[window]
+
+@dataclass
+class LSTMTrainingConfig:
+    """LSTM training settings (defaults sized for a CPU-only host)"""
+    epochs: int = 100
+    batch_size: int = 256
+    learning_rate: float = 0.001
+    lr_patience: int = 5                   # ReduceLROnPlateau patience (epochs)
+    patience: Optional[int] = 10           # early stopping on val loss (None = off)
+    min_delta: float = 1e-4                # minimum val loss improvement
+    num_threads: Optional[int] = None      # torch intra-op threads (None = torch default)
+    num_workers: int = 0                   # DataLoader worker processes
+    checkpoint_every: Optional[int] = 10   # epochs between checkpoints (None = end only)
+    checkpoint_path: Optional[str] = None  # default: models/lstm_training_checkpoint.pth
+    resume: bool = False
 
 class LSTMPatternModel(nn.Module):
     """LSTM model for pattern recognition"""
@@ -103,6 +132,89 @@ class LSTMPatternModel(nn.Module):
 
         return out
 
+class BatchedPatternModel(nn.Module):
+    """Inference wrapper scoring each window of a batch as its own 1-sample call
+
+    LSTMPatternModel's attention is not batch_first, so inside a batch it attends
+    across samples. predict_pattern always scored one window at a time (attention
+    over a single element); this wrapper keeps that per-window result for a whole
+    batch and only runs attention for the last time step the classifier reads.
+    Returns class probabilities.
+    """
+
+    def __init__(self, model: LSTMPatternModel):
+        super(BatchedPatternModel, self).__init__()
+        self.model = model
+
+    def forward(self, x):
+        lstm_out, _ = self.model.lstm(x)
+
+        # (1, batch, hidden): a length-1 attention sequence per window
+        last = lstm_out[:, -1, :].unsqueeze(0)
+        attn_out, _ = self.model.attention(last, last, last)
+        out = attn_out[0]
+
+        out = self.model.dropout(out)
+        out = self.model.fc1(out)
+        out = self.model.relu(out)
+        out = self.model.fc2(out)
+
+        return torch.softmax(out, dim=1)
+
+class PatternInferenceEngine:
+    """Batched pattern scoring from an exported model (TorchScript .pt or ONNX .onnx)
+
+    num_threads sets intra_op_num_threads on the ONNX session only. For TorchScript
+    it calls torch.set_num_threads, which is process-wide and also changes the
+    thread count of any other torch work in the process.
+    """
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None, timing_window: int = 100):
+        self.model_path = model_path
+        self.format = 'onnx' if model_path.endswith('.onnx') else 'torchscript'
+        self.batch_timings = deque(maxlen=timing_window)
+        self.batch_sizes = deque(maxlen=timing_window)
+
+        if self.format == 'onnx':
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+            self.input_name = self.session.get_inputs()[0].name
+        else:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.module = torch.jit.load(model_path)
+            self.module.eval()
+
+    def predict_proba(self, windows: np.ndarray) -> np.ndarray:
+        """Class probabilities for (batch, sequence_length, features) scaled windows"""
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        start = time.perf_counter()
+
+        if self.format == 'onnx':
+            probabilities = self.session.run(None, {self.input_name: windows})[0]
+        else:
+            with torch.inference_mode():
+                probabilities = self.module(torch.from_numpy(windows)).numpy()
+
+        self.batch_timings.append((time.perf_counter() - start) * 1000)
+        self.batch_sizes.append(len(windows))
+        return probabilities
+
+    def get_timing_stats(self) -> Dict:
+        """Per-batch inference latency (ms)"""
+        if not self.batch_timings:
+            return {'batches': 0, 'avg_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0, 'avg_batch_size': 0.0}
+        return {
+            'batches': len(self.batch_timings),
+            'avg_ms': float(np.mean(self.batch_timings)),
+            'max_ms': float(np.max(self.batch_timings)),
+            'last_ms': float(self.batch_timings[-1]),
+            'avg_batch_size': float(np.mean(self.batch_sizes))
+        }
+
 class MarketPatternAI:
     """Advanced market pattern analysis system"""
 
@@ -116,12 +228,18 @@ class MarketPatternAI:
         # Models
         self.lstm_model = None
         self.regime_classifier = None
+        self.training_history: List[Dict] = []
         self.scaler = MinMaxScaler()
         self.label_encoder = LabelEncoder()
 
         # Model parameters
         self.sequence_length = 60  # 60 periods for pattern recognition
         self.input_features = 15   # Number of technical indicators
+        self.feature_columns = [
+            'SMA_20', 'EMA_12', 'EMA_26', 'RSI', 'MACD', 'MACD_signal',
+            'Stoch_K', 'Stoch_D', 'BB_upper', 'BB_lower', 'ATR',
+            'OBV', 'Price_Change', 'Volume_Ratio', 'Volatility'
+        ]
 
         # Market regimes
         self.market_regimes = ['bullish', 'bearish', 'sideways']
@@ -203,33 +321,19 @@ class MarketPatternAI:
         # Calculate volatility
         df['Volatility'] = df['Close'].rolling(window=20).std()
 
-        labels = []
-        for i in range(len(df)):
-            price_trend = df['Price_vs_SMA'].iloc[i]
-            volatility = df['Volatility'].iloc[i]
-
-            if price_trend > 0.02:  # Strong uptrend
-                labels.append('bullish')
-            elif price_trend < -0.02:  # Strong downtrend
-                labels.append('bearish')
-            else:  # Sideways/consolidation
-                labels.append('sideways')
-
-        return pd.Series(labels, index=df.index)
+        return pd.Series(trend_labels(df['Price_vs_SMA'], threshold=0.02), index=df.index)
 
     def prepare_sequences(self, df: pd.DataFrame, labels: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare sequences for LSTM training"""
-        self.logger.info("Preparing sequences for training...")
+        """Prepare sequences for LSTM training
 
-        # Select features
-        feature_columns = [
-            'SMA_20', 'EMA_12', 'EMA_26', 'RSI', 'MACD', 'MACD_signal',
-            'Stoch_K', 'Stoch_D', 'BB_upper', 'BB_lower', 'ATR',
-            'OBV', 'Price_Change', 'Volume_Ratio', 'Volatility'
-        ]
+        Returns the scaled (rows, features) matrix and one label per window;
+        MarketPatternDataset cuts the windows from the matrix lazily instead of
+        materializing a (windows, sequence_length, features) array.
+        """
+        self.logger.info("Preparing sequences for training...")
 
         # Ensure all features exist
-        available_features = [col for col in feature_columns if col in df.columns]
+        available_features = [col for col in self.feature_columns if col in df.columns]
         self.logger.info(f"Using {len(available_features)} features: {available_features}")
 
         # Scale features
@@ -239,50 +343,129 @@ class MarketPatternAI:
         # Encode labels
         encoded_labels = self.label_encoder.fit_transform(labels)
 
-        # Create sequences
-        sequences = []
-        sequence_labels = []
-
-        for i in range(self.sequence_length, len(scaled_data)):
-            sequences.append(scaled_data[i-self.sequence_length:i])
-            sequence_labels.append(encoded_labels[i])
-
-        return np.array(sequences), np.array(sequence_labels)
-
-    def train_lstm_model(self, sequences: np.ndarray, labels: np.ndarray):
-        """Train LSTM pattern recognition model"""
+        # Window k = rows k .. k + sequence_length - 1, labelled with the row after it
+        scaled_data = scaled_data.astype(np.float32)
+        sequence_labels = encoded_labels[self.sequence_length:]
+
+        return scaled_data, sequence_labels
+
+    def _checkpoint_path(self, config: LSTMTrainingConfig) -> str:
+        return config.checkpoint_path or os.path.join(self.model_dir, 'lstm_training_checkpoint.pth')
+
+    def _save_checkpoint(self, path: str, state: Dict):
+        """Write a resumable training checkpoint (temp file + rename)"""
+        tmp_path = f"{path}.tmp"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _training_fingerprint(scaled_data: np.ndarray, labels: np.ndarray, sequence_length: int,
+                              config: LSTMTrainingConfig) -> str:
+        """Identify the training inputs a checkpoint belongs to (data, labels, optimizer settings)"""
+        digest = hashlib.sha1()
+        digest.update(repr((scaled_data.shape, len(labels), sequence_length, config.batch_size,
+                            config.learning_rate, config.lr_patience, config.min_delta)).encode())
+        digest.update(np.ascontiguousarray(scaled_data).tobytes())
+        digest.update(np.ascontiguousarray(labels).tobytes())
+        return digest.hexdigest()
+
+    def train_lstm_model(self, scaled_data: np.ndarray, labels: np.ndarray,
+                         config: Optional[LSTMTrainingConfig] = None) -> Dict:
+        """Train LSTM pattern recognition model (inputs from prepare_sequences)
+
+        Stops when validation loss has not improved for config.patience epochs and
+        keeps the best weights. Checkpoints are written every
+        config.checkpoint_every epochs and removed when the run completes; with
+        config.resume an interrupted run continues from the last checkpoint if it
+        was written for the same data, labels and optimizer settings.
+        """
+        config = config or LSTMTrainingConfig()
         self.logger.info("Training LSTM pattern recognition model...")
 
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            sequences, labels, test_size=0.2, random_state=42, stratify=labels
+        if config.num_threads:
+            torch.set_num_threads(config.num_threads)
+
+        # Split window indices (same split as splitting the windows themselves)
+        train_idx, test_idx = train_test_split(
+            np.arange(len(labels)), test_size=0.2, random_state=42, stratify=labels
         )
 
-        # Create datasets
-        train_dataset = MarketPatternDataset(X_train, y_train, self.sequence_length)
-        test_dataset = MarketPatternDataset(X_test, y_test, self.sequence_length)
+        # Create datasets (both share the scaled matrix)
+        train_dataset = MarketPatternDataset(scaled_data, labels, self.sequence_length, train_idx)
+        test_dataset = MarketPatternDataset(scaled_data, labels, self.sequence_length, test_idx)
 
-        train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-        test_loader = DataLoader(test_dataset, batch_size=32, shuffle=False)
+        loader_options = {'num_workers': config.num_workers,
+                          'persistent_workers': config.num_workers > 0}
+        train_loader = DataLoader(train_dataset, batch_size=config.batch_size, shuffle=True, **loader_options)
+        test_loader = DataLoader(test_dataset, batch_size=config.batch_size, shuffle=False, **loader_options)
 
         # Initialize model
-        self.lstm_model = LSTMPatternModel(
-            input_size=self.input_features,
-            hidden_size=128,
-            num_layers=2,
-            num_classes=len(self.market_regimes)
-        )
+        def new_training_run():
+            model = LSTMPatternModel(
+                input_size=self.input_features,
+                hidden_size=128,
+                num_layers=2,
+                num_classes=len(self.market_regimes)
+            )
+            optimizer = optim.Adam(model.parameters(), lr=config.learning_rate)
+            scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=config.lr_patience)
+            return model, optimizer, scheduler
 
         # Training setup
         criterion = nn.CrossEntropyLoss()
-        optimizer = optim.Adam(self.lstm_model.parameters(), lr=0.001)
-        scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=10)
+        self.lstm_model, optimizer, scheduler = new_training_run()
 
-        # Training loop
-        num_epochs = 100
+        # Training state (restored from the checkpoint when resuming)
+        start_epoch = 0
+        best_val_loss = float('inf')
         best_accuracy = 0.0
+        best_state = None
+        epochs_without_improvement = 0
+        history = []
+
+        checkpoint_path = self._checkpoint_path(config)
+        fingerprint = self._training_fingerprint(scaled_data, labels, self.sequence_length, config)
+        if config.resume and os.path.exists(checkpoint_path):
+            try:
+                checkpoint = torch.load(checkpoint_path)
+                if checkpoint.get('fingerprint') != fingerprint:
+                    raise ValueError("checkpoint was written for different training data or settings")
+                restored = (checkpoint['epoch'] + 1, checkpoint['best_val_loss'],
+                            checkpoint['best_accuracy'], checkpoint['best_state'],
+                            checkpoint['epochs_without_improvement'], checkpoint['history'])
+                self.lstm_model.load_state_dict(checkpoint['model_state'])
+                optimizer.load_state_dict(checkpoint['optimizer_state'])
+                scheduler.load_state_dict(checkpoint['scheduler_state'])
+                torch.set_rng_state(checkpoint['rng_state'])
+                (start_epoch, best_val_loss, best_accuracy, best_state,
+                 epochs_without_improvement, history) = restored
+                self.logger.info(f"Resuming LSTM training from epoch {start_epoch}")
+            except Exception as e:
+                self.logger.error(f"Error loading training checkpoint, starting over: {e}")
+                # Discard anything partially restored
+                self.lstm_model, optimizer, scheduler = new_training_run()
+
+        def checkpoint_state(epoch: int) -> Dict:
+            return {
+                'epoch': epoch,
+                'fingerprint': fingerprint,
+                'model_state': self.lstm_model.state_dict(),
+                'optimizer_state': optimizer.state_dict(),
+                'scheduler_state': scheduler.state_dict(),
+                'rng_state': torch.get_rng_state(),
+                'best_val_loss': best_val_loss,
+                'best_accuracy': best_accuracy,
+                'best_state': best_state,
+                'epochs_without_improvement': epochs_without_improvement,
+                'history': history
+            }
+
+        # Training loop
+        epoch = start_epoch - 1
+        stopped_early = False
+        for epoch in range(start_epoch, config.epochs):
+            epoch_start = time.perf_counter()
 
-        for epoch in range(num_epochs):
             # Training phase
             self.lstm_model.train()
             train_loss = 0.0
@@ -297,32 +480,82 @@ class MarketPatternAI:
 
             # Validation phase
             self.lstm_model.eval()
+            val_loss = 0.0
             correct = 0
             total = 0
 
-            with torch.no_grad():
+            with torch.inference_mode():
                 for batch_X, batch_y in test_loader:
                     outputs = self.lstm_model(batch_X)
-                    _, predicted = torch.max(outputs.data, 1)
+                    val_loss += criterion(outputs, batch_y).item() * batch_y.size(0)
+                    predicted = torch.argmax(outputs, dim=1)
                     total += batch_y.size(0)
                     correct += (predicted == batch_y).sum().item()
 
             accuracy = 100 * correct / total
             avg_train_loss = train_loss / len(train_loader)
+            avg_val_loss = val_loss / total
 
-            scheduler.step(avg_train_loss)
+            scheduler.step(avg_val_loss)
+
+            # Early stopping on validation loss (best weights kept in memory)
+            if avg_val_loss < best_val_loss - config.min_delta:
+                best_val_loss = avg_val_loss
+                best_accuracy = accuracy
+                best_state = {name: tensor.detach().clone()
+                              for name, tensor in self.lstm_model.state_dict().items()}
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+
+            epoch_seconds = time.perf_counter() - epoch_start
+            history.append({
+                'epoch': epoch,
+                'train_loss': avg_train_loss,
+                'val_loss': avg_val_loss,
+                'accuracy': accuracy,
+                'seconds': epoch_seconds
+            })
 
             if epoch % 10 == 0:
-                self.logger.info(f'Epoch {epoch}/{num_epochs}, '
+                self.logger.info(f'Epoch {epoch}/{config.epochs}, '
                                f'Loss: {avg_train_loss:.4f}, '
-                               f'Accuracy: {accuracy:.2f}%')
+                               f'Val loss: {avg_val_loss:.4f}, '
+                               f'Accuracy: {accuracy:.2f}%, '
+                               f'Time: {epoch_seconds:.1f}s')
 
-            # Save best model
-            if accuracy > best_accuracy:
-                best_accuracy = accuracy
-                self.save_model()
+            if config.patience and epochs_without_improvement >= config.patience:
+                self.logger.info(f"Early stopping at epoch {epoch} "
+                               f"(no val loss improvement for {config.patience} epochs)")
+                stopped_early = True
+                break
+
+            if config.checkpoint_every and (epoch + 1) % config.checkpoint_every == 0:
+                self._save_checkpoint(checkpoint_path, checkpoint_state(epoch))
+
+        # Run completed: the final weights are saved below, a later resume starts a new run
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        # Keep the best weights
+        if best_state is not None:
+            self.lstm_model.load_state_dict(best_state)
+        self.save_model()
 
-        self.logger.info(f"Training completed. Best accuracy: {best_accuracy:.2f}%")
+        epoch_times = [entry['seconds'] for entry in history]
+        self.training_history = history
+        self.logger.info(f"Training completed. Best val loss: {best_val_loss:.4f}, "
+                       f"accuracy: {best_accuracy:.2f}%")
+
+        return {
+            'epochs_run': len(history),
+            'stopped_early': stopped_early,
+            'best_val_loss': best_val_loss,
+            'best_accuracy': best_accuracy,
+            'avg_epoch_seconds': float(np.mean(epoch_times)) if epoch_times else 0.0,
+            'total_seconds': float(np.sum(epoch_times)),
+            'history': history
+        }
 
     def train_regime_classifier(self, df: pd.DataFrame, labels: pd.Series):
         """Train market regime classifier"""
@@ -383,22 +616,37 @@ class MarketPatternAI:
         for feature, imp in sorted_importance[:10]:
             self.logger.info(f"  {feature}: {imp:.3f}")
 
+    def _pattern_windows(self, recent_data: pd.DataFrame) -> Optional[np.ndarray]:
+        """Last sequence_length rows of pattern features (unscaled), None if too short"""
+        available_features = [col for col in self.feature_columns if col in recent_data.columns]
+        feature_data = recent_data[available_features].tail(self.sequence_length).values
+
+        if len(feature_data) < self.sequence_length:
+            return None
+        return feature_data
+
+    def _pattern_result(self, probabilities: np.ndarray) -> Dict:
+        """Prediction dict for one row of class probabilities"""
+        predicted_class = int(np.argmax(probabilities))
+        predicted_regime = self.label_encoder.inverse_transform([predicted_class])[0]
+
+        return {
+            'pattern': predicted_regime,
+            'confidence': float(probabilities[predicted_class]),
+            'probabilities': {
+                regime: float(prob) for regime, prob in
+                zip(self.market_regimes, probabilities)
+            }
+        }
+
     def predict_pattern(self, recent_data: pd.DataFrame) -> Dict:
         """Predict market pattern for recent data"""
         if self.lstm_model is None:
             return {'pattern': 'unknown', 'confidence': 0.0}
 
         # Prepare features
-        feature_columns = [
-            'SMA_20', 'EMA_12', 'EMA_26', 'RSI', 'MACD', 'MACD_signal',
-            'Stoch_K', 'Stoch_D', 'BB_upper', 'BB_lower', 'ATR',
-            'OBV', 'Price_Change', 'Volume_Ratio', 'Volatility'
-        ]
-
-        available_features = [col for col in feature_columns if col in recent_data.columns]
-        feature_data = recent_data[available_features].tail(self.sequence_length).values
-
-        if len(feature_data) < self.sequence_length:
+        feature_data = self._pattern_windows(recent_data)
+        if feature_data is None:
             return {'pattern': 'insufficient_data', 'confidence': 0.0}
 
         # Scale and predict
@@ -409,19 +657,101 @@ class MarketPatternAI:
         with torch.no_grad():
             output = self.lstm_model(sequence)
             probabilities = torch.softmax(output, dim=1)
-            predicted_class = torch.argmax(probabilities, dim=1).item()
-            confidence = probabilities[0][predicted_class].item()
 
-        predicted_regime = self.label_encoder.inverse_transform([predicted_class])[0]
+        return self._pattern_result(probabilities[0].numpy())
+
+    def predict_patterns(self, recent_data: Dict[str, pd.DataFrame],
+                         engine: Optional[PatternInferenceEngine] = None) -> Dict[str, Dict]:
+        """Predict patterns for many pairs in one batched forward pass
+
+        Uses the exported engine when given, otherwise the eager model through
+        BatchedPatternModel; each pair gets the same result predict_pattern gives.
+        """
+        if engine is None and self.lstm_model is None:
+            return {pair: {'pattern': 'unknown', 'confidence': 0.0} for pair in recent_data}
+
+        results = {}
+        pairs = []
+        windows = []
+        for pair, df in recent_data.items():
+            feature_data = self._pattern_windows(df)
+            if feature_data is None:
+                results[pair] = {'pattern': 'insufficient_data', 'confidence': 0.0}
+            else:
+                pairs.append(pair)
+                windows.append(feature_data)
+
+        if not pairs:
+            return results
+
+        # One scaler call for all windows
+        n_features = windows[0].shape[1]
+        scaled = self.scaler.transform(np.vstack(windows)).astype(np.float32)
+        batch = scaled.reshape(len(pairs), self.sequence_length, n_features)
+
+        if engine is not None:
+            probabilities = engine.predict_proba(batch)
+        else:
+            model = BatchedPatternModel(self.lstm_model).eval()
+            with torch.inference_mode():
+                probabilities = model(torch.from_numpy(batch)).numpy()
+
+        for pair, row in zip(pairs, probabilities):
+            results[pair] = self._pattern_result(row)
+        return results
+
+    def export_lstm_model(self, path: Optional[str] = None, fmt: str = 'torchscript',
+                          quantize: bool = False) -> Optional[str]:
+        """Export the LSTM for PatternInferenceEngine (optionally int8 dynamic quantization)
+
+        fmt='torchscript' traces BatchedPatternModel (quantized with
+        torch.quantization.quantize_dynamic); fmt='onnx' exports it with a dynamic
+        batch axis and quantizes the file with onnxruntime. The returned path always
+        ends in the suffix for fmt (.pt / .onnx), replacing any other extension.
+        """
+        if self.lstm_model is None:
+            self.logger.error("No LSTM model to export")
+            return None
 
-        return {
-            'pattern': predicted_regime,
-            'confidence': confidence,
-            'probabilities': {
-                regime: prob.item() for regime, prob in
-                zip(self.market_regimes, probabilities[0])
-            }
-        }
+        # PatternInferenceEngine picks the runtime from the suffix, so it must match fmt
+        suffix = '.onnx' if fmt == 'onnx' else '.pt'
+        if path is None:
+            name = 'lstm_pattern_model_int8' if quantize else 'lstm_pattern_model'
+            path = os.path.join(self.model_dir, name + suffix)
+        root, _ = os.path.splitext(path)
+        path = root + suffix
+
+        self.lstm_model.eval()
+        model = BatchedPatternModel(self.lstm_model).eval()
+        example = torch.zeros(1, self.sequence_length, self.input_features)
+
+        try:
+            if fmt == 'onnx':
+                export_path = root + '.fp32' + suffix if quantize else path
+                torch.onnx.export(
+                    model, example, export_path,
+                    input_names=['windows'], output_names=['probabilities'],
+                    dynamic_axes={'windows': {0: 'batch'}, 'probabilities': {0: 'batch'}}
+                )
+                if quantize:
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+                    quantize_dynamic(export_path, path, weight_type=QuantType.QInt8)
+                    os.remove(export_path)
+            else:
+                if quantize:
+                    model = torch.quantization.quantize_dynamic(
+                        model, {nn.LSTM, nn.Linear}, dtype=torch.qint8
+                    )
+                with torch.no_grad():
+                    traced = torch.jit.trace(model, example)
+                traced.save(path)
+
+            self.logger.info(f"LSTM model exported to {path}")
+            return path
+
+        except Exception as e:
+            self.logger.error(f"Error exporting LSTM model: {e}")
+            return None
 
     def analyze_current_market(self, symbol: str = "BTC-USD") -> Dict:
         """Comprehensive current market analysis"""
@@ -544,8 +874,8 @@ def main():
         labels = ai.create_market_regime_labels(df)
 
         # Train models
-        sequences, seq_labels = ai.prepare_sequences(df, labels)
-        ai.train_lstm_model(sequences, seq_labels)
+        scaled_data, seq_labels = ai.prepare_sequences(df, labels)
+        ai.train_lstm_model(scaled_data, seq_labels)
         ai.train_regime_classifier(df, labels)
 
     # Analyze current market
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Market Regime Labelling
+Phase 9: Vectorized regime labels for supervised training
+
+Shared by MarketPatternAI and MarketRegimeDetector:
+- Threshold masks over precomputed rolling inputs
+- First matching rule wins (np.select), default otherwise
+- Warm-up rows forced to the default label
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, List, Sequence, Tuple
+
+def select_labels(rules: Sequence[Tuple[np.ndarray, Any]], default: Any, warmup: int = 0) -> np.ndarray:
+    """Label per row from (mask, label) rules checked in order (object array)"""
+    masks = [np.asarray(mask, dtype=bool) for mask, _ in rules]
+    choices = np.empty(len(rules) + 1, dtype=object)
+    choices[:] = [label for _, label in rules] + [default]
+
+    # Select the rule index, then map to labels (np.select needs numeric choices)
+    rule_index = np.select(masks, np.arange(len(rules)), default=len(rules))
+    labels = choices[rule_index]
+    labels[:warmup] = default
+    return labels
+
+def momentum_and_volatility(close: pd.Series, window: int = 20) -> Tuple[pd.Series, pd.Series]:
+    """Momentum over window rows (close / close window rows ago - 1) and rolling std of returns"""
+    returns = close.pct_change().fillna(0)
+    momentum = close / close.shift(window) - 1
+    volatility = returns.rolling(window).std()
+    return momentum, volatility
+
+def trend_labels(price_vs_sma: pd.Series, threshold: float = 0.02) -> List[str]:
+    """bullish / bearish / sideways from the distance to a moving average"""
+    trend = price_vs_sma.to_numpy(dtype=np.float64)
+    return select_labels([
+        (trend > threshold, 'bullish'),    # Strong uptrend
+        (trend < -threshold, 'bearish')    # Strong downtrend
+    ], 'sideways').tolist()                # Sideways/consolidation
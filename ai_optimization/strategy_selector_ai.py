@@ -29,6 +29,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import scipy.stats as stats
 
+from regime_labels import momentum_and_volatility, select_labels
+
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
@@ -77,83 +79,70 @@ class MarketRegimeDetector:
         self.scaler = StandardScaler()
         self.is_trained = False
 
-    def extract_market_features(self, df: pd.DataFrame) -> np.ndarray:
-        """Extract features for market regime classification"""
+    def build_feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """Regime features for every row in one pass (row i uses data up to row i)"""
         features = []
 
         # Price momentum features
         returns = df['Close'].pct_change().fillna(0)
         for period in [5, 10, 20]:
             momentum = df['Close'].pct_change(period).fillna(0)
-            features.append(momentum.iloc[-1])
+            features.append(momentum)
 
         # Volatility features
         for period in [10, 20, 30]:
             volatility = returns.rolling(period).std().fillna(0)
-            features.append(volatility.iloc[-1])
+            features.append(volatility)
 
         # Trend strength
         sma_20 = df['Close'].rolling(20).mean()
         sma_50 = df['Close'].rolling(50).mean()
         trend_strength = ((sma_20 - sma_50) / sma_50).fillna(0)
-        features.append(trend_strength.iloc[-1])
+        features.append(trend_strength)
 
         # Volume analysis
         volume_sma = df['Volume'].rolling(20).mean()
         volume_ratio = (df['Volume'] / volume_sma).fillna(1)
-        features.append(volume_ratio.iloc[-1])
+        features.append(volume_ratio)
 
         # Price position relative to moving averages
         price_vs_sma20 = ((df['Close'] - sma_20) / sma_20).fillna(0)
         price_vs_sma50 = ((df['Close'] - sma_50) / sma_50).fillna(0)
-        features.extend([price_vs_sma20.iloc[-1], price_vs_sma50.iloc[-1]])
+        features.extend([price_vs_sma20, price_vs_sma50])
 
         # Support/Resistance analysis
         recent_high = df['High'].rolling(20).max()
         recent_low = df['Low'].rolling(20).min()
         price_range = (recent_high - recent_low) / df['Close']
-        features.append(price_range.fillna(0).iloc[-1])
+        features.append(price_range.fillna(0))
 
         # ADX-like trend strength
         high_low_range = (df['High'] - df['Low']).rolling(14).mean()
         trend_strength_adx = high_low_range / df['Close']
-        features.append(trend_strength_adx.fillna(0).iloc[-1])
+        features.append(trend_strength_adx.fillna(0))
 
-        return np.array(features)
+        return np.column_stack([feature.to_numpy(dtype=np.float64) for feature in features])
+
+    def extract_market_features(self, df: pd.DataFrame) -> np.ndarray:
+        """Extract features for market regime classification (latest row)"""
+        return self.build_feature_matrix(df)[-1]
 
     def create_regime_labels(self, df: pd.DataFrame) -> List[MarketRegime]:
         """Create regime labels for training data"""
-        labels = []
+        momentum, volatility = momentum_and_volatility(df['Close'], window=20)
+        momentum = momentum.to_numpy(dtype=np.float64)
+        recent_vol = volatility.to_numpy(dtype=np.float64)
 
-        returns = df['Close'].pct_change().fillna(0)
-        volatility = returns.rolling(20).std()
-
-        for i in range(len(df)):
-            if i < 50:  # Need sufficient history
-                labels.append(MarketRegime.RANGING)
-                continue
-
-            # Get recent data
-            recent_returns = returns.iloc[i-20:i]
-            recent_vol = volatility.iloc[i]
-            recent_momentum = df['Close'].iloc[i] / df['Close'].iloc[i-20] - 1
-
-            # Classify regime
-            if recent_vol > volatility.quantile(0.8):
-                if abs(recent_momentum) > 0.05:
-                    labels.append(MarketRegime.BREAKOUT)
-                else:
-                    labels.append(MarketRegime.HIGH_VOLATILITY)
-            elif recent_vol < volatility.quantile(0.2):
-                labels.append(MarketRegime.LOW_VOLATILITY)
-            elif recent_momentum > 0.03:
-                labels.append(MarketRegime.BULLISH_TRENDING)
-            elif recent_momentum < -0.03:
-                labels.append(MarketRegime.BEARISH_TRENDING)
-            else:
-                labels.append(MarketRegime.RANGING)
-
-        return labels
+        high_vol = recent_vol > volatility.quantile(0.8)
+
+        # Classify regime (first 50 rows lack history)
+        return select_labels([
+            (high_vol & (np.abs(momentum) > 0.05), MarketRegime.BREAKOUT),
+            (high_vol, MarketRegime.HIGH_VOLATILITY),
+            (recent_vol < volatility.quantile(0.2), MarketRegime.LOW_VOLATILITY),
+            (momentum > 0.03, MarketRegime.BULLISH_TRENDING),
+            (momentum < -0.03, MarketRegime.BEARISH_TRENDING)
+        ], MarketRegime.RANGING, warmup=50).tolist()
 
     def train_classifier(self, df: pd.DataFrame) -> float:
         """Train market regime classifier"""
@@ -161,18 +150,13 @@ class MarketRegimeDetector:
             return 0.0
 
         # Create features and labels
-        features_list = []
         labels = self.create_regime_labels(df)
 
-        for i in range(50, len(df)):  # Start from index 50 to have sufficient history
-            feature_subset = df.iloc[i-49:i+1]  # 50 periods of data
-            features = self.extract_market_features(feature_subset)
-            features_list.append(features)
-
-        if len(features_list) < 50:
+        # Start from index 50 to have sufficient history (50-period windows)
+        X = self.build_feature_matrix(df)[50:]
+        if len(X) < 50:
             return 0.0
 
-        X = np.array(features_list)
         y = [label.value for label in labels[50:]]  # Align with features
 
         # Scale features
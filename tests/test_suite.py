@@ -27,13 +27,14 @@ import numpy as np
 # Add project paths
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'user_data', 'strategies'))
 sys.path.append(os.path.join(project_root, 'user_data', 'strategies', 'modules'))
 sys.path.append(os.path.join(project_root, 'ai_optimization'))
 
 # Test framework
 import pytest
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 class TestResult:
     """Test result container"""
@@ -250,6 +251,876 @@ class ComponentTests(BaseTestSuite):
             # AI components are optional
             print(f"AI components not available: {e}")
 
+    def test_funding_rate_cache(self):
+        """Test funding rate cache serves repeated lookups from memory"""
+        try:
+            from funding_rate_manager import FundingRateManager
+        except ImportError as e:
+            print(f"Funding rate manager not available: {e}")
+            return
+
+        exchange = Mock()
+        exchange.fetch_funding_rate.return_value = {
+            'fundingRate': 0.0001,
+            'fundingTimestamp': int(time.time() * 1000),
+            'markPrice': 50000
+        }
+
+        manager = FundingRateManager(exchange)
+        for _ in range(5):
+            data = manager.get_current_funding_rate('BTC/USDT:USDT')
+            assert data.funding_rate == 0.0001
+
+        stats = manager.get_cache_stats()
+        assert exchange.fetch_funding_rate.call_count == 1
+        assert stats['hits'] == 4 and stats['misses'] == 1
+
+    def test_funding_cache_expiry_and_coalescing(self):
+        """Test funding cache entries expire at settlement and concurrent misses share one fetch"""
+        try:
+            from funding_rate_manager import FundingRateCache, FundingRateManager
+        except ImportError as e:
+            print(f"Funding rate manager not available: {e}")
+            return
+
+        import threading
+        exchange = Mock()
+        manager = FundingRateManager(exchange)
+
+        # Binance: fundingTimestamp is the upcoming settlement, not the last one
+        now = time.time()
+        settlement = now + 120
+        data = manager._build_funding_data('BTC/USDT:USDT', {
+            'fundingRate': 0.0001, 'fundingTimestamp': int(settlement * 1000), 'markPrice': 50000
+        })
+        cache = FundingRateCache(max_age=900, settle_grace=30)
+        assert abs(cache._expiry_for(data, now) - (settlement + 30)) < 1e-3
+
+        # Last settlement already past: the next one (+8h) is beyond max_age
+        past = manager._build_funding_data('BTC/USDT:USDT', {
+            'fundingRate': 0.0001, 'fundingTimestamp': int((now - 3600) * 1000), 'markPrice': 50000
+        })
+        assert cache._expiry_for(past, now) == now + 900
+
+        # Served until settlement, refetched right after
+        exchange.fetch_funding_rate.return_value = {
+            'fundingRate': 0.0001, 'fundingTimestamp': int((time.time() + 0.3) * 1000), 'markPrice': 50000
+        }
+        manager.funding_cache = FundingRateCache(max_age=900, settle_grace=0)
+        manager.get_current_funding_rate('BTC/USDT:USDT')
+        assert manager.funding_cache.get_cached('BTC/USDT:USDT') is not None
+        time.sleep(0.4)
+        assert manager.funding_cache.get_cached('BTC/USDT:USDT') is None
+        manager.get_current_funding_rate('BTC/USDT:USDT')
+        assert exchange.fetch_funding_rate.call_count == 2
+
+        # In-flight coalescing: one loader call for concurrent misses
+        cache = FundingRateCache()
+        release = threading.Event()
+        calls = []
+
+        def loader(pair):
+            calls.append(pair)
+            release.wait(5)
+            return data
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('BTC/USDT:USDT', loader)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 5
+        while cache.get_stats()['coalesced'] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        stats = cache.get_stats()
+        assert calls == ['BTC/USDT:USDT']
+        assert len(results) == 4 and all(result is data for result in results)
+        assert stats['misses'] == 1 and stats['coalesced'] == 3
+
+        # A failed representative fetch returns None to the waiters without retrying
+        failing = FundingRateCache()
+        release.clear()
+        calls.clear()
+
+        def failing_loader(pair):
+            calls.append(pair)
+            release.wait(5)
+            return None
+
+        results.clear()
+        threads = [threading.Thread(target=lambda: results.append(failing.get('ETH/USDT:USDT', failing_loader)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 5
+        while failing.get_stats()['coalesced'] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        assert calls == ['ETH/USDT:USDT'] and results == [None, None, None]
+
+    def test_funding_prefetch_bulk_and_rate_limited(self):
+        """Test multi-pair prefetch uses the bulk call when available and the shared bucket otherwise"""
+        try:
+            from funding_rate_manager import FundingRateManager
+            from rate_limiter import TokenBucket
+        except ImportError as e:
+            print(f"Funding rate manager not available: {e}")
+            return
+
+        import threading
+        pairs = [f"{base}/USDT:USDT" for base in ('BTC', 'ETH', 'SOL', 'XRP', 'ADA', 'DOGE')]
+
+        def funding_info(pair):
+            return {'symbol': pair, 'fundingRate': 0.0001, 'markPrice': 100,
+                    'fundingTimestamp': int((time.time() + 3600) * 1000)}
+
+        class CountingBucket(TokenBucket):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.acquired = 0
+                self.threads = set()
+
+            def acquire(self, tokens=1, timeout=None):
+                self.acquired += 1
+                self.threads.add(threading.get_ident())
+                return super().acquire(tokens, timeout)
+
+        # Bulk: one fetch_funding_rates call, cached pairs are not requested again
+        exchange = Mock()
+        exchange.has = {'fetchFundingRates': True}
+        exchange.fetch_funding_rates.side_effect = lambda symbols: {pair: funding_info(pair) for pair in symbols}
+        exchange.fetch_funding_rate.side_effect = funding_info
+        manager = FundingRateManager(exchange)
+        manager.rate_limiter = CountingBucket(rate=20, capacity=40)
+        manager.get_current_funding_rate(pairs[0])
+
+        results = manager.prefetch_funding_rates(pairs)
+        assert set(results) == set(pairs)
+        exchange.fetch_funding_rates.assert_called_once_with(pairs[1:])
+        assert manager.rate_limiter.acquired == 2
+        assert manager.funding_cache.get_cached(pairs[-1]) is results[pairs[-1]]
+
+        # No bulk endpoint: per-pair fetches in the pool, all through the manager's bucket
+        class SinglePairExchange:
+            has = {'fetchFundingRates': False}
+
+            def __init__(self):
+                self.requested = []
+
+            def fetch_funding_rate(self, pair):
+                self.requested.append(pair)
+                return funding_info(pair)
+
+        exchange = SinglePairExchange()
+        manager = FundingRateManager(exchange)
+        manager.rate_limiter = CountingBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        results = manager.prefetch_funding_rates(pairs)
+        elapsed = time.monotonic() - start
+
+        assert set(results) == set(pairs) and sorted(exchange.requested) == sorted(pairs)
+        assert manager.rate_limiter.acquired == len(pairs)
+        assert len(manager.rate_limiter.threads) > 1
+        assert elapsed >= (len(pairs) - 1) / 50 * 0.9   # one burst token, then 50/s
+
+        # TokenBucket: burst up to capacity, then waits for refill
+        bucket = TokenBucket(rate=20, capacity=2)
+        assert bucket.try_acquire() and bucket.try_acquire()
+        assert not bucket.try_acquire()
+        start = time.monotonic()
+        for _ in range(3):
+            assert bucket.acquire()
+        assert time.monotonic() - start >= 3 / 20 * 0.9
+        assert not bucket.acquire(tokens=2, timeout=0.01)
+
+    def test_funding_history_store(self):
+        """Test funding history as-of alignment and .bin append/reload round-trips"""
+        try:
+            from funding_history_store import FundingHistoryStore, FUNDING_INTERVAL_MS
+        except ImportError as e:
+            print(f"Funding history store not available: {e}")
+            return
+
+        pair = 'BTC/USDT:USDT'
+        t0 = int(pd.Timestamp('2024-01-01', tz='UTC').timestamp() * 1000)
+
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FundingHistoryStore(store_dir)
+            assert store.append(pair, [(t0 + FUNDING_INTERVAL_MS, 0.0002), (t0, 0.0001)]) == 2
+
+            # Exact funding timestamps match their own record, candles before the first record get the default
+            candles = np.array([t0 - 1, t0, t0 + FUNDING_INTERVAL_MS - 1, t0 + FUNDING_INTERVAL_MS])
+            rates = store.rates_asof(pair, candles, default=0.0)
+            assert np.array_equal(rates, [0.0, 0.0001, 0.0001, 0.0002])
+            assert np.isnan(store.rates_asof(pair, candles[:1])[0])
+
+            dates = pd.to_datetime(candles, unit='ms', utc=True)
+            assert np.array_equal(store.merge_asof(pair, dates, default=0.0), rates)
+
+            # Overlapping records are skipped, only newer ones are appended
+            t2 = t0 + 2 * FUNDING_INTERVAL_MS
+            assert store.append(pair, [(t0, 0.0001), (t2, -0.0003)]) == 1
+
+            # Reload from disk in a fresh store
+            reloaded = FundingHistoryStore(store_dir).load(pair)
+            assert np.array_equal(reloaded, store.load(pair))
+            assert reloaded['funding_time'].tolist() == [t0, t0 + FUNDING_INTERVAL_MS, t2]
+            assert reloaded['rate'].tolist() == [0.0001, 0.0002, -0.0003]
+
+    def test_ohlcv_cache_and_leverage_memo(self):
+        """Test OHLCV tail-only refresh, per-candle versions and the per-pair recommendation memo"""
+        try:
+            from ohlcv_cache import OHLCVCache
+            from advanced_leverage_manager import AdvancedLeverageManager
+        except ImportError as e:
+            print(f"OHLCV cache not available: {e}")
+            return
+
+        hour_ms = 3600 * 1000
+        clock = {'now': 1_700_000_000 // 3600 * 3600 + 600.0}   # 10 minutes into an hour
+
+        class FakeExchange:
+            """1h candles up to the currently open one; the open candle's close moves with time"""
+            def __init__(self):
+                self.calls = []
+
+            def fetch_ohlcv(self, pair, timeframe, since=None, limit=None):
+                self.calls.append((since, limit))
+                now_ms = int(clock['now'] * 1000)
+                current_open = now_ms - now_ms % hour_ms
+                opens = np.arange(current_open - 999 * hour_ms, current_open + 1, hour_ms)
+                if since is not None:
+                    opens = opens[opens >= since]
+                if limit is not None:
+                    opens = opens[-limit:]
+                return [[t, 100.0, 101.0, 99.0, 100.0 + (t / hour_ms) % 7 + (now_ms - t) / hour_ms, 10.0]
+                        for t in opens]
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.fromtimestamp(clock['now'], tz)
+
+        with patch('ohlcv_cache.time') as fake_time, patch('advanced_leverage_manager.datetime', FakeDatetime):
+            fake_time.time.side_effect = lambda: clock['now']
+
+            exchange = FakeExchange()
+            cache = OHLCVCache(exchange)
+            first = cache.get('BTC/USDT:USDT', '1h', 168)
+            assert len(first) == 168 and exchange.calls == [(None, 168)]
+            assert cache.version('BTC/USDT:USDT', '1h') == 1
+
+            # Same candle: served from memory, shorter requests included
+            clock['now'] += 1200
+            assert cache.get('BTC/USDT:USDT', '1h', 168) is not None
+            assert len(cache.get('BTC/USDT:USDT', '1h', 48)) == 48
+            assert len(exchange.calls) == 1 and cache.version('BTC/USDT:USDT', '1h') == 1
+
+            # New candle: only the tail since the last cached candle is fetched
+            clock['now'] += 3600
+            second = cache.get('BTC/USDT:USDT', '1h', 168)
+            assert exchange.calls[-1] == (int(first[-1, 0]), None)
+            assert cache.version('BTC/USDT:USDT', '1h') == 2
+            assert len(second) == 168 and second[-1, 0] == first[-1, 0] + hour_ms
+            assert np.array_equal(second[:-2], first[1:-1])
+            assert second[-2, 4] != first[-1, 4]   # last cached candle replaced by its final values
+            cache.get('BTC/USDT:USDT', '1h', 168)
+            assert len(exchange.calls) == 2 and cache.version('BTC/USDT:USDT', '1h') == 2
+
+            # Recommendation memo: reused per pair until the 1h candle closes
+            position_manager = Mock()
+            position_manager.get_position_info.return_value = Mock(leverage=5)
+            manager = AdvancedLeverageManager(position_manager, FakeExchange())
+            with patch.object(manager, '_compute_optimal_leverage',
+                              wraps=manager._compute_optimal_leverage) as compute:
+                recommendation = manager.calculate_optimal_leverage('BTC/USDT:USDT', portfolio_exposure=0.5)
+                assert manager.calculate_optimal_leverage('BTC/USDT:USDT', portfolio_exposure=0.5) is recommendation
+                assert compute.call_count == 1
+
+                # Another exposure replaces the pair's single entry
+                manager.calculate_optimal_leverage('BTC/USDT:USDT', portfolio_exposure=0.9)
+                assert compute.call_count == 2 and len(manager._recommendation_cache) == 1
+
+                clock['now'] += 1200   # still the same candle
+                manager.calculate_optimal_leverage('BTC/USDT:USDT', portfolio_exposure=0.9)
+                assert compute.call_count == 2
+
+                clock['now'] += 3600   # next 1h close passed
+                manager.calculate_optimal_leverage('BTC/USDT:USDT', portfolio_exposure=0.9)
+                assert compute.call_count == 3
+
+    def test_volatility_rolling_std_and_percentile(self):
+        """Test the O(n) rolling std kernel and the volatility percentile rank"""
+        try:
+            from advanced_leverage_manager import AdvancedLeverageManager, rolling_std
+        except ImportError as e:
+            print(f"Advanced leverage manager not available: {e}")
+            return
+
+        rng = np.random.default_rng(5)
+        returns = rng.normal(0, 0.01, 500)
+        prices = 50000 + np.cumsum(rng.normal(0, 50, 500))   # large offset vs. spread
+        for values, windows in ((returns, (2, 24, 30)), (prices, (24, 30))):
+            for window in windows:
+                expected = pd.Series(values).rolling(window).std().to_numpy()[window - 1:]
+                assert np.allclose(rolling_std(values, window), expected, rtol=1e-9, atol=1e-11)
+        assert len(rolling_std(returns[:10], 24)) == 0 and len(rolling_std(returns, 1)) == 0
+
+        # Percentile = share of same-length rolling vols at or below the current one
+        manager = AdvancedLeverageManager(Mock(), Mock())
+        history = np.sort(rolling_std(returns, 24) * np.sqrt(24))
+        with patch.object(manager, '_get_volatility_history', return_value=history) as get_history:
+            try:
+                from scipy.stats import percentileofscore
+            except ImportError:
+                percentileofscore = None
+
+            for current in (0.0, history[0], float(np.median(history)), history[-1], history[-1] * 2, 0.04):
+                percentile = manager._calculate_volatility_percentile('BTC/USDT:USDT', current, 24)
+                assert percentile == np.count_nonzero(history <= current) / len(history)
+                if percentileofscore is not None:
+                    assert np.isclose(percentile, percentileofscore(history, current, kind='weak') / 100)
+            get_history.assert_called_with('BTC/USDT:USDT', 24)
+
+            assert manager._calculate_volatility_percentile('BTC/USDT:USDT', float('nan'), 24) == 0.5
+            get_history.return_value = np.empty(0)
+            assert manager._calculate_volatility_percentile('BTC/USDT:USDT', 0.04, 24) == 0.5
+
+    def test_incremental_indicators(self):
+        """Test incremental indicator updates match a full recompute and TA-Lib"""
+        try:
+            from incremental_indicators import create_kernel
+        except ImportError as e:
+            print(f"Incremental indicators not available: {e}")
+            return
+
+        close = 100 + np.cumsum(np.random.normal(0, 1, 300))
+        inputs = {'open': close, 'high': close + 0.5, 'low': close - 0.5, 'close': close, 'volume': close}
+        head = {column: values[:250] for column, values in inputs.items()}
+        tail = {column: values[250:] for column, values in inputs.items()}
+
+        kernels = [('RSI', {'timeperiod': 14}), ('EMA', {'timeperiod': 12}), ('SMA', {'timeperiod': 20}),
+                   ('BBANDS', {'timeperiod': 20}), ('ATR', {'timeperiod': 14}), ('MACD', {})]
+        full_outputs = {}
+        for name, params in kernels:
+            full = create_kernel(name, params).init(inputs)
+            kernel = create_kernel(name, params)
+            kernel.init(head)
+            updated = kernel.update(tail)
+            for output, values in full.items():
+                assert np.array_equal(values[250:], updated[output]), f"{name} {output} mismatch"
+            full_outputs[name] = full
+
+        try:
+            import talib
+        except ImportError:
+            print("TA-Lib not available, skipping reference comparison")
+            return
+
+        high, low = inputs['high'], inputs['low']
+        upper, middle, lower = talib.BBANDS(close, timeperiod=20)
+        macd, macdsignal, macdhist = talib.MACD(close)
+        references = {
+            'RSI': {None: talib.RSI(close, timeperiod=14)},
+            'EMA': {None: talib.EMA(close, timeperiod=12)},
+            'SMA': {None: talib.SMA(close, timeperiod=20)},
+            'BBANDS': {'upperband': upper, 'middleband': middle, 'lowerband': lower},
+            'ATR': {None: talib.ATR(high, low, close, timeperiod=14)},
+            'MACD': {'macd': macd, 'macdsignal': macdsignal, 'macdhist': macdhist},
+        }
+        for name, expected in references.items():
+            for output, values in expected.items():
+                assert np.allclose(full_outputs[name][output], values, rtol=1e-9, atol=1e-9, equal_nan=True), \
+                    f"{name} {output} differs from TA-Lib"
+
+    def test_indicator_engine_cache_scope(self):
+        """Test the engine keeps results only for live (incremental) calls"""
+        try:
+            from indicator_engine import IndicatorEngine, indicator
+        except ImportError as e:
+            print(f"Indicator engine not available: {e}")
+            return
+
+        n = 200
+        close = 100 + np.cumsum(np.random.normal(0, 1, n))
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=n, freq='h', tz='UTC'),
+            'open': close, 'high': close + 0.5, 'low': close - 0.5, 'close': close,
+            'volume': np.full(n, 1000.0)
+        })
+        spec = {'bb_upper': indicator('BBANDS', 'upperband', timeperiod=20),
+                'bb_lower': indicator('BBANDS', 'lowerband', timeperiod=20),
+                'rsi': indicator('RSI', timeperiod=14)}
+
+        # Backtest/hyperopt: shared within the call, nothing retained
+        engine = IndicatorEngine()
+        backtest = engine.populate(df.copy(), 'BTC/USDT:USDT', spec, '1h')
+        assert engine.get_stats()['entries'] == 0
+        assert engine.full_recomputes == 2 and engine.hits == 1
+
+        # Live: a second strategy on the same candles reuses the cached arrays
+        engine.populate(df.copy(), 'BTC/USDT:USDT', spec, '1h', incremental=True)
+        live = engine.populate(df.copy(), 'BTC/USDT:USDT', spec, '1h', incremental=True)
+        assert engine.get_stats()['entries'] == 1
+        for column in spec:
+            assert np.allclose(live[column], backtest[column], equal_nan=True)
+
+    def test_indicator_cube_matches_engine(self):
+        """Test cube-served RSI/BBANDS columns against TA-Lib and the memmap round-trip"""
+        try:
+            from indicator_engine import IndicatorEngine, indicator
+            from indicator_cube import IndicatorCubeMixin, IndicatorCubeStore
+        except ImportError as e:
+            print(f"Indicator cube not available: {e}")
+            return
+
+        class Param:
+            def __init__(self, low, high, value):
+                self.range = range(low, high + 1)
+                self.value = value
+
+        class CubeStrategy(IndicatorCubeMixin):
+            timeframe = '1h'
+
+            def __init__(self, user_data_dir):
+                self.config = {'user_data_dir': user_data_dir}
+                self.dp = Mock()
+                self.dp.runmode.value = 'hyperopt'
+                self.rsi_period = Param(10, 20, 14)
+                self.bb_period = Param(15, 25, 20)
+                self.bb_deviation = Mock(value=2.0)
+
+            def spec(self):
+                bb_params = dict(timeperiod=self.bb_period.value,
+                                 nbdevup=self.bb_deviation.value, nbdevdn=self.bb_deviation.value)
+                return {'rsi': indicator('RSI', timeperiod=self.rsi_period.value),
+                        'bb_upper': indicator('BBANDS', 'upperband', **bb_params),
+                        'bb_middle': indicator('BBANDS', 'middleband', **bb_params),
+                        'bb_lower': indicator('BBANDS', 'lowerband', **bb_params),
+                        'ema_9': indicator('EMA', timeperiod=9)}
+
+        n = 400
+        close = 50000 + np.cumsum(np.random.normal(0, 50, n))
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=n, freq='h', tz='UTC'),
+            'open': close, 'high': close + 25, 'low': close - 25, 'close': close,
+            'volume': np.random.uniform(100, 1000, n)
+        })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            strategy = CubeStrategy(tmp)
+            for rsi_period, bb_period, deviation in [(14, 20, 2.0), (10, 15, 1.8), (20, 25, 2.5), (17, 22, 2.3)]:
+                strategy.rsi_period.value = rsi_period
+                strategy.bb_period.value = bb_period
+                strategy.bb_deviation.value = deviation
+
+                applied = []
+                apply_cube = strategy._apply_indicator_cube
+                with patch.object(strategy, '_apply_indicator_cube',
+                                  side_effect=lambda *a: applied.append(apply_cube(*a)) or applied[-1]):
+                    served = strategy._populate_with_cube(IndicatorEngine(), df.copy(), 'BTC/USDT:USDT',
+                                                          strategy.spec())
+                assert applied == [True]
+                reference = IndicatorEngine().populate(df.copy(), 'BTC/USDT:USDT', strategy.spec(), '1h')
+                for column in CubeStrategy.CUBE_COLUMNS + ('ema_9',):
+                    assert np.allclose(served[column], reference[column], rtol=1e-9, equal_nan=True), \
+                        (rsi_period, bb_period, deviation, column)
+                assert np.array_equal(np.isnan(served['rsi']), np.isnan(reference['rsi']))
+
+            # A fresh store (hyperopt worker) maps the file written above without recomputing
+            store = IndicatorCubeStore(os.path.join(tmp, 'hyperopt_results', 'indicator_cube'))
+            with patch.object(IndicatorCubeStore, '_compute', side_effect=AssertionError):
+                cube = store.load('BTC/USDT:USDT', '1h', range(10, 21), range(15, 26))
+                assert cube is not None and isinstance(cube.values, np.memmap)
+                assert store.build(df, 'BTC/USDT:USDT', '1h', range(10, 21), range(15, 26)) is cube
+
+            # Epoch dataframe with the startup candles trimmed selects the matching rows
+            trimmed = df.iloc[100:].reset_index(drop=True)
+            upper, middle, lower = cube.bbands(20, 2.0, trimmed)
+            reference = IndicatorEngine().populate(trimmed.copy(), 'BTC/USDT:USDT', {
+                'rsi': indicator('RSI', timeperiod=14),
+                'bb_upper': indicator('BBANDS', 'upperband', timeperiod=20, nbdevup=2.0, nbdevdn=2.0)
+            }, '1h')
+            full = IndicatorEngine().populate(df.copy(), 'BTC/USDT:USDT', {
+                'rsi': indicator('RSI', timeperiod=14)
+            }, '1h')
+            assert np.allclose(cube.rsi(14, trimmed), full['rsi'].iloc[100:].values)
+            assert np.allclose(upper.iloc[19:], reference['bb_upper'].iloc[19:], rtol=1e-9)
+            assert list(upper.index) == list(trimmed.index)
+
+            # Different candles are not served from the stale file
+            changed = df.copy()
+            changed.loc[n - 1, 'close'] += 1.0
+            rebuilt = IndicatorCubeStore(store.cache_dir).build(changed, 'BTC/USDT:USDT', '1h',
+                                                                range(10, 21), range(15, 26))
+            assert rebuilt.values[0, -1] == changed['close'].iloc[-1]
+
+    def test_risk_feed_reprices_and_alerts(self):
+        """Test feed events reprice live positions and raise alerts from the new state"""
+        try:
+            from risk_monitor import RiskMonitor, RiskMetric, AlertLevel
+            from risk_event_feed import LocalRiskEventFeed
+            from position_manager import PositionInfo
+        except ImportError as e:
+            print(f"Risk monitor streaming not available: {e}")
+            return
+
+        monitor = RiskMonitor(Mock())
+        monitor.auto_actions['reduce_position_on_critical'] = False
+        monitor.auto_actions['close_position_on_emergency'] = False
+
+        # 10x long, margin ratio = maintenance margin / (initial margin + unrealized pnl)
+        monitor._live_positions = {('BTCUSDT', 'LONG'): PositionInfo(
+            symbol='BTCUSDT', side='LONG', size=1.0, entry_price=50000.0, mark_price=50000.0,
+            liquidation_price=40000.0, unrealized_pnl=0.0, percentage=0.0, margin_ratio=0.4,
+            maintenance_margin=2000.0, initial_margin=5000.0, leverage=10,
+            margin_mode='isolated', risk_level='LOW'
+        )}
+
+        feed = LocalRiskEventFeed()
+        feed.subscribe(monitor._on_feed_event)
+
+        # Mark price event: pnl and margin ratio follow the new price
+        feed.push_mark_price('BTCUSDT', 47500.0)
+        position = monitor._live_positions[('BTCUSDT', 'LONG')]
+        assert position.unrealized_pnl == -2500.0
+        assert abs(position.percentage + 5.0) < 1e-9
+        assert abs(position.margin_ratio - 1900.0 / 2500.0) < 1e-9
+        assert 'BTCUSDT' in monitor._dirty_symbols
+
+        monitor._check_dirty_symbols()
+        assert not monitor._dirty_symbols
+        alerts = {(alert.metric, alert.alert_level) for alert in monitor.alert_history}
+        assert (RiskMetric.MARGIN_RATIO, AlertLevel.WARNING) in alerts
+        assert len(monitor.alert_latencies_ms) > 0
+
+        # ACCOUNT_UPDATE style position event: size doubled at the same mark price
+        feed.push_position('BTCUSDT', 'LONG', size=2.0, entry_price=50000.0, unrealized_pnl=-5000.0)
+        position = monitor._live_positions[('BTCUSDT', 'LONG')]
+        assert position.size == 2.0 and position.unrealized_pnl == -5000.0
+        assert position.initial_margin == 10000.0
+        assert abs(position.margin_ratio - 3800.0 / 5000.0) < 1e-9
+
+        # Further drop crosses the emergency threshold
+        feed.push_mark_price('BTCUSDT', 46500.0)
+        monitor._check_dirty_symbols()
+        alerts = {(alert.metric, alert.alert_level) for alert in monitor.alert_history}
+        assert (RiskMetric.MARGIN_RATIO, AlertLevel.EMERGENCY) in alerts
+
+        # Closing event removes the position and its evaluation
+        feed.push_position('BTCUSDT', 'LONG', size=0)
+        assert ('BTCUSDT', 'LONG') not in monitor._live_positions
+        assert 'BTCUSDT' not in monitor._risk_state
+
+    def test_check_position_risk_cache_and_refresh(self):
+        """Test check_position_risk serves fresh evaluations and re-evaluates stale ones without alerting"""
+        try:
+            from risk_monitor import RiskMonitor, RiskMetric, AlertLevel
+            from position_manager import PositionInfo, PositionSnapshot
+        except ImportError as e:
+            print(f"Risk monitor not available: {e}")
+            return
+
+        def position(margin_ratio: float) -> PositionInfo:
+            return PositionInfo(
+                symbol='BTCUSDT', side='LONG', size=1.0, entry_price=50000.0, mark_price=50000.0,
+                liquidation_price=40000.0, unrealized_pnl=0.0, percentage=0.0, margin_ratio=margin_ratio,
+                maintenance_margin=2000.0, initial_margin=5000.0, leverage=10,
+                margin_mode='isolated', risk_level='LOW'
+            )
+
+        position_manager = Mock()
+        monitor = RiskMonitor(position_manager)
+        handler = Mock()
+        monitor.add_notification_handler(handler)
+
+        # Monitor loop evaluated the pair: a call inside max_age does not touch the exchange
+        critical = position(0.85)
+        expected = monitor._evaluate_position_risks(critical)
+        assert [(a.metric, a.alert_level) for a in expected] == [(RiskMetric.MARGIN_RATIO, AlertLevel.CRITICAL)]
+        assert monitor.check_position_risk('BTC/USDT:USDT', max_age=60) == expected
+        position_manager.get_snapshot.assert_not_called()
+
+        # Stale: re-evaluated from the snapshot, no alert sent and no auto-action taken
+        monitor._risk_state['BTCUSDT'] = {side: (evaluated_at - 120, alerts)
+                                          for side, (evaluated_at, alerts) in monitor._risk_state['BTCUSDT'].items()}
+        position_manager.get_snapshot.return_value = PositionSnapshot.build([position(0.95)], {})
+        alerts = monitor.check_position_risk('BTC/USDT:USDT', max_age=60)
+        position_manager.get_snapshot.assert_called_once_with(max_age=60, force_refresh=False)
+        assert [(a.metric, a.alert_level) for a in alerts] == [(RiskMetric.MARGIN_RATIO, AlertLevel.EMERGENCY)]
+        assert len(monitor.alert_history) == 0 and not handler.called
+        assert [call[0] for call in position_manager.method_calls] == ['get_snapshot']
+        assert monitor.check_position_risk('BTC/USDT:USDT', max_age=60) == alerts   # stored again
+
+        # force_refresh bypasses a fresh evaluation and forces a new snapshot
+        position_manager.get_snapshot.reset_mock()
+        position_manager.get_snapshot.return_value = PositionSnapshot.build([position(0.3)], {})
+        assert monitor.check_position_risk('BTC/USDT:USDT', max_age=60, force_refresh=True) == []
+        position_manager.get_snapshot.assert_called_once_with(max_age=60, force_refresh=True)
+
+        # Position gone: its stored evaluation is dropped
+        position_manager.get_snapshot.return_value = PositionSnapshot.build([], {})
+        assert monitor.check_position_risk('BTC/USDT:USDT', force_refresh=True) == []
+        assert 'BTCUSDT' not in monitor._risk_state
+        assert len(monitor.alert_history) == 0 and not handler.called
+
+    def test_signal_compiler_matches_chained_conditions(self):
+        """Test SignalCompiler AND/OR results match chaining the conditions with & / |"""
+        try:
+            from signal_compiler import SignalCompiler
+        except ImportError as e:
+            print(f"Signal compiler not available: {e}")
+            return
+
+        n = 500
+        dataframe = pd.DataFrame({
+            'rsi': np.where(np.arange(n) < 14, np.nan, np.random.uniform(0, 100, n)),
+            'close': np.random.uniform(90, 110, n),
+            'bb_lower': np.random.uniform(90, 110, n),
+            'volume_ratio': np.random.uniform(0, 2, n)
+        })
+        conditions = {
+            'rsi_oversold': dataframe['rsi'] < 50,
+            'near_bb_lower': dataframe['close'] <= dataframe['bb_lower'] * 1.01,
+            'volume_surge': dataframe['volume_ratio'] > 0.5,
+            'always': True
+        }
+
+        compiler = SignalCompiler()
+        for any_condition in (False, True):
+            # Previous implementation: fold the conditions pairwise
+            chained = None
+            for condition in conditions.values():
+                if chained is None:
+                    chained = condition
+                elif any_condition:
+                    chained = chained | condition
+                else:
+                    chained = chained & condition
+
+            result = compiler.evaluate(dataframe, conditions, 'enter_long', 'BTC/USDT', any_condition)
+            assert np.array_equal(result, np.broadcast_to(np.asarray(chained, dtype=bool), n))
+            dataframe.loc[result, 'enter_long'] = 1
+
+        # Blocking counts: rows where only this condition was false (AND)
+        matrix = np.array([[True, True, False, True], [True, False, False, True]])
+        compiler.evaluate(pd.DataFrame(index=range(4)), {'a': matrix[0], 'b': matrix[1]}, 'exit_long')
+        stats = compiler.get_stats('exit_long')['exit_long']
+        assert stats['signals'] == 2
+        assert stats['conditions']['a']['blocking'] == 0 and stats['conditions']['b']['blocking'] == 1
+
+        empty = compiler.evaluate(dataframe, {}, 'exit_short')
+        assert empty.dtype == bool and len(empty) == n and not empty.any()
+
+    @staticmethod
+    def _raw_position(symbol: str, amount: float, side: str = 'BOTH', price: float = 50000.0) -> Dict:
+        """futures_position_information() row"""
+        return {
+            'symbol': symbol, 'positionAmt': str(amount), 'positionSide': side,
+            'markPrice': str(price), 'entryPrice': str(price), 'liquidationPrice': str(price * 0.8),
+            'unRealizedProfit': '0', 'marginRatio': '0.1', 'maintMargin': '10',
+            'initialMargin': '100', 'marginType': 'isolated'
+        }
+
+    @staticmethod
+    def _raw_account() -> Dict:
+        """futures_account() response"""
+        return {
+            'totalWalletBalance': '1000', 'totalUnrealizedProfit': '0', 'totalMarginBalance': '1000',
+            'totalInitialMargin': '200', 'totalMaintMargin': '20', 'availableBalance': '800',
+            'maxWithdrawAmount': '800', 'canTrade': True, 'canWithdraw': True
+        }
+
+    def test_position_snapshot(self):
+        """Test position/account reads share one immutable snapshot per TTL"""
+        try:
+            from position_manager import PositionManager
+        except ImportError as e:
+            print(f"Position manager not available: {e}")
+            return
+        import operator
+        from dataclasses import FrozenInstanceError
+
+        exchange = Mock()
+        exchange._api.futures_position_information.return_value = [
+            self._raw_position('BTCUSDT', 0.5), self._raw_position('ETHUSDT', -2.0, price=3000.0),
+            self._raw_position('XRPUSDT', 0)
+        ]
+        exchange._api.futures_account.return_value = self._raw_account()
+
+        manager = PositionManager(exchange)
+        manager.snapshot_ttl = 0.2
+        snapshot = manager.get_snapshot()
+
+        # Reads within the TTL are served from the same snapshot
+        assert manager.get_snapshot() is snapshot
+        assert manager.get_position_info('BTC/USDT').side == 'LONG'
+        assert manager.get_position_info('ETH/USDT', 'short').size == 2.0
+        assert len(manager.get_position_info()) == 2
+        assert exchange._api.futures_position_information.call_count == 1
+        assert exchange._api.futures_account.call_count == 1
+
+        # Snapshot, positions and indexes are read-only
+        for mutate in (lambda: setattr(snapshot, 'positions', ()),
+                       lambda: setattr(snapshot.positions[0], 'size', 0.0),
+                       lambda: operator.setitem(snapshot.account, 'available_balance', 0.0),
+                       lambda: operator.setitem(snapshot.by_symbol, 'BTCUSDT', ())):
+            try:
+                mutate()
+                assert False, "Snapshot mutation was allowed"
+            except (FrozenInstanceError, TypeError):
+                pass
+
+        # Expired, forced or invalidated snapshots are refetched once
+        time.sleep(0.25)
+        refreshed = manager.get_snapshot()
+        assert refreshed is not snapshot and manager.get_snapshot() is refreshed
+        assert manager.get_snapshot(force_refresh=True) is not refreshed
+        manager.invalidate_snapshot()
+        manager.get_snapshot()
+        assert exchange._api.futures_position_information.call_count == 4
+        assert snapshot.get('BTCUSDT').size == 0.5  # old snapshot unchanged
+
+    def test_emergency_close_parallel_hedge_mode(self):
+        """Test emergency close submits all orders concurrently with hedge-mode positionSide"""
+        try:
+            from position_manager import PositionManager, PositionMode
+        except ImportError as e:
+            print(f"Position manager not available: {e}")
+            return
+        import threading
+
+        exchange = Mock()
+        exchange._api.futures_position_information.return_value = [
+            self._raw_position('BTCUSDT', 0.5, 'LONG'), self._raw_position('BTCUSDT', -0.3, 'SHORT'),
+            self._raw_position('ETHUSDT', 2.0, 'LONG', price=3000.0)
+        ]
+        exchange._api.futures_account.return_value = self._raw_account()
+
+        # Every order waits until all three are in flight (fails if submitted one by one)
+        in_flight = threading.Barrier(3, timeout=5)
+
+        def create_market_order(symbol, side, amount, params):
+            in_flight.wait()
+            return {'filled': amount, 'status': 'closed'}
+
+        exchange.create_market_order.side_effect = create_market_order
+
+        manager = PositionManager(exchange)
+        manager.current_position_mode = PositionMode.HEDGE
+        results = manager.emergency_close_all_positions()
+
+        assert [r['status'] for r in results] == ['success'] * 3
+        assert all(r['fill_status'] == 'FILLED' for r in results)
+        assert exchange._api.futures_position_information.call_count == 1
+
+        orders = {(call.kwargs['symbol'], call.kwargs['params']['positionSide']): call.kwargs
+                  for call in exchange.create_market_order.call_args_list}
+        assert set(orders) == {('BTC/USDT:USDT', 'LONG'), ('BTC/USDT:USDT', 'SHORT'), ('ETH/USDT:USDT', 'LONG')}
+        assert orders[('BTC/USDT:USDT', 'LONG')]['side'] == 'sell'
+        assert orders[('BTC/USDT:USDT', 'SHORT')]['side'] == 'buy'
+        assert orders[('BTC/USDT:USDT', 'SHORT')]['amount'] == 0.3
+        assert all('reduceOnly' not in order['params'] for order in orders.values())
+
+    def test_risk_alert_history_and_counts(self):
+        """Test bounded alert history, indexed de-duplication and 24h level counters"""
+        try:
+            from risk_monitor import RiskMonitor, RiskAlert, RiskMetric, AlertLevel
+        except ImportError as e:
+            print(f"Risk monitor not available: {e}")
+            return
+
+        monitor = RiskMonitor(Mock())
+        monitor.auto_actions['log_all_alerts'] = False
+        monitor.auto_actions['reduce_position_on_critical'] = False
+        monitor.auto_actions['close_position_on_emergency'] = False
+
+        def alert(symbol: str, level: AlertLevel, age: timedelta = timedelta(0)) -> RiskAlert:
+            return RiskAlert(timestamp=datetime.now() - age, alert_level=level, metric=RiskMetric.MARGIN_RATIO,
+                             symbol=symbol, current_value=0.7, threshold=0.6, message=symbol,
+                             suggested_action='MONITOR', priority=5)
+
+        # Older than 24h first (history is appended in time order)
+        levels = [AlertLevel.WARNING, AlertLevel.CRITICAL, AlertLevel.EMERGENCY]
+        for i in range(30):
+            monitor._handle_alert(alert(f"OLD{i}USDT", levels[i % 3], timedelta(hours=25)))
+        handled = []
+        for i in range(120):
+            handled.append(alert(f"SYM{i}USDT", levels[i % 3], timedelta(minutes=120 - i)))
+            monitor._handle_alert(handled[-1])
+
+        # Same symbol/metric/level within 5 minutes is dropped, another level is not
+        assert handled[-1].alert_level == AlertLevel.EMERGENCY
+        monitor._handle_alert(alert('SYM119USDT', AlertLevel.EMERGENCY))
+        assert monitor.alert_history[-1] is handled[-1]
+        handled.append(alert('SYM119USDT', AlertLevel.CRITICAL))
+        monitor._handle_alert(handled[-1])
+        assert monitor.alert_history[-1] is handled[-1]
+
+        assert len(monitor.alert_history) == 100
+        assert list(monitor.alert_history) == handled[-100:]
+
+        # Expired entries are trimmed on every alert, without a summary call
+        assert len(monitor._recent_alerts) == len(handled)
+        dedup_cutoff = datetime.now() - timedelta(minutes=5)
+        assert all(sent_at >= dedup_cutoff for sent_at in monitor._last_alert_at.values())
+        assert ('SYM119USDT', RiskMetric.MARGIN_RATIO, AlertLevel.CRITICAL) in monitor._last_alert_at
+        assert len(monitor._last_alert_at) < 10
+
+        expected = {level.value: 0 for level in AlertLevel}
+        for item in handled:
+            expected[item.alert_level.value] += 1
+        assert monitor._get_recent_alert_counts(hours=24) == expected
+        assert len(monitor._recent_alerts) == len(handled)
+
+    def test_latest_candle_matches_last_row(self):
+        """Test callback candle lookups return the dataframe's last row in live and backtest modes"""
+        try:
+            from AdvancedFuturesStrategy import AdvancedFuturesStrategy, LatestCandle
+        except ImportError as e:
+            print(f"Advanced futures strategy not available: {e}")
+            return
+
+        n = 100
+        dataframe = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=n, freq='15min', tz='UTC'),
+            'close': np.random.uniform(49000, 51000, n),
+            'volatility': np.random.uniform(0.001, 0.05, n),
+            'risk_score': np.random.uniform(0, 10, n),
+            'bb_upper': np.random.uniform(51000, 52000, n),
+            'bb_middle': np.random.uniform(49500, 50500, n),
+            'bb_lower': np.random.uniform(48000, 49000, n)
+        })
+
+        def assert_matches(latest, row):
+            assert latest.date == row['date']
+            for column in LatestCandle.COLUMNS:
+                assert getattr(latest, column) == row[column], f"{column} mismatch"
+
+        strategy = AdvancedFuturesStrategy.__new__(AdvancedFuturesStrategy)
+        strategy._latest_candles = {}
+        strategy.dp = Mock()
+
+        # Live: served from the record published by populate_indicators
+        strategy.dp.runmode.value = 'dry_run'
+        strategy._latest_candles['BTC/USDT:USDT'] = LatestCandle.from_dataframe(dataframe)
+        assert_matches(strategy._get_latest_candle('BTC/USDT:USDT'), dataframe.iloc[-1])
+        strategy.dp.get_analyzed_dataframe.assert_not_called()
+
+        # Backtest: the analyzed dataframe ends at the current candle
+        strategy.dp.runmode.value = 'backtest'
+        strategy.dp.get_analyzed_dataframe.return_value = (dataframe.iloc[:60], None)
+        assert_matches(strategy._get_latest_candle('BTC/USDT:USDT'), dataframe.iloc[59])
+
+        strategy.dp.get_analyzed_dataframe.return_value = (dataframe.iloc[:0], None)
+        assert strategy._get_latest_candle('BTC/USDT:USDT') is None
+
     def test_web_dashboard_import(self):
         """Test web dashboard can be imported"""
         web_dashboard_path = os.path.join(project_root, 'web_dashboard', 'app.py')
@@ -449,6 +1320,496 @@ class AIModelTests(BaseTestSuite):
         except ImportError:
             print("Anomaly detection not available")
 
+    def test_online_features_match_prepare_features(self):
+        """Test OnlineFeatureExtractor fed row by row reproduces prepare_features"""
+        try:
+            from anomaly_detection import MLAnomalyDetector, OnlineFeatureExtractor
+        except ImportError as e:
+            print(f"Anomaly detection not available: {e}")
+            return
+
+        n = 300
+        close = 50000 + np.random.randn(n).cumsum() * 50
+        df = pd.DataFrame({
+            'Close': close,
+            'High': close + np.random.rand(n) * 20,
+            'Low': close - np.random.rand(n) * 20,
+            'Volume': np.random.randint(1000000, 5000000, n).astype(float),
+            'RSI': np.where(np.arange(n) < 14, np.nan, np.random.uniform(20, 80, n)),
+            'MACD': np.where(np.arange(n) < 33, np.nan, np.random.randn(n))
+        })
+        df.loc[100:110, 'Volume'] = 2000000.0   # flat stretch in the rolling volume window
+
+        expected = MLAnomalyDetector().prepare_features(df)
+
+        extractor = OnlineFeatureExtractor(include_rsi=True, include_macd=True)
+        online = np.array([
+            extractor.update('BTCUSDT', row.Close, row.High, row.Low, row.Volume, rsi=row.RSI, macd=row.MACD)
+            for row in df.itertuples()
+        ])
+
+        assert online.shape == expected.shape == (n, extractor.n_features)
+        assert np.allclose(online, expected, rtol=1e-12, atol=1e-9)
+
+    @staticmethod
+    def _reference_window_scores(prices, volumes, window_size: int = 100) -> List[Dict]:
+        """Per-tick z-score / IQR / volume ratio from rebuilt window arrays (previous implementation)"""
+        from collections import deque
+        price_window, volume_window = deque(maxlen=window_size), deque(maxlen=window_size)
+
+        results = []
+        for price, volume in zip(prices, volumes):
+            price_window.append(price)
+            volume_window.append(volume)
+            result = {}
+
+            if len(price_window) >= 10:
+                data = np.array(price_window)
+                std = np.std(data)
+                result['z_score'] = abs((price - np.mean(data)) / std) if std != 0 else 0.0
+                q1, q3 = np.percentile(data, 25), np.percentile(data, 75)
+                iqr = q3 - q1
+                lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+                result['iqr_anomaly'] = price < lower or price > upper
+                if price < lower:
+                    result['iqr_score'] = (lower - price) / iqr
+                elif price > upper:
+                    result['iqr_score'] = (price - upper) / iqr
+                else:
+                    result['iqr_score'] = 0.0
+
+            if len(volume_window) >= 20:
+                average = np.mean(list(volume_window)[:-1])
+                if average != 0:
+                    result['volume_ratio'] = volume / average
+
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _synthetic_ticks(n: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Random-walk prices and lognormal volumes with injected spikes and droughts"""
+        rng = np.random.default_rng(seed)
+        prices = 50000 + rng.normal(0, 20, n).cumsum()
+        prices[rng.choice(n, 8, replace=False)] *= rng.choice([0.97, 1.03], 8)
+        volumes = rng.lognormal(14, 0.3, n)
+        volumes[rng.choice(n, 8, replace=False)] *= 6
+        volumes[rng.choice(n, 8, replace=False)] *= 0.1
+        return prices, volumes
+
+    def test_streaming_detectors_match_window_arrays(self):
+        """Test streaming z-score/IQR/volume detectors against per-window numpy results"""
+        try:
+            from anomaly_detection import StatisticalAnomalyDetector, VolumeAnomalyDetector
+        except ImportError as e:
+            print(f"Anomaly detection not available: {e}")
+            return
+
+        prices, volumes = self._synthetic_ticks(400, seed=7)
+        expected = self._reference_window_scores(prices, volumes)
+
+        statistical = StatisticalAnomalyDetector(window_size=100)
+        volume_detector = VolumeAnomalyDetector()
+        detected = 0
+        for price, volume, reference in zip(prices, volumes, expected):
+            z_result = statistical.detect_z_score_anomaly(price)
+            iqr_result = statistical.detect_iqr_anomaly(price, update=False)
+            spike_result = volume_detector.detect_volume_spike(volume)
+            drought_result = volume_detector.detect_volume_drought(volume, update=False)
+
+            if 'z_score' in reference:
+                assert np.isclose(z_result['score'], reference['z_score'], rtol=1e-9)
+                assert z_result['is_anomaly'] == (reference['z_score'] > 3.0)
+                assert iqr_result['is_anomaly'] == reference['iqr_anomaly']
+                assert np.isclose(iqr_result['score'], reference['iqr_score'], rtol=1e-9)
+                detected += z_result['is_anomaly'] + iqr_result['is_anomaly']
+
+            if 'volume_ratio' in reference:
+                assert np.isclose(spike_result['volume_ratio'], reference['volume_ratio'], rtol=1e-9)
+                assert np.isclose(drought_result['volume_ratio'], reference['volume_ratio'], rtol=1e-9)
+                assert spike_result['is_anomaly'] == (reference['volume_ratio'] > 3.0)
+                assert drought_result['is_anomaly'] == (reference['volume_ratio'] < 0.3)
+
+        assert detected > 0 and len(statistical.data_buffer) == 100
+
+    def test_batch_detector_matches_per_symbol_windows(self):
+        """Test BatchAnomalyDetector flags and scores against per-symbol window results"""
+        try:
+            from anomaly_detection import BatchAnomalyDetector
+        except ImportError as e:
+            print(f"Anomaly detection not available: {e}")
+            return
+
+        symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+        n = 300
+        ticks = [self._synthetic_ticks(n, seed) for seed in (1, 2, 3)]
+        prices = np.column_stack([price for price, _ in ticks])
+        volumes = np.column_stack([volume for _, volume in ticks])
+
+        # Symbols miss some ticks (NaN = no data, window not updated)
+        rng = np.random.default_rng(0)
+        missing = rng.random(prices.shape) < 0.1
+        prices[missing] = np.nan
+        volumes[missing] = np.nan
+
+        # Reference: each symbol's own tick sequence through the per-window computation
+        expected = {}
+        for j, symbol in enumerate(symbols):
+            rows = np.flatnonzero(~missing[:, j])
+            for row, reference in zip(rows, self._reference_window_scores(prices[rows, j], volumes[rows, j])):
+                z_score, ratio = reference.get('z_score', 0.0), reference.get('volume_ratio', np.nan)
+                checks = [('price_z_score', z_score > 3.0, z_score),
+                          ('price_iqr', reference.get('iqr_anomaly', False), reference.get('iqr_score')),
+                          ('volume_spike', ratio > 3.0, ratio), ('volume_drought', ratio < 0.3, ratio)]
+                for anomaly_type, flagged, score in checks:
+                    if flagged:
+                        expected[(row, symbol, anomaly_type)] = score
+
+        detector = BatchAnomalyDetector(symbols, window_size=100)
+        detected = {}
+        for row in range(n):
+            result = detector.detect(prices[row], volumes[row])
+            for item in result.itertuples():
+                detected[(row, item.symbol, item.type)] = item.score
+
+        assert len(expected) > 0
+        assert set(detected) == set(expected)
+        for key, score in expected.items():
+            assert np.isclose(detected[key], score, rtol=1e-9), f"{key} score mismatch"
+
+    def test_score_batch_matches_predict(self):
+        """Test score_batch's score-derived outlier labels agree with each model's predict()"""
+        try:
+            from anomaly_detection import MLAnomalyDetector
+        except ImportError as e:
+            print(f"Anomaly detection not available: {e}")
+            return
+
+        rng = np.random.default_rng(11)
+        X = rng.normal(0, 1, (400, 7))
+        X_new = np.vstack([rng.normal(0, 1, (60, 7)), rng.normal(0, 6, (20, 7))])
+
+        detector = MLAnomalyDetector()
+        assert detector.train_models(X)
+        X_scaled = detector.scaler.transform(X_new)
+
+        for name, (scores, is_anomaly) in detector.score_batch(X_new).items():
+            model = detector.models()[name]
+            assert np.array_equal(scores, model.score_samples(X_scaled)), f"{name} scores differ"
+            assert np.array_equal(is_anomaly, model.predict(X_scaled) == -1), f"{name} labels differ"
+            assert is_anomaly[60:].any()
+
+        # Single-row path uses the same rule
+        result = detector.detect_anomaly(X_new[-1])
+        for name, model in detector.models().items():
+            expected = model.predict(X_scaled[-1:])[0] == -1
+            assert result['individual_results'][name]['is_anomaly'] == expected
+
+    def test_install_models_version_monotonic(self):
+        """Test a retrained model set only replaces an older installed version"""
+        try:
+            from anomaly_detection import MLAnomalyDetector, fit_model_set
+        except ImportError as e:
+            print(f"Anomaly detection not available: {e}")
+            return
+
+        X = np.random.default_rng(5).normal(0, 1, (200, 7))
+        detector = MLAnomalyDetector()
+        assert detector.version == 0 and fit_model_set(X[:10]) is None
+
+        v1, v2, v3 = (fit_model_set(X, version) for version in (1, 2, 3))
+        assert detector.install_models(v2)
+        assert not detector.install_models(v1)   # late result of an older retrain
+        assert not detector.install_models(v2)   # same version again
+        assert detector.model_set is v2 and detector.version == 2
+
+        assert detector.install_models(v3) and detector.model_set is v3
+        assert detector.train_models(X) and detector.version == 4
+
+    def test_lstm_windows_match_previous_sequences(self):
+        """Test MarketPatternDataset windows/labels equal the old materialized sequences"""
+        try:
+            from market_pattern_ai import MarketPatternAI, MarketPatternDataset
+            from sklearn.base import clone
+        except ImportError as e:
+            print(f"Pattern AI not available: {e}")
+            return
+
+        rng = np.random.default_rng(21)
+        pattern_ai = MarketPatternAI()
+        pattern_ai.sequence_length = L = 10
+        n = 80
+        df = pd.DataFrame(rng.normal(0, 1, (n, len(pattern_ai.feature_columns))),
+                          columns=pattern_ai.feature_columns)
+        labels = pd.Series(rng.choice(['bullish', 'bearish', 'sideways'], n))
+
+        scaled, sequence_labels = pattern_ai.prepare_sequences(df, labels)
+
+        # Previous prepare_sequences: sequences[i - L] = scaled[i - L:i], label encoded[i]
+        old_scaled = clone(pattern_ai.scaler).fit_transform(df[pattern_ai.feature_columns].values)
+        old_encoded = clone(pattern_ai.label_encoder).fit_transform(labels)
+        old_sequences = np.array([old_scaled[i - L:i] for i in range(L, n)], dtype=np.float32)
+        old_labels = old_encoded[L:]
+
+        dataset = MarketPatternDataset(scaled, sequence_labels, L)
+        assert len(dataset) == len(old_sequences) == n - L
+        for k in range(len(dataset)):
+            window, label = dataset[k]
+            assert np.allclose(window.numpy(), old_sequences[k], atol=1e-6)
+            assert int(label) == old_labels[k]
+
+        # Train/val split through indices keeps the same pairing
+        subset = MarketPatternDataset(scaled, sequence_labels, L, indices=[3, 0, n - L - 1])
+        for pos, k in enumerate([3, 0, n - L - 1]):
+            window, label = subset[pos]
+            assert np.allclose(window.numpy(), old_sequences[k], atol=1e-6)
+            assert int(label) == old_labels[k]
+
+    def test_batched_patterns_match_per_window(self):
+        """Test predict_patterns and the exported engine agree with per-window predict_pattern"""
+        try:
+            from market_pattern_ai import LSTMPatternModel, MarketPatternAI, PatternInferenceEngine
+        except ImportError as e:
+            print(f"Pattern AI not available: {e}")
+            return
+
+        rng = np.random.default_rng(23)
+        pattern_ai = MarketPatternAI()
+        pattern_ai.sequence_length = 12
+        columns = pattern_ai.feature_columns
+        pattern_ai.lstm_model = LSTMPatternModel(len(columns))
+        pattern_ai.scaler.fit(rng.normal(0, 1, (200, len(columns))))
+        pattern_ai.label_encoder.fit(pattern_ai.market_regimes)
+
+        frames = {
+            f"PAIR{i}": pd.DataFrame(rng.normal(0, 1, (30, len(columns))), columns=columns)
+            for i in range(5)
+        }
+        frames['SHORT'] = frames['PAIR0'].head(5)
+
+        batched = pattern_ai.predict_patterns(frames)
+        assert batched['SHORT']['pattern'] == 'insufficient_data'
+        for pair, df in frames.items():
+            single = pattern_ai.predict_pattern(df)
+            assert batched[pair]['pattern'] == single['pattern'], f"{pair} pattern differs"
+            for regime, prob in single.get('probabilities', {}).items():
+                assert np.isclose(batched[pair]['probabilities'][regime], prob, atol=1e-5)
+
+        # Export suffix follows fmt, whatever extension the caller passed
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pattern_ai.export_lstm_model(os.path.join(tmp, 'lstm.onnx.bak'))
+            assert path == os.path.join(tmp, 'lstm.onnx.pt') and os.path.exists(path)
+
+            engine = PatternInferenceEngine(path)
+            assert engine.format == 'torchscript'
+            exported = pattern_ai.predict_patterns(frames, engine=engine)
+            for pair in frames:
+                assert exported[pair]['pattern'] == batched[pair]['pattern']
+                for regime, prob in batched[pair].get('probabilities', {}).items():
+                    assert np.isclose(exported[pair]['probabilities'][regime], prob, atol=1e-5)
+
+    def test_lstm_training_resume_and_early_stopping(self):
+        """Test LSTM checkpoint resume, fingerprint mismatch restart and early stopping on CPU"""
+        try:
+            import torch
+            from market_pattern_ai import LSTMTrainingConfig, MarketPatternAI
+        except ImportError as e:
+            print(f"Pattern AI not available: {e}")
+            return
+
+        class Interrupted(Exception):
+            pass
+
+        rng = np.random.default_rng(22)
+        pattern_ai = MarketPatternAI()
+        pattern_ai.sequence_length = L = 5
+        scaled = rng.normal(0, 1, (90, pattern_ai.input_features)).astype(np.float32)
+        labels = rng.integers(0, 3, len(scaled) - L)
+
+        save_checkpoint = pattern_ai._save_checkpoint
+        saved_epochs = []
+
+        def spy(interrupt_after: Optional[int] = None):
+            def save(path, state):
+                saved_epochs.append(state['epoch'])
+                save_checkpoint(path, state)
+                if state['epoch'] == interrupt_after:
+                    raise Interrupted()
+            return save
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pattern_ai.model_dir = tmp
+            config = LSTMTrainingConfig(epochs=4, batch_size=16, patience=None, checkpoint_every=1,
+                                        checkpoint_path=os.path.join(tmp, 'checkpoint.pth'), resume=True)
+
+            # Uninterrupted reference run
+            torch.manual_seed(0)
+            pattern_ai._save_checkpoint = spy()
+            reference = pattern_ai.train_lstm_model(scaled, labels, config)
+            assert saved_epochs == [0, 1, 2, 3] and not os.path.exists(config.checkpoint_path)
+
+            # Interrupted after the epoch-1 checkpoint, resumed from epoch 2
+            saved_epochs.clear()
+            torch.manual_seed(0)
+            pattern_ai._save_checkpoint = spy(interrupt_after=1)
+            try:
+                pattern_ai.train_lstm_model(scaled, labels, config)
+                assert False, "training was not interrupted"
+            except Interrupted:
+                pass
+            assert os.path.exists(config.checkpoint_path)
+
+            pattern_ai._save_checkpoint = spy()
+            resumed = pattern_ai.train_lstm_model(scaled, labels, config)
+            assert saved_epochs == [0, 1, 2, 3]
+            assert [entry['epoch'] for entry in resumed['history']] == [0, 1, 2, 3]
+            assert np.allclose([entry['val_loss'] for entry in resumed['history']],
+                               [entry['val_loss'] for entry in reference['history']], rtol=1e-5)
+            assert not os.path.exists(config.checkpoint_path)
+
+            # A checkpoint for other labels is discarded: the run starts over at epoch 0
+            saved_epochs.clear()
+            pattern_ai._save_checkpoint = spy(interrupt_after=1)
+            try:
+                pattern_ai.train_lstm_model(scaled, labels, config)
+            except Interrupted:
+                pass
+            saved_epochs.clear()
+            pattern_ai._save_checkpoint = spy()
+            restarted = pattern_ai.train_lstm_model(scaled, (labels + 1) % 3, config)
+            assert saved_epochs == [0, 1, 2, 3]
+            assert [entry['epoch'] for entry in restarted['history']] == [0, 1, 2, 3]
+
+            # patience=1 with an unreachable min_delta: stops after epoch 1, keeps epoch-0 weights
+            best_weights = {}
+
+            def keep_weights(path, state):
+                best_weights.update({name: tensor.clone() for name, tensor in state['model_state'].items()})
+
+            pattern_ai._save_checkpoint = keep_weights
+            config = LSTMTrainingConfig(epochs=4, batch_size=16, patience=1, min_delta=10.0,
+                                        checkpoint_every=1, checkpoint_path=config.checkpoint_path)
+            result = pattern_ai.train_lstm_model(scaled, labels, config)
+            assert result['stopped_early'] and result['epochs_run'] == 2
+            assert result['best_val_loss'] == result['history'][0]['val_loss']
+            for name, tensor in pattern_ai.lstm_model.state_dict().items():
+                assert torch.equal(tensor, best_weights[name]), f"{name} is not the best epoch's weights"
+
+    @staticmethod
+    def _synthetic_candles(n: int, seed: int) -> pd.DataFrame:
+        """Random-walk OHLCV candles with a flat stretch and one missing close"""
+        rng = np.random.default_rng(seed)
+        close = 50000 * np.exp(rng.normal(0, 0.01, n).cumsum())
+        close[n // 3:n // 3 + 40] = close[n // 3]          # flat: zero volatility
+        df = pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.002, n)),
+            'High': close * (1 + rng.uniform(0, 0.01, n)),
+            'Low': close * (1 - rng.uniform(0, 0.01, n)),
+            'Close': close,
+            'Volume': rng.lognormal(14, 0.4, n)
+        })
+        df.loc[2 * n // 3, 'Close'] = np.nan
+        return df
+
+    @staticmethod
+    def _reference_regime_labels(df: pd.DataFrame) -> List:
+        """MarketRegimeDetector.create_regime_labels row loop (previous implementation)"""
+        from strategy_selector_ai import MarketRegime
+        labels = []
+
+        returns = df['Close'].pct_change().fillna(0)
+        volatility = returns.rolling(20).std()
+
+        for i in range(len(df)):
+            if i < 50:  # Need sufficient history
+                labels.append(MarketRegime.RANGING)
+                continue
+
+            recent_vol = volatility.iloc[i]
+            recent_momentum = df['Close'].iloc[i] / df['Close'].iloc[i-20] - 1
+
+            if recent_vol > volatility.quantile(0.8):
+                if abs(recent_momentum) > 0.05:
+                    labels.append(MarketRegime.BREAKOUT)
+                else:
+                    labels.append(MarketRegime.HIGH_VOLATILITY)
+            elif recent_vol < volatility.quantile(0.2):
+                labels.append(MarketRegime.LOW_VOLATILITY)
+            elif recent_momentum > 0.03:
+                labels.append(MarketRegime.BULLISH_TRENDING)
+            elif recent_momentum < -0.03:
+                labels.append(MarketRegime.BEARISH_TRENDING)
+            else:
+                labels.append(MarketRegime.RANGING)
+
+        return labels
+
+    @staticmethod
+    def _reference_trend_labels(df: pd.DataFrame) -> List[str]:
+        """MarketPatternAI.create_market_regime_labels row loop (previous implementation)"""
+        labels = []
+        for i in range(len(df)):
+            price_trend = df['Price_vs_SMA'].iloc[i]
+
+            if price_trend > 0.02:
+                labels.append('bullish')
+            elif price_trend < -0.02:
+                labels.append('bearish')
+            else:
+                labels.append('sideways')
+        return labels
+
+    def test_regime_labels_match_row_loops(self):
+        """Test vectorized regime labelling against the previous per-row loops"""
+        try:
+            from strategy_selector_ai import MarketRegimeDetector
+        except ImportError as e:
+            print(f"Strategy selector not available: {e}")
+            return
+
+        # 1,500 candles plus a frame shorter than the 50-row warm-up
+        frames = [self._synthetic_candles(1500, seed=24), self._synthetic_candles(40, seed=25)]
+        detector = MarketRegimeDetector()
+        for df in frames:
+            labels = detector.create_regime_labels(df)
+            expected = self._reference_regime_labels(df)
+            assert [label.value for label in labels] == [label.value for label in expected]
+        assert len({label.value for label in labels}) == 1   # short frame: all warm-up
+
+        try:
+            from market_pattern_ai import MarketPatternAI
+        except ImportError as e:
+            print(f"Pattern AI not available: {e}")
+            return
+
+        pattern_ai = MarketPatternAI()
+        for df in frames:
+            labels = pattern_ai.create_market_regime_labels(df)
+            assert labels.index.equals(df.index)
+            assert labels.tolist() == self._reference_trend_labels(df)
+
+    def test_regime_feature_matrix_matches_windows(self):
+        """Test build_feature_matrix rows equal per-window extract_market_features (previous training path)"""
+        try:
+            from strategy_selector_ai import MarketRegimeDetector
+        except ImportError as e:
+            print(f"Strategy selector not available: {e}")
+            return
+
+        df = self._synthetic_candles(400, seed=25)
+        detector = MarketRegimeDetector()
+        matrix = detector.build_feature_matrix(df)
+        assert matrix.shape == (len(df), 12)
+
+        # Previous train_classifier: one 50-row window per row from index 50
+        windows = np.array([
+            detector.extract_market_features(df.iloc[i-49:i+1]) for i in range(50, len(df))
+        ])
+        assert np.allclose(matrix[50:], windows, rtol=1e-9, atol=1e-12)
+
+        # predict_regime reads the last row of df.tail(50)
+        assert np.allclose(detector.extract_market_features(df.tail(50)), matrix[-1], rtol=1e-9, atol=1e-12)
+
     def test_position_sizing_basic(self):
         """Test basic position sizing"""
         try:
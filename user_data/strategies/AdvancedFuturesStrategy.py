@@ -22,6 +22,7 @@ import logging
 from datetime import datetime, timedelta
 import sys
 import os
+import time
 
 # Phase 5 모듈 임포트
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
@@ -29,11 +30,42 @@ from funding_rate_manager import FundingRateManager
 from position_manager import PositionManager
 from risk_monitor import RiskMonitor, AlertLevel
 from advanced_leverage_manager import AdvancedLeverageManager
+from funding_history_store import get_funding_history_store
+from indicator_engine import (Indicator, MACD_DEFAULTS, get_indicator_engine, indicator,
+                              is_hyperopt_mode, is_live_mode)
+from indicator_cube import IndicatorCubeMixin
+from signal_compiler import get_signal_compiler
 
 logger = logging.getLogger(__name__)
 
 
-class AdvancedFuturesStrategy(IStrategy):
+class LatestCandle:
+    """페어별 마지막 캔들 지표 (콜백용, 데이터프레임 접근 없이 O(1) 조회)"""
+
+    __slots__ = ('date', 'close', 'volatility', 'risk_score', 'bb_upper', 'bb_middle', 'bb_lower')
+
+    COLUMNS = ('close', 'volatility', 'risk_score', 'bb_upper', 'bb_middle', 'bb_lower')
+
+    def __init__(self, date, close: float, volatility: float, risk_score: float,
+                 bb_upper: float, bb_middle: float, bb_lower: float):
+        self.date = date
+        self.close = close
+        self.volatility = volatility
+        self.risk_score = risk_score
+        self.bb_upper = bb_upper
+        self.bb_middle = bb_middle
+        self.bb_lower = bb_lower
+
+    @classmethod
+    def from_dataframe(cls, dataframe: DataFrame) -> Optional['LatestCandle']:
+        """데이터프레임 마지막 행에서 생성 (빈 데이터프레임이면 None)"""
+        if len(dataframe) == 0:
+            return None
+        values = [float(dataframe[column].iat[-1]) for column in cls.COLUMNS]
+        return cls(dataframe['date'].iat[-1], *values)
+
+
+class AdvancedFuturesStrategy(IndicatorCubeMixin, IStrategy):
     """고급 선물거래 전략 - Phase 5 완전 통합"""
 
     # 전략 메타데이터
@@ -78,6 +110,13 @@ class AdvancedFuturesStrategy(IStrategy):
         # 초기화 플래그
         self._modules_initialized = False
 
+        # 공용 지표 엔진 / 조건 결합기
+        self.indicator_engine = get_indicator_engine()
+        self.signal_compiler = get_signal_compiler()
+
+        # 페어별 마지막 캔들 지표 (populate_indicators 에서 갱신, 콜백에서 조회)
+        self._latest_candles: Dict[str, LatestCandle] = {}
+
     def _initialize_modules(self):
         """Phase 5 모듈들 초기화"""
         if self._modules_initialized:
@@ -106,50 +145,75 @@ class AdvancedFuturesStrategy(IStrategy):
         # Phase 5 모듈 초기화 시도
         self._initialize_modules()
 
-        # 기본 기술적 지표
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period.value)
-        dataframe['rsi_short'] = ta.RSI(dataframe, timeperiod=7)
-        dataframe['rsi_long'] = ta.RSI(dataframe, timeperiod=21)
-
-        # 볼린저밴드
-        bb = ta.BBANDS(dataframe, timeperiod=self.bb_period.value,
-                       nbdevup=self.bb_deviation.value, nbdevdn=self.bb_deviation.value)
-        dataframe['bb_upper'] = bb['upperband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_lower'] = bb['lowerband']
-        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
-        dataframe['bb_percent'] = (dataframe['close'] - dataframe['bb_lower']) / \
-                                 (dataframe['bb_upper'] - dataframe['bb_lower'])
-
-        # 이동평균선
-        dataframe['ema_12'] = ta.EMA(dataframe, timeperiod=12)
-        dataframe['ema_26'] = ta.EMA(dataframe, timeperiod=26)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
+        # 기술적 지표 (공용 엔진, 페어/캔들 단위 캐시)
+        # 하이퍼옵트: RSI/볼밴 파라미터 범위 전체를 페어당 한 번만 계산 (지표 큐브)
+        dataframe = self._populate_with_cube(
+            self.indicator_engine, dataframe, metadata['pair'], self.indicator_spec(),
+            incremental=self._is_live_mode()
+        )
 
-        # MACD
-        macd = ta.MACD(dataframe)
-        dataframe['macd'] = macd['macd']
-        dataframe['macd_signal'] = macd['macdsignal']
-        dataframe['macd_histogram'] = macd['macdhist']
+        # 볼린저밴드 파생 지표
+        dataframe = self._populate_band_features(dataframe)
 
         # 변동성 지표
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
         dataframe['volatility'] = dataframe['atr'] / dataframe['close']
 
         # 거래량 지표
-        dataframe['volume_sma'] = ta.SMA(dataframe['volume'], timeperiod=20)
         dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
 
-        # 모멘텀 지표
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
-        dataframe['cci'] = ta.CCI(dataframe, timeperiod=20)
-
-        # 자금조달료 지표 (실제 데이터)
-        dataframe['funding_score'] = self._calculate_funding_score(metadata['pair'])
+        # 자금조달료 지표 (캔들별 히스토리 as-of 병합)
+        dataframe['funding_score'] = self._calculate_funding_score(dataframe, metadata['pair'])
 
         # 리스크 지표
         dataframe['risk_score'] = self._calculate_risk_score(dataframe)
 
+        # 콜백용 마지막 캔들 지표 게시 (객체 교체로 갱신)
+        latest = LatestCandle.from_dataframe(dataframe)
+        if latest is not None:
+            self._latest_candles[metadata['pair']] = latest
+
+        return dataframe
+
+    def indicator_spec(self) -> Dict[str, Indicator]:
+        """TA-Lib 지표 명세 (컬럼명 -> 지표)"""
+        bb_params = dict(timeperiod=self.bb_period.value,
+                         nbdevup=self.bb_deviation.value, nbdevdn=self.bb_deviation.value)
+
+        return {
+            # 기본 기술적 지표
+            'rsi': indicator('RSI', timeperiod=self.rsi_period.value),
+            'rsi_short': indicator('RSI', timeperiod=7),
+            'rsi_long': indicator('RSI', timeperiod=21),
+
+            # 볼린저밴드
+            'bb_upper': indicator('BBANDS', 'upperband', **bb_params),
+            'bb_middle': indicator('BBANDS', 'middleband', **bb_params),
+            'bb_lower': indicator('BBANDS', 'lowerband', **bb_params),
+
+            # 이동평균선
+            'ema_12': indicator('EMA', timeperiod=12),
+            'ema_26': indicator('EMA', timeperiod=26),
+            'ema_50': indicator('EMA', timeperiod=50),
+
+            # MACD
+            'macd': indicator('MACD', 'macd', **MACD_DEFAULTS),
+            'macd_signal': indicator('MACD', 'macdsignal', **MACD_DEFAULTS),
+            'macd_histogram': indicator('MACD', 'macdhist', **MACD_DEFAULTS),
+
+            # 변동성/거래량 지표
+            'atr': indicator('ATR', timeperiod=14),
+            'volume_sma': indicator('SMA', timeperiod=20, price='volume'),
+
+            # 모멘텀 지표
+            'adx': indicator('ADX', timeperiod=14),
+            'cci': indicator('CCI', timeperiod=20),
+        }
+
+    def _populate_band_features(self, dataframe: DataFrame) -> DataFrame:
+        """볼린저밴드 파생 지표"""
+        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
+        dataframe['bb_percent'] = (dataframe['close'] - dataframe['bb_lower']) / \
+                                 (dataframe['bb_upper'] - dataframe['bb_lower'])
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -157,62 +221,67 @@ class AdvancedFuturesStrategy(IStrategy):
 
         pair = metadata['pair']
 
+        # 하이퍼옵트 에포크: 현재 파라미터 값의 RSI/볼밴 컬럼 선택 (청산 신호도 같은 데이터프레임 사용)
+        if is_hyperopt_mode(getattr(self, 'dp', None)) and self._apply_indicator_cube(dataframe, pair):
+            dataframe = self._populate_band_features(dataframe)
+            dataframe['risk_score'] = self._calculate_risk_score(dataframe)
+
         # 롱 진입 조건
-        long_conditions = [
+        long_conditions = {
             # 기본 기술적 조건
-            (dataframe['rsi'] < self.rsi_oversold.value),
-            (dataframe['rsi_short'] < self.rsi_oversold.value + 10),
-            (dataframe['close'] <= dataframe['bb_lower'] * 1.01),
-            (dataframe['bb_percent'] < 0.2),
+            'rsi_oversold': (dataframe['rsi'] < self.rsi_oversold.value),
+            'rsi_short_oversold': (dataframe['rsi_short'] < self.rsi_oversold.value + 10),
+            'near_bb_lower': (dataframe['close'] <= dataframe['bb_lower'] * 1.01),
+            'bb_percent_low': (dataframe['bb_percent'] < 0.2),
 
             # 트렌드 조건
-            (dataframe['macd'] > dataframe['macd_signal']),
-            (dataframe['ema_12'] > dataframe['ema_26']),
+            'macd_bullish': (dataframe['macd'] > dataframe['macd_signal']),
+            'ema_uptrend': (dataframe['ema_12'] > dataframe['ema_26']),
 
             # 거래량 조건
-            (dataframe['volume_ratio'] > 1.2),
+            'volume_surge': (dataframe['volume_ratio'] > 1.2),
 
             # 변동성 조건
-            (dataframe['volatility'] > 0.01),
-            (dataframe['volatility'] < 0.08),
+            'volatility_min': (dataframe['volatility'] > 0.01),
+            'volatility_max': (dataframe['volatility'] < 0.08),
 
             # 자금조달료 조건
-            (dataframe['funding_score'] >= 0.5),  # 롱에 유리
+            'funding_favorable': (dataframe['funding_score'] >= 0.5),  # 롱에 유리
 
             # 리스크 조건
-            (dataframe['risk_score'] < 7),
-        ]
+            'risk_ok': (dataframe['risk_score'] < 7),
+        }
 
         # 숏 진입 조건
-        short_conditions = [
+        short_conditions = {
             # 기본 기술적 조건
-            (dataframe['rsi'] > self.rsi_overbought.value),
-            (dataframe['rsi_short'] > self.rsi_overbought.value - 10),
-            (dataframe['close'] >= dataframe['bb_upper'] * 0.99),
-            (dataframe['bb_percent'] > 0.8),
+            'rsi_overbought': (dataframe['rsi'] > self.rsi_overbought.value),
+            'rsi_short_overbought': (dataframe['rsi_short'] > self.rsi_overbought.value - 10),
+            'near_bb_upper': (dataframe['close'] >= dataframe['bb_upper'] * 0.99),
+            'bb_percent_high': (dataframe['bb_percent'] > 0.8),
 
             # 트렌드 조건
-            (dataframe['macd'] < dataframe['macd_signal']),
-            (dataframe['ema_12'] < dataframe['ema_26']),
+            'macd_bearish': (dataframe['macd'] < dataframe['macd_signal']),
+            'ema_downtrend': (dataframe['ema_12'] < dataframe['ema_26']),
 
             # 거래량 조건
-            (dataframe['volume_ratio'] > 1.2),
+            'volume_surge': (dataframe['volume_ratio'] > 1.2),
 
             # 변동성 조건
-            (dataframe['volatility'] > 0.01),
-            (dataframe['volatility'] < 0.08),
+            'volatility_min': (dataframe['volatility'] > 0.01),
+            'volatility_max': (dataframe['volatility'] < 0.08),
 
             # 자금조달료 조건
-            (dataframe['funding_score'] <= -0.5),  # 숏에 유리
+            'funding_favorable': (dataframe['funding_score'] <= -0.5),  # 숏에 유리
 
             # 리스크 조건
-            (dataframe['risk_score'] < 7),
-        ]
+            'risk_ok': (dataframe['risk_score'] < 7),
+        }
 
         # 추가 안전 검사
         if self._is_safe_to_enter(pair):
-            dataframe.loc[self._combine_conditions(long_conditions), 'enter_long'] = 1
-            dataframe.loc[self._combine_conditions(short_conditions), 'enter_short'] = 1
+            dataframe.loc[self._combine_conditions(dataframe, pair, 'enter_long', long_conditions), 'enter_long'] = 1
+            dataframe.loc[self._combine_conditions(dataframe, pair, 'enter_short', short_conditions), 'enter_short'] = 1
 
         return dataframe
 
@@ -220,25 +289,28 @@ class AdvancedFuturesStrategy(IStrategy):
         """청산 신호 생성"""
 
         # 롱 청산 - 다양한 청산 조건
-        long_exit_conditions = [
-            (dataframe['rsi'] > 70),
-            (dataframe['bb_percent'] > 0.8),
-            (dataframe['macd'] < dataframe['macd_signal']),
-            (dataframe['close'] > dataframe['bb_upper']),
-            (dataframe['risk_score'] > 8),
-        ]
+        long_exit_conditions = {
+            'rsi_high': (dataframe['rsi'] > 70),
+            'bb_percent_high': (dataframe['bb_percent'] > 0.8),
+            'macd_bearish': (dataframe['macd'] < dataframe['macd_signal']),
+            'above_bb_upper': (dataframe['close'] > dataframe['bb_upper']),
+            'risk_high': (dataframe['risk_score'] > 8),
+        }
 
         # 숏 청산
-        short_exit_conditions = [
-            (dataframe['rsi'] < 30),
-            (dataframe['bb_percent'] < 0.2),
-            (dataframe['macd'] > dataframe['macd_signal']),
-            (dataframe['close'] < dataframe['bb_lower']),
-            (dataframe['risk_score'] > 8),
-        ]
+        short_exit_conditions = {
+            'rsi_low': (dataframe['rsi'] < 30),
+            'bb_percent_low': (dataframe['bb_percent'] < 0.2),
+            'macd_bullish': (dataframe['macd'] > dataframe['macd_signal']),
+            'below_bb_lower': (dataframe['close'] < dataframe['bb_lower']),
+            'risk_high': (dataframe['risk_score'] > 8),
+        }
 
-        dataframe.loc[self._combine_conditions(long_exit_conditions, any_condition=True), 'exit_long'] = 1
-        dataframe.loc[self._combine_conditions(short_exit_conditions, any_condition=True), 'exit_short'] = 1
+        pair = metadata['pair']
+        dataframe.loc[self._combine_conditions(dataframe, pair, 'exit_long', long_exit_conditions,
+                                               any_condition=True), 'exit_long'] = 1
+        dataframe.loc[self._combine_conditions(dataframe, pair, 'exit_short', short_exit_conditions,
+                                               any_condition=True), 'exit_short'] = 1
 
         return dataframe
 
@@ -255,12 +327,12 @@ class AdvancedFuturesStrategy(IStrategy):
             balance = self.wallets.get_total_stake_amount()
 
             # 현재 데이터
-            dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-            if len(dataframe) == 0:
+            latest = self._get_latest_candle(pair)
+            if latest is None:
                 return min_stake
 
-            current_volatility = dataframe['volatility'].iloc[-1]
-            risk_score = dataframe['risk_score'].iloc[-1]
+            current_volatility = latest.volatility
+            risk_score = latest.risk_score
 
             # 레버리지 최적화
             leverage_rec = self.leverage_manager.calculate_optimal_leverage(pair, side)
@@ -353,13 +425,13 @@ class AdvancedFuturesStrategy(IStrategy):
         """최적 진입가 계산"""
 
         try:
-            dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-            if len(dataframe) == 0:
+            latest = self._get_latest_candle(pair)
+            if latest is None:
                 return proposed_rate
 
-            bb_upper = dataframe['bb_upper'].iloc[-1]
-            bb_lower = dataframe['bb_lower'].iloc[-1]
-            bb_middle = dataframe['bb_middle'].iloc[-1]
+            bb_upper = latest.bb_upper
+            bb_lower = latest.bb_lower
+            bb_middle = latest.bb_middle
 
             if side == "long":
                 # 롱: 중간선과 하단 사이에서 진입
@@ -413,19 +485,54 @@ class AdvancedFuturesStrategy(IStrategy):
             return True  # 에러시 진입 허용
 
     # 헬퍼 메서드들
-    def _calculate_funding_score(self, pair: str) -> pd.Series:
+    def _get_latest_candle(self, pair: str) -> Optional[LatestCandle]:
+        """마지막 캔들 지표 (라이브: 게시된 스냅샷, 백테스트: 현재 시점 데이터프레임)"""
+        if self._is_live_mode():
+            latest = self._latest_candles.get(pair)
+            if latest is not None:
+                return latest
+
+        # 백테스트는 populate_indicators 가 전체 구간을 한 번에 계산하므로 현재 시점 기준으로 조회
+        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+        return LatestCandle.from_dataframe(dataframe)
+
+    def _is_live_mode(self) -> bool:
+        """실거래/드라이런 여부"""
+        return is_live_mode(getattr(self, 'dp', None))
+
+    def _get_funding_rates(self, dataframe: DataFrame, pair: str) -> np.ndarray:
+        """캔들별 자금조달료 (히스토리 as-of 병합, 실거래시 최신 값 반영)"""
+        store = get_funding_history_store(self.config)
+        live = self._is_live_mode() and self.funding_manager is not None
+
+        # 실거래: 새 정산분만 증분 동기화
+        if live and store.needs_sync(pair, int(time.time() * 1000)):
+            store.sync_from_exchange(pair, self.funding_manager.exchange)
+
+        rates = store.merge_asof(pair, dataframe['date'], default=0.0)
+
+        # 실거래: 마지막 정산 이후 캔들은 현재(예상) 자금조달료 사용
+        if live:
+            funding_data = self.funding_manager.get_current_funding_rate(pair)
+            if funding_data:
+                last_time = store.last_funding_time(pair)
+                if last_time is None:
+                    rates[:] = funding_data.funding_rate
+                else:
+                    candle_times = store.to_epoch_ms(dataframe['date'])
+                    rates[candle_times >= last_time] = funding_data.funding_rate
+
+        return rates
+
+    def _calculate_funding_score(self, dataframe: DataFrame, pair: str) -> pd.Series:
         """자금조달료 점수 계산"""
         try:
-            if self.funding_manager:
-                funding_data = self.funding_manager.get_current_funding_rate(pair)
-                if funding_data:
-                    rate = funding_data.funding_rate
-                    # -1 ~ 1 점수로 변환 (음수=롱유리, 양수=숏유리)
-                    score = np.tanh(rate * 1000)  # -1 ~ 1 범위로 스케일링
-                    return pd.Series([score] * 1000)
-        except:
-            pass
-        return pd.Series([0] * 1000)
+            rates = self._get_funding_rates(dataframe, pair)
+            # -1 ~ 1 점수로 변환 (음수=롱유리, 양수=숏유리)
+            return pd.Series(np.tanh(rates * 1000), index=dataframe.index)
+        except Exception as e:
+            logger.error(f"❌ Funding score calculation failed for {pair}: {e}")
+        return pd.Series(0.0, index=dataframe.index)
 
     def _calculate_risk_score(self, dataframe: DataFrame) -> pd.Series:
         """리스크 점수 계산 (1-10)"""
@@ -469,12 +576,12 @@ class AdvancedFuturesStrategy(IStrategy):
             if not self.position_manager:
                 return 0.0
 
-            positions = self.position_manager.get_position_info()
+            snapshot = self.position_manager.get_snapshot()
+            positions = snapshot.positions
             if not positions:
                 return 0.0
 
-            account_balance = self.position_manager.get_account_balance()
-            total_balance = account_balance.get('total_wallet_balance', 1)
+            total_balance = snapshot.account.get('total_wallet_balance', 1)
 
             total_exposure = 0
             for position in positions:
@@ -504,19 +611,12 @@ class AdvancedFuturesStrategy(IStrategy):
         except:
             return False
 
-    def _combine_conditions(self, conditions: list, any_condition: bool = False) -> pd.Series:
-        """조건들을 결합"""
-        if not conditions:
-            return pd.Series([False] * 1000)
-
-        result = conditions[0]
-        for condition in conditions[1:]:
-            if any_condition:
-                result = result | condition  # OR 연산
-            else:
-                result = result & condition  # AND 연산
-
-        return result
+    def _combine_conditions(self, dataframe: DataFrame, pair: str, signal: str,
+                            conditions: Dict[str, pd.Series], any_condition: bool = False) -> np.ndarray:
+        """이름 붙은 조건들을 결합 (AND, any_condition=True 이면 OR) - 조건별 통계 기록"""
+        return self.signal_compiler.evaluate(
+            dataframe, conditions, f"{self.__class__.__name__}.{signal}", pair, any_condition
+        )
 
     def informative_pairs(self):
         """추가 정보성 페어"""
@@ -16,8 +16,15 @@ import pandas as pd
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 import talib.abstract as ta
 from pandas import DataFrame
-from typing import Optional
+from typing import Dict, Optional
 import logging
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
+from funding_history_store import get_funding_history_store
+from indicator_engine import Indicator, MACD_DEFAULTS, get_indicator_engine, indicator, is_live_mode
+from signal_compiler import get_signal_compiler
 
 logger = logging.getLogger(__name__)
 
@@ -55,75 +62,92 @@ class FuturesAIRiskStrategy(IStrategy):
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """선물거래 특화 지표 생성"""
 
-        # 기본 지표
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period.value)
-        dataframe['ema_fast'] = ta.EMA(dataframe, timeperiod=12)
-        dataframe['ema_slow'] = ta.EMA(dataframe, timeperiod=26)
+        # 기술적 지표 (공용 엔진, 페어/캔들 단위 캐시)
+        dataframe = get_indicator_engine().populate(
+            dataframe, metadata['pair'], self.indicator_spec(), self.timeframe,
+            incremental=is_live_mode(getattr(self, 'dp', None))
+        )
 
         # 변동성 지표 (레버리지 계산용)
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
         dataframe['volatility'] = dataframe['atr'] / dataframe['close']
 
-        # 볼린저밴드
-        bb = ta.BBANDS(dataframe, timeperiod=self.bb_period.value,
-                       nbdevup=self.bb_std.value, nbdevdn=self.bb_std.value)
-        dataframe['bb_upper'] = bb['upperband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_lower'] = bb['lowerband']
+        # 볼린저밴드 파생 지표
         dataframe['bb_percent'] = (dataframe['close'] - dataframe['bb_lower']) / \
                                  (dataframe['bb_upper'] - dataframe['bb_lower'])
         dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / \
                                dataframe['bb_middle']
 
         # 거래량 지표
-        dataframe['volume_sma'] = ta.SMA(dataframe['volume'], timeperiod=20)
         dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
 
-        # 추세 지표
-        dataframe['macd'] = ta.MACD(dataframe)['macd']
-        dataframe['macd_signal'] = ta.MACD(dataframe)['macdsignal']
-        dataframe['macd_histogram'] = ta.MACD(dataframe)['macdhist']
-
         # 선물거래 특화 지표 (모의)
-        dataframe['funding_rate'] = self._get_funding_rate_indicator(metadata['pair'])
+        dataframe['funding_rate'] = self._get_funding_rate_indicator(dataframe, metadata['pair'])
         dataframe['mark_price'] = dataframe['close']  # 실제로는 API에서 가져와야 함
 
         return dataframe
 
+    def indicator_spec(self) -> Dict[str, Indicator]:
+        """TA-Lib 지표 명세 (컬럼명 -> 지표)"""
+        bb_params = dict(timeperiod=self.bb_period.value,
+                         nbdevup=self.bb_std.value, nbdevdn=self.bb_std.value)
+
+        return {
+            # 기본 지표
+            'rsi': indicator('RSI', timeperiod=self.rsi_period.value),
+            'ema_fast': indicator('EMA', timeperiod=12),
+            'ema_slow': indicator('EMA', timeperiod=26),
+
+            # 변동성 지표
+            'atr': indicator('ATR', timeperiod=14),
+
+            # 볼린저밴드
+            'bb_upper': indicator('BBANDS', 'upperband', **bb_params),
+            'bb_middle': indicator('BBANDS', 'middleband', **bb_params),
+            'bb_lower': indicator('BBANDS', 'lowerband', **bb_params),
+
+            # 거래량 지표
+            'volume_sma': indicator('SMA', timeperiod=20, price='volume'),
+
+            # 추세 지표
+            'macd': indicator('MACD', 'macd', **MACD_DEFAULTS),
+            'macd_signal': indicator('MACD', 'macdsignal', **MACD_DEFAULTS),
+            'macd_histogram': indicator('MACD', 'macdhist', **MACD_DEFAULTS),
+        }
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """AI 기반 진입 신호 (롱/숏)"""
 
         # 롱 진입 조건 - RSI 과매도 + 볼밴 하단 + 상승 추세
-        long_conditions = [
-            (dataframe['rsi'] < 30),  # RSI 과매도
-            (dataframe['close'] <= dataframe['bb_lower']),  # 볼밴 하단
-            (dataframe['bb_percent'] < 0.2),  # 하위 20% 구간
-            (dataframe['volume_ratio'] > 1.2),  # 거래량 증가
-            (dataframe['volatility'] < self.volatility_threshold.value),  # 변동성 적정
-            (dataframe['ema_fast'] > dataframe['ema_slow']),  # 상승 추세
-            (dataframe['macd'] > dataframe['macd_signal']),  # MACD 상승
-            (dataframe['bb_width'] > 0.02),  # 충분한 변동성
-        ]
+        long_conditions = {
+            'rsi_oversold': (dataframe['rsi'] < 30),  # RSI 과매도
+            'at_bb_lower': (dataframe['close'] <= dataframe['bb_lower']),  # 볼밴 하단
+            'bb_percent_low': (dataframe['bb_percent'] < 0.2),  # 하위 20% 구간
+            'volume_surge': (dataframe['volume_ratio'] > 1.2),  # 거래량 증가
+            'volatility_ok': (dataframe['volatility'] < self.volatility_threshold.value),  # 변동성 적정
+            'ema_uptrend': (dataframe['ema_fast'] > dataframe['ema_slow']),  # 상승 추세
+            'macd_bullish': (dataframe['macd'] > dataframe['macd_signal']),  # MACD 상승
+            'bb_width_min': (dataframe['bb_width'] > 0.02),  # 충분한 변동성
+        }
 
         dataframe.loc[
-            self._combine_conditions(long_conditions),
+            self._combine_conditions(dataframe, metadata['pair'], 'enter_long', long_conditions),
             'enter_long'
         ] = 1
 
         # 숏 진입 조건 - RSI 과매수 + 볼밴 상단 + 하락 추세
-        short_conditions = [
-            (dataframe['rsi'] > 70),  # RSI 과매수
-            (dataframe['close'] >= dataframe['bb_upper']),  # 볼밴 상단
-            (dataframe['bb_percent'] > 0.8),  # 상위 80% 구간
-            (dataframe['volume_ratio'] > 1.2),  # 거래량 증가
-            (dataframe['volatility'] < self.volatility_threshold.value),  # 변동성 적정
-            (dataframe['ema_fast'] < dataframe['ema_slow']),  # 하락 추세
-            (dataframe['macd'] < dataframe['macd_signal']),  # MACD 하락
-            (dataframe['bb_width'] > 0.02),  # 충분한 변동성
-        ]
+        short_conditions = {
+            'rsi_overbought': (dataframe['rsi'] > 70),  # RSI 과매수
+            'at_bb_upper': (dataframe['close'] >= dataframe['bb_upper']),  # 볼밴 상단
+            'bb_percent_high': (dataframe['bb_percent'] > 0.8),  # 상위 80% 구간
+            'volume_surge': (dataframe['volume_ratio'] > 1.2),  # 거래량 증가
+            'volatility_ok': (dataframe['volatility'] < self.volatility_threshold.value),  # 변동성 적정
+            'ema_downtrend': (dataframe['ema_fast'] < dataframe['ema_slow']),  # 하락 추세
+            'macd_bearish': (dataframe['macd'] < dataframe['macd_signal']),  # MACD 하락
+            'bb_width_min': (dataframe['bb_width'] > 0.02),  # 충분한 변동성
+        }
 
         dataframe.loc[
-            self._combine_conditions(short_conditions),
+            self._combine_conditions(dataframe, metadata['pair'], 'enter_short', short_conditions),
             'enter_short'
         ] = 1
 
@@ -133,24 +157,30 @@ class FuturesAIRiskStrategy(IStrategy):
         """AI 기반 청산 신호"""
 
         # 롱 청산 - RSI 회복 또는 볼밴 중간선 도달
+        long_exit_conditions = {
+            'rsi_recovered': (dataframe['rsi'] > 60),
+            'above_bb_middle': (dataframe['close'] > dataframe['bb_middle']),
+            'bb_percent_high': (dataframe['bb_percent'] > 0.6),
+            'macd_bearish': (dataframe['macd'] < dataframe['macd_signal']),
+        }
+
         dataframe.loc[
-            (
-                (dataframe['rsi'] > 60) |
-                (dataframe['close'] > dataframe['bb_middle']) |
-                (dataframe['bb_percent'] > 0.6) |
-                (dataframe['macd'] < dataframe['macd_signal'])
-            ),
+            self._combine_conditions(dataframe, metadata['pair'], 'exit_long', long_exit_conditions,
+                                     any_condition=True),
             'exit_long'
         ] = 1
 
         # 숏 청산 - RSI 하락 또는 볼밴 중간선 도달
+        short_exit_conditions = {
+            'rsi_dropped': (dataframe['rsi'] < 40),
+            'below_bb_middle': (dataframe['close'] < dataframe['bb_middle']),
+            'bb_percent_low': (dataframe['bb_percent'] < 0.4),
+            'macd_bullish': (dataframe['macd'] > dataframe['macd_signal']),
+        }
+
         dataframe.loc[
-            (
-                (dataframe['rsi'] < 40) |
-                (dataframe['close'] < dataframe['bb_middle']) |
-                (dataframe['bb_percent'] < 0.4) |
-                (dataframe['macd'] > dataframe['macd_signal'])
-            ),
+            self._combine_conditions(dataframe, metadata['pair'], 'exit_short', short_exit_conditions,
+                                     any_condition=True),
             'exit_short'
         ] = 1
 
@@ -261,21 +291,23 @@ class FuturesAIRiskStrategy(IStrategy):
         else:                      # 저변동성 (<2%)
             return min(8, self.max_leverage.value)
 
-    def _combine_conditions(self, conditions: list) -> DataFrame:
-        """조건들을 AND로 결합"""
-        if not conditions:
-            return pd.Series([False] * len(conditions[0]), index=conditions[0].index)
-
-        result = conditions[0]
-        for condition in conditions[1:]:
-            result = result & condition
-        return result
-
-    def _get_funding_rate_indicator(self, pair: str) -> DataFrame:
-        """자금 조달 수수료 지표 생성 (모의)"""
-        # 실제 구현에서는 exchange API에서 가져와야 함
-        # 현재는 모의 데이터로 0.001% 고정값 사용
-        return pd.Series([0.001] * 1000)
+    def _combine_conditions(self, dataframe: DataFrame, pair: str, signal: str,
+                            conditions: Dict[str, pd.Series], any_condition: bool = False) -> np.ndarray:
+        """이름 붙은 조건들을 결합 (AND, any_condition=True 이면 OR) - 조건별 통계 기록"""
+        return get_signal_compiler().evaluate(
+            dataframe, conditions, f"{self.__class__.__name__}.{signal}", pair, any_condition
+        )
+
+    def _get_funding_rate_indicator(self, dataframe: DataFrame, pair: str) -> pd.Series:
+        """자금 조달 수수료 지표 생성 (히스토리 as-of 병합)"""
+        # 히스토리가 없는 구간은 기존 모의값 0.001 사용
+        try:
+            store = get_funding_history_store(self.config)
+            rates = store.merge_asof(pair, dataframe['date'], default=0.001)
+            return pd.Series(rates, index=dataframe.index)
+        except Exception as e:
+            logger.error(f"Funding rate indicator failed for {pair}: {e}")
+            return pd.Series(0.001, index=dataframe.index)
 
     def informative_pairs(self):
         """추가 정보성 페어 (선택사항)"""
@@ -16,13 +16,22 @@ import pandas as pd
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 import talib.abstract as ta
 from pandas import DataFrame
-from typing import Optional
+from typing import Dict, Optional
 import logging
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
+from funding_history_store import get_funding_history_store
+from indicator_engine import (Indicator, MACD_DEFAULTS, get_indicator_engine, indicator,
+                              is_hyperopt_mode, is_live_mode)
+from indicator_cube import IndicatorCubeMixin
+from signal_compiler import get_signal_compiler
 
 logger = logging.getLogger(__name__)
 
 
-class RossCameronFuturesStrategy(IStrategy):
+class RossCameronFuturesStrategy(IndicatorCubeMixin, IStrategy):
     """로스 카메론 RSI 전략 - 선물거래 최적화"""
 
     # 전략 메타데이터
@@ -55,102 +64,127 @@ class RossCameronFuturesStrategy(IStrategy):
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """로스 카메론 지표 + 선물거래 특화"""
 
-        # 로스 카메론 핵심 지표
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.rsi_period.value)
-        dataframe['rsi_7'] = ta.RSI(dataframe, timeperiod=7)   # 단기 RSI
-        dataframe['rsi_21'] = ta.RSI(dataframe, timeperiod=21) # 장기 RSI
-
-        # 볼린저밴드 (동적 편차)
-        bb = ta.BBANDS(dataframe, timeperiod=self.bb_period.value,
-                       nbdevup=self.bb_deviation.value, nbdevdn=self.bb_deviation.value)
-        dataframe['bb_upper'] = bb['upperband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_lower'] = bb['lowerband']
-        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
-        dataframe['bb_percent'] = (dataframe['close'] - dataframe['bb_lower']) / \
-                                 (dataframe['bb_upper'] - dataframe['bb_lower'])
+        # 기술적 지표 (공용 엔진, 페어/캔들 단위 캐시)
+        # 하이퍼옵트: RSI/볼밴 파라미터 범위 전체를 페어당 한 번만 계산 (지표 큐브)
+        dataframe = self._populate_with_cube(
+            get_indicator_engine(), dataframe, metadata['pair'], self.indicator_spec(),
+            incremental=is_live_mode(getattr(self, 'dp', None))
+        )
 
-        # 이동평균선 (트렌드 확인)
-        dataframe['ema_9'] = ta.EMA(dataframe, timeperiod=9)
-        dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
+        # 볼린저밴드 파생 지표
+        dataframe = self._populate_band_features(dataframe)
 
-        # 거래량 분석
-        dataframe['volume_sma'] = ta.SMA(dataframe['volume'], timeperiod=20)
+        # 거래량/변동성 파생 지표
         dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
-
-        # 변동성 지표 (레버리지 계산용)
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
         dataframe['volatility'] = dataframe['atr'] / dataframe['close']
 
-        # MACD (추세 확인)
-        macd = ta.MACD(dataframe)
-        dataframe['macd'] = macd['macd']
-        dataframe['macd_signal'] = macd['macdsignal']
-        dataframe['macd_histogram'] = macd['macdhist']
-
         # 선물거래 특화 지표
-        dataframe['funding_rate'] = self._get_funding_rate_indicator(metadata['pair'])
+        dataframe['funding_rate'] = self._get_funding_rate_indicator(dataframe, metadata['pair'])
         dataframe['mark_price'] = dataframe['close']  # 실제로는 API에서 가져와야 함
 
         return dataframe
 
+    def indicator_spec(self) -> Dict[str, Indicator]:
+        """TA-Lib 지표 명세 (컬럼명 -> 지표)"""
+        bb_params = dict(timeperiod=self.bb_period.value,
+                         nbdevup=self.bb_deviation.value, nbdevdn=self.bb_deviation.value)
+
+        return {
+            # 로스 카메론 핵심 지표
+            'rsi': indicator('RSI', timeperiod=self.rsi_period.value),
+            'rsi_7': indicator('RSI', timeperiod=7),    # 단기 RSI
+            'rsi_21': indicator('RSI', timeperiod=21),  # 장기 RSI
+
+            # 볼린저밴드 (동적 편차)
+            'bb_upper': indicator('BBANDS', 'upperband', **bb_params),
+            'bb_middle': indicator('BBANDS', 'middleband', **bb_params),
+            'bb_lower': indicator('BBANDS', 'lowerband', **bb_params),
+
+            # 이동평균선 (트렌드 확인)
+            'ema_9': indicator('EMA', timeperiod=9),
+            'ema_20': indicator('EMA', timeperiod=20),
+            'ema_50': indicator('EMA', timeperiod=50),
+
+            # 거래량 분석
+            'volume_sma': indicator('SMA', timeperiod=20, price='volume'),
+
+            # 변동성 지표 (레버리지 계산용)
+            'atr': indicator('ATR', timeperiod=14),
+
+            # MACD (추세 확인)
+            'macd': indicator('MACD', 'macd', **MACD_DEFAULTS),
+            'macd_signal': indicator('MACD', 'macdsignal', **MACD_DEFAULTS),
+            'macd_histogram': indicator('MACD', 'macdhist', **MACD_DEFAULTS),
+        }
+
+    def _populate_band_features(self, dataframe: DataFrame) -> DataFrame:
+        """볼린저밴드 파생 지표"""
+        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
+        dataframe['bb_percent'] = (dataframe['close'] - dataframe['bb_lower']) / \
+                                 (dataframe['bb_upper'] - dataframe['bb_lower'])
+        return dataframe
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """로스 카메론 진입 신호 (선물 최적화)"""
 
+        # 하이퍼옵트 에포크: 현재 파라미터 값의 RSI/볼밴 컬럼 선택 (청산 신호도 같은 데이터프레임 사용)
+        if is_hyperopt_mode(getattr(self, 'dp', None)) and \
+                self._apply_indicator_cube(dataframe, metadata['pair']):
+            dataframe = self._populate_band_features(dataframe)
+
         # 롱 진입 조건 - RSI 과매도 + 볼밴 하단 + 상승 모멘텀
-        long_conditions = [
+        long_conditions = {
             # 핵심 RSI 조건 (로스 카메론 스타일)
-            (dataframe['rsi'] < self.rsi_oversold.value),
-            (dataframe['rsi_7'] < self.rsi_oversold.value + 5),  # 단기 RSI도 과매도
+            'rsi_oversold': (dataframe['rsi'] < self.rsi_oversold.value),
+            'rsi_7_oversold': (dataframe['rsi_7'] < self.rsi_oversold.value + 5),  # 단기 RSI도 과매도
 
             # 볼린저밴드 조건 (반전 신호)
-            (dataframe['close'] <= dataframe['bb_lower'] * 1.01),  # 하단 근처
-            (dataframe['bb_percent'] < 0.2),  # 하위 20% 구간
+            'near_bb_lower': (dataframe['close'] <= dataframe['bb_lower'] * 1.01),  # 하단 근처
+            'bb_percent_low': (dataframe['bb_percent'] < 0.2),  # 하위 20% 구간
 
             # 거래량 확인 (돌파력 확인)
-            (dataframe['volume_ratio'] > 1.1),  # 평균 대비 10% 이상
+            'volume_surge': (dataframe['volume_ratio'] > 1.1),  # 평균 대비 10% 이상
 
             # 변동성 필터 (너무 높은 변동성 제외)
-            (dataframe['volatility'] < 0.08),  # 8% 미만
+            'volatility_max': (dataframe['volatility'] < 0.08),  # 8% 미만
 
             # 볼밴 폭 확인 (충분한 변동성)
-            (dataframe['bb_width'] > 0.015),  # 1.5% 이상
+            'bb_width_min': (dataframe['bb_width'] > 0.015),  # 1.5% 이상
 
             # 선물거래 특화 조건
-            (dataframe['funding_rate'] <= 0.001),  # 높은 양의 자금조달료 제외
-        ]
+            'funding_ok': (dataframe['funding_rate'] <= 0.001),  # 높은 양의 자금조달료 제외
+        }
 
         dataframe.loc[
-            self._combine_conditions(long_conditions),
+            self._combine_conditions(dataframe, metadata['pair'], 'enter_long', long_conditions),
             'enter_long'
         ] = 1
 
         # 숏 진입 조건 - RSI 과매수 + 볼밴 상단 + 하락 모멘텀
-        short_conditions = [
+        short_conditions = {
             # 핵심 RSI 조건
-            (dataframe['rsi'] > self.rsi_overbought.value),
-            (dataframe['rsi_7'] > self.rsi_overbought.value - 5),  # 단기 RSI도 과매수
+            'rsi_overbought': (dataframe['rsi'] > self.rsi_overbought.value),
+            'rsi_7_overbought': (dataframe['rsi_7'] > self.rsi_overbought.value - 5),  # 단기 RSI도 과매수
 
             # 볼린저밴드 조건
-            (dataframe['close'] >= dataframe['bb_upper'] * 0.99),  # 상단 근처
-            (dataframe['bb_percent'] > 0.8),  # 상위 80% 구간
+            'near_bb_upper': (dataframe['close'] >= dataframe['bb_upper'] * 0.99),  # 상단 근처
+            'bb_percent_high': (dataframe['bb_percent'] > 0.8),  # 상위 80% 구간
 
             # 거래량 확인
-            (dataframe['volume_ratio'] > 1.1),
+            'volume_surge': (dataframe['volume_ratio'] > 1.1),
 
             # 변동성 필터
-            (dataframe['volatility'] < 0.08),
+            'volatility_max': (dataframe['volatility'] < 0.08),
 
             # 볼밴 폭 확인
-            (dataframe['bb_width'] > 0.015),
+            'bb_width_min': (dataframe['bb_width'] > 0.015),
 
             # 선물거래 특화 조건
-            (dataframe['funding_rate'] >= -0.001),  # 높은 음의 자금조달료 제외
-        ]
+            'funding_ok': (dataframe['funding_rate'] >= -0.001),  # 높은 음의 자금조달료 제외
+        }
 
         dataframe.loc[
-            self._combine_conditions(short_conditions),
+            self._combine_conditions(dataframe, metadata['pair'], 'enter_short', short_conditions),
             'enter_short'
         ] = 1
 
@@ -160,24 +194,30 @@ class RossCameronFuturesStrategy(IStrategy):
         """로스 카메론 청산 신호"""
 
         # 롱 청산 - RSI 회복 또는 목표 달성
+        long_exit_conditions = {
+            'rsi_recovered': (dataframe['rsi'] > 60),  # RSI 회복
+            'above_bb_middle': (dataframe['close'] > dataframe['bb_middle']),  # 중간선 돌파
+            'bb_percent_high': (dataframe['bb_percent'] > 0.6),  # 상위 구간 진입
+            'macd_bearish': (dataframe['macd'] < dataframe['macd_signal']),  # MACD 하락 전환
+        }
+
         dataframe.loc[
-            (
-                (dataframe['rsi'] > 60) |  # RSI 회복
-                (dataframe['close'] > dataframe['bb_middle']) |  # 중간선 돌파
-                (dataframe['bb_percent'] > 0.6) |  # 상위 구간 진입
-                (dataframe['macd'] < dataframe['macd_signal'])  # MACD 하락 전환
-            ),
+            self._combine_conditions(dataframe, metadata['pair'], 'exit_long', long_exit_conditions,
+                                     any_condition=True),
             'exit_long'
         ] = 1
 
         # 숏 청산 - RSI 하락 또는 목표 달성
+        short_exit_conditions = {
+            'rsi_dropped': (dataframe['rsi'] < 40),  # RSI 하락
+            'below_bb_middle': (dataframe['close'] < dataframe['bb_middle']),  # 중간선 하락
+            'bb_percent_low': (dataframe['bb_percent'] < 0.4),  # 하위 구간 진입
+            'macd_bullish': (dataframe['macd'] > dataframe['macd_signal']),  # MACD 상승 전환
+        }
+
         dataframe.loc[
-            (
-                (dataframe['rsi'] < 40) |  # RSI 하락
-                (dataframe['close'] < dataframe['bb_middle']) |  # 중간선 하락
-                (dataframe['bb_percent'] < 0.4) |  # 하위 구간 진입
-                (dataframe['macd'] > dataframe['macd_signal'])  # MACD 상승 전환
-            ),
+            self._combine_conditions(dataframe, metadata['pair'], 'exit_short', short_exit_conditions,
+                                     any_condition=True),
             'exit_short'
         ] = 1
 
@@ -306,21 +346,23 @@ class RossCameronFuturesStrategy(IStrategy):
         else:                      # 저변동성 (<2.5%)
             return 5
 
-    def _combine_conditions(self, conditions: list) -> DataFrame:
-        """조건들을 AND로 결합"""
-        if not conditions:
-            return pd.Series([False] * 1000)
-
-        result = conditions[0]
-        for condition in conditions[1:]:
-            result = result & condition
-        return result
-
-    def _get_funding_rate_indicator(self, pair: str) -> DataFrame:
-        """자금 조달 수수료 지표 생성 (모의)"""
-        # 실제 구현에서는 exchange API에서 가져와야 함
-        # 현재는 모의 데이터로 0.0005% 고정값 사용
-        return pd.Series([0.0005] * 1000)
+    def _combine_conditions(self, dataframe: DataFrame, pair: str, signal: str,
+                            conditions: Dict[str, pd.Series], any_condition: bool = False) -> np.ndarray:
+        """이름 붙은 조건들을 결합 (AND, any_condition=True 이면 OR) - 조건별 통계 기록"""
+        return get_signal_compiler().evaluate(
+            dataframe, conditions, f"{self.__class__.__name__}.{signal}", pair, any_condition
+        )
+
+    def _get_funding_rate_indicator(self, dataframe: DataFrame, pair: str) -> pd.Series:
+        """자금 조달 수수료 지표 생성 (히스토리 as-of 병합)"""
+        # 히스토리가 없는 구간은 기존 모의값 0.0005 사용
+        try:
+            store = get_funding_history_store(self.config)
+            rates = store.merge_asof(pair, dataframe['date'], default=0.0005)
+            return pd.Series(rates, index=dataframe.index)
+        except Exception as e:
+            logger.error(f"Funding rate indicator failed for {pair}: {e}")
+            return pd.Series(0.0005, index=dataframe.index)
 
     def custom_entry_price(self, pair: str, current_time, proposed_rate: float,
                           entry_tag: str, side: str, **kwargs) -> float:
@@ -15,8 +15,13 @@ import pandas as pd
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 import talib.abstract as ta
 from pandas import DataFrame
-from typing import Optional
+from typing import Dict, Optional
 import logging
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
+from indicator_engine import Indicator, get_indicator_engine, indicator, is_live_mode
 
 logger = logging.getLogger(__name__)
 
@@ -44,21 +49,29 @@ class SimpleFuturesStrategy(IStrategy):
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """간단한 지표 생성"""
 
-        # 기본 지표
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-
-        # 볼린저밴드
-        bb = ta.BBANDS(dataframe, timeperiod=20, nbdevup=2.0, nbdevdn=2.0)
-        dataframe['bb_upper'] = bb['upperband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_lower'] = bb['lowerband']
+        # 기본 지표 (공용 엔진, 페어/캔들 단위 캐시)
+        dataframe = get_indicator_engine().populate(
+            dataframe, metadata['pair'], self.indicator_spec(), self.timeframe,
+            incremental=is_live_mode(getattr(self, 'dp', None))
+        )
 
         # 변동성 (레버리지 계산용)
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
         dataframe['volatility'] = dataframe['atr'] / dataframe['close']
 
         return dataframe
 
+    def indicator_spec(self) -> Dict[str, Indicator]:
+        """TA-Lib 지표 명세 (컬럼명 -> 지표)"""
+        bb_params = dict(timeperiod=20, nbdevup=2.0, nbdevdn=2.0)
+
+        return {
+            'rsi': indicator('RSI', timeperiod=14),
+            'bb_upper': indicator('BBANDS', 'upperband', **bb_params),
+            'bb_middle': indicator('BBANDS', 'middleband', **bb_params),
+            'bb_lower': indicator('BBANDS', 'lowerband', **bb_params),
+            'atr': indicator('ATR', timeperiod=14),
+        }
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """간단한 진입 신호"""
 
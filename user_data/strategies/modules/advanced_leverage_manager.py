@@ -18,6 +18,8 @@ import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from ohlcv_cache import OHLCV_COLUMNS, get_ohlcv_cache, next_candle_close
+
 logger = logging.getLogger(__name__)
 
 class MarketCondition(Enum):
@@ -49,6 +51,24 @@ class LeverageRecommendation:
     confidence_score: float  # 0-1
     reasoning: str
 
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """롤링 표본 표준편차 (ddof=1), 완성된 윈도우만 반환 - O(n)"""
+
+    values = np.asarray(values, dtype=np.float64)
+    if window < 2 or len(values) < window:
+        return np.empty(0, dtype=np.float64)
+
+    # 평균을 빼서 누적합의 수치 오차 감소
+    centered = values - values.mean()
+    cumsum = np.concatenate(([0.0], np.cumsum(centered)))
+    cumsum_sq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    window_sum = cumsum[window:] - cumsum[:-window]
+    window_sum_sq = cumsum_sq[window:] - cumsum_sq[:-window]
+
+    variance = (window_sum_sq - window_sum * window_sum / window) / (window - 1)
+    return np.sqrt(np.maximum(variance, 0.0))
+
 class AdvancedLeverageManager:
     """고급 레버리지 관리"""
 
@@ -56,6 +76,18 @@ class AdvancedLeverageManager:
         self.position_manager = position_manager
         self.exchange = exchange
 
+        # 1시간 캔들 캐시 (변동성/시장 조건 분석 공용)
+        self.ohlcv_cache = get_ohlcv_cache(exchange)
+        self.ohlcv_timeframe = '1h'
+        self.ohlcv_history = 168  # 7일
+
+        # 롤링 변동성 히스토리 (캐시 버전/윈도우별 정렬 배열)
+        self._volatility_history: Dict[str, Tuple[int, int, np.ndarray]] = {}
+
+        # 추천 결과 캐시 (페어별 최신 1개, 다음 1시간 캔들 마감까지 유효)
+        # pair -> (만료 시각, 포트폴리오 노출도, 추천 결과)
+        self._recommendation_cache: Dict[str, Tuple[int, float, LeverageRecommendation]] = {}
+
         # 레버리지 제한 설정
         self.max_leverage_limits = {
             VolatilityLevel.VERY_LOW: 20,
@@ -77,66 +109,86 @@ class AdvancedLeverageManager:
 
     def calculate_optimal_leverage(self, pair: str, side: str = 'long',
                                  portfolio_exposure: float = 0.5) -> LeverageRecommendation:
-        """최적 레버리지 계산"""
+        """최적 레버리지 계산 (다음 캔들 마감까지 캐시)"""
+
+        exposure_key = round(portfolio_exposure, 4)
+        now_ms = int(datetime.now().timestamp() * 1000)
+
+        cached = self._recommendation_cache.get(pair)
+        if cached is not None and now_ms < cached[0] and cached[1] == exposure_key:
+            return cached[2]
 
         try:
-            # 1. 변동성 분석
-            volatility_data = self._analyze_volatility(pair)
-            volatility_level = self._classify_volatility(volatility_data['current_volatility'])
+            recommendation = self._compute_optimal_leverage(pair, portfolio_exposure)
+        except Exception as e:
+            logger.error(f"Leverage calculation failed for {pair}: {e}")
+            return self._get_fallback_recommendation(pair)
 
-            # 2. 시장 조건 분석
-            market_condition = self._analyze_market_condition(pair)
+        expires_at = next_candle_close(self.ohlcv_timeframe, now_ms)
+        # 페어별 최신 결과로 덮어씀 (노출도 값마다 항목이 쌓이지 않도록)
+        self._recommendation_cache[pair] = (expires_at, exposure_key, recommendation)
+        return recommendation
 
-            # 3. 기본 레버리지 계산
-            base_leverage = self.max_leverage_limits[volatility_level]
+    def _get_ohlcv(self, pair: str, limit: int) -> pd.DataFrame:
+        """캐시된 1시간 OHLCV 중 최근 limit 개"""
+        data = self.ohlcv_cache.get(pair, self.ohlcv_timeframe, max(limit, self.ohlcv_history))
+        return pd.DataFrame(data[-limit:], columns=OHLCV_COLUMNS)
 
-            # 4. 시장 조건 적용
-            market_multiplier = self.market_condition_multipliers[market_condition]
-            adjusted_leverage = int(base_leverage * market_multiplier)
+    def _compute_optimal_leverage(self, pair: str, portfolio_exposure: float) -> LeverageRecommendation:
+        """최적 레버리지 계산 (캐시 미사용)"""
 
-            # 5. 포트폴리오 노출도 고려
-            portfolio_adjustment = max(0.5, 1 - portfolio_exposure)
-            final_leverage = max(1, int(adjusted_leverage * portfolio_adjustment))
+        # 1. 변동성 분석
+        volatility_data = self._analyze_volatility(pair)
+        volatility_level = self._classify_volatility(volatility_data['current_volatility'])
 
-            # 6. 안전 한계 계산
-            max_safe_leverage = self._calculate_max_safe_leverage(pair, volatility_data)
+        # 2. 시장 조건 분석
+        market_condition = self._analyze_market_condition(pair)
 
-            # 7. 최종 추천값
-            recommended_leverage = min(final_leverage, max_safe_leverage)
+        # 3. 기본 레버리지 계산
+        base_leverage = self.max_leverage_limits[volatility_level]
 
-            # 8. 신뢰도 계산
-            confidence_score = self._calculate_confidence_score(
-                volatility_data, market_condition, portfolio_exposure
-            )
+        # 4. 시장 조건 적용
+        market_multiplier = self.market_condition_multipliers[market_condition]
+        adjusted_leverage = int(base_leverage * market_multiplier)
 
-            # 9. 추론 설명
-            reasoning = self._generate_reasoning(
-                volatility_level, market_condition, portfolio_exposure,
-                base_leverage, recommended_leverage
-            )
+        # 5. 포트폴리오 노출도 고려
+        portfolio_adjustment = max(0.5, 1 - portfolio_exposure)
+        final_leverage = max(1, int(adjusted_leverage * portfolio_adjustment))
 
-            return LeverageRecommendation(
-                symbol=pair,
-                current_leverage=self._get_current_leverage(pair),
-                recommended_leverage=recommended_leverage,
-                max_safe_leverage=max_safe_leverage,
-                volatility_level=volatility_level,
-                market_condition=market_condition,
-                confidence_score=confidence_score,
-                reasoning=reasoning
-            )
+        # 6. 안전 한계 계산
+        max_safe_leverage = self._calculate_max_safe_leverage(pair, volatility_data)
 
-        except Exception as e:
-            logger.error(f"Leverage calculation failed for {pair}: {e}")
-            return self._get_fallback_recommendation(pair)
+        # 7. 최종 추천값
+        recommended_leverage = min(final_leverage, max_safe_leverage)
+
+        # 8. 신뢰도 계산
+        confidence_score = self._calculate_confidence_score(
+            volatility_data, market_condition, portfolio_exposure
+        )
+
+        # 9. 추론 설명
+        reasoning = self._generate_reasoning(
+            volatility_level, market_condition, portfolio_exposure,
+            base_leverage, recommended_leverage
+        )
+
+        return LeverageRecommendation(
+            symbol=pair,
+            current_leverage=self._get_current_leverage(pair),
+            recommended_leverage=recommended_leverage,
+            max_safe_leverage=max_safe_leverage,
+            volatility_level=volatility_level,
+            market_condition=market_condition,
+            confidence_score=confidence_score,
+            reasoning=reasoning
+        )
 
     def _analyze_volatility(self, pair: str, periods: int = 24) -> Dict:
         """변동성 분석"""
 
         try:
             # 1시간 OHLCV 데이터 가져오기
-            ohlcv = self.exchange.fetch_ohlcv(pair, '1h', limit=periods * 2)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df = self._get_ohlcv(pair, periods * 2)
 
             # 수익률 계산
             df['returns'] = df['close'].pct_change()
@@ -169,7 +221,7 @@ class AdvancedLeverageManager:
                 'atr_volatility': atr_volatility,
                 'bb_width': bb_width,
                 'vol_trend': 'increasing' if current_volatility > rolling_vol_30d else 'decreasing',
-                'vol_percentile': self._calculate_volatility_percentile(df['returns'], current_volatility)
+                'vol_percentile': self._calculate_volatility_percentile(pair, current_volatility, periods)
             }
 
         except Exception as e:
@@ -195,8 +247,7 @@ class AdvancedLeverageManager:
 
         try:
             # 다양한 기간의 가격 데이터 분석
-            ohlcv = self.exchange.fetch_ohlcv(pair, '1h', limit=168)  # 7일
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df = self._get_ohlcv(pair, 168)  # 7일
 
             current_price = df['close'].iloc[-1]
 
@@ -256,24 +307,33 @@ class AdvancedLeverageManager:
         # 정수로 변환하고 최소 1, 최대 50 제한
         return max(1, min(int(safe_leverage), 50))
 
-    def _calculate_volatility_percentile(self, returns: pd.Series, current_vol: float) -> float:
-        """변동성 백분위 계산"""
+    def _get_volatility_history(self, pair: str, window: int) -> np.ndarray:
+        """정렬된 window 봉 롤링 변동성 히스토리 (OHLCV 캐시 갱신 시에만 재계산)"""
 
-        if len(returns) < 30:
-            return 0.5
+        version = self.ohlcv_cache.version(pair, self.ohlcv_timeframe)
+        cached = self._volatility_history.get(pair)
+        if cached is not None and cached[0] == version and cached[1] == window:
+            return cached[2]
+
+        data = self.ohlcv_cache.get(pair, self.ohlcv_timeframe, self.ohlcv_history)
+        version = self.ohlcv_cache.version(pair, self.ohlcv_timeframe)
+
+        closes = data[:, 4]
+        returns = closes[1:] / closes[:-1] - 1
+        history = np.sort(rolling_std(returns, window) * np.sqrt(24))  # 일일 변동성 단위
+
+        self._volatility_history[pair] = (version, window, history)
+        return history
 
-        # 30일 롤링 변동성 계산
-        rolling_vols = []
-        for i in range(30, len(returns)):
-            vol = returns.iloc[i-30:i].std()
-            rolling_vols.append(vol)
+    def _calculate_volatility_percentile(self, pair: str, current_vol: float, window: int) -> float:
+        """변동성 백분위 계산 (current_vol 과 같은 window 봉 롤링 변동성 중 순위)"""
 
-        if not rolling_vols:
+        history = self._get_volatility_history(pair, window)
+        if len(history) == 0 or not np.isfinite(current_vol):
             return 0.5
 
-        # 현재 변동성의 백분위 계산
-        percentile = np.percentile(rolling_vols, current_vol * 100)
-        return max(0, min(1, percentile))
+        rank = np.searchsorted(history, current_vol, side='right')
+        return float(rank) / len(history)
 
     def _get_current_leverage(self, pair: str) -> int:
         """현재 레버리지 조회"""
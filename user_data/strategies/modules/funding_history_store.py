@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Funding History Store
+=====================
+
+페어별 자금 조달료 히스토리 저장소
+- (funding_time, rate) 배열을 디스크에 저장하고 한 번만 로드
+- 캔들 인덱스에 as-of 방식으로 벡터화 병합
+- 신규 레코드만 파일 끝에 추가 (증분 저장)
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 디스크/메모리 공통 레코드 형식 (funding_time 은 epoch ms)
+FUNDING_RECORD_DTYPE = np.dtype([('funding_time', '<i8'), ('rate', '<f8')])
+
+FUNDING_INTERVAL_MS = 8 * 60 * 60 * 1000  # 8시간
+
+class FundingHistoryStore:
+    """자금 조달료 히스토리 저장소"""
+
+    def __init__(self, store_dir: Union[str, Path], seed_dir: Optional[Union[str, Path]] = None):
+        self.store_dir = Path(store_dir)
+        self.seed_dir = Path(seed_dir) if seed_dir else None
+
+        self._series: Dict[str, np.ndarray] = {}
+        self._last_sync: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pair_key(pair: str) -> str:
+        """페어 이름을 파일명 형식으로 변환 (BTC/USDT:USDT -> BTC_USDT_USDT)"""
+        return pair.replace('/', '_').replace(':', '_')
+
+    def _store_path(self, pair: str) -> Path:
+        return self.store_dir / f"{self._pair_key(pair)}-funding.bin"
+
+    def _load_seed(self, pair: str) -> np.ndarray:
+        """freqtrade 다운로드 데이터 (*-8h-funding_rate.json) 에서 초기 히스토리 로드"""
+        if not self.seed_dir:
+            return np.empty(0, dtype=FUNDING_RECORD_DTYPE)
+
+        seed_path = self.seed_dir / f"{self._pair_key(pair)}-8h-funding_rate.json"
+        if not seed_path.exists():
+            return np.empty(0, dtype=FUNDING_RECORD_DTYPE)
+
+        try:
+            with open(seed_path, 'r') as f:
+                rows = json.load(f)
+            return self._normalize((int(row[0]), float(row[1])) for row in rows)
+        except Exception as e:
+            logger.error(f"Failed to load funding seed for {pair}: {e}")
+            return np.empty(0, dtype=FUNDING_RECORD_DTYPE)
+
+    @staticmethod
+    def _normalize(records: Iterable[Tuple[int, float]]) -> np.ndarray:
+        """시간순 정렬 + 중복 시각 제거"""
+        array = np.fromiter(records, dtype=FUNDING_RECORD_DTYPE)
+        if len(array) == 0:
+            return array
+
+        array = np.sort(array, order='funding_time')
+        _, unique_idx = np.unique(array['funding_time'], return_index=True)
+        return array[unique_idx]
+
+    def load(self, pair: str) -> np.ndarray:
+        """페어 히스토리 로드 (프로세스당 한 번, 이후 메모리에서 제공)"""
+        series = self._series.get(pair)
+        if series is not None:
+            return series
+
+        with self._lock:
+            series = self._series.get(pair)
+            if series is not None:
+                return series
+
+            path = self._store_path(pair)
+            if path.exists():
+                series = np.fromfile(path, dtype=FUNDING_RECORD_DTYPE)
+            else:
+                series = self._load_seed(pair)
+                if len(series) > 0:
+                    self.store_dir.mkdir(parents=True, exist_ok=True)
+                    series.tofile(path)
+
+            self._series[pair] = series
+            return series
+
+    def last_funding_time(self, pair: str) -> Optional[int]:
+        """마지막 저장 자금 조달 시각 (epoch ms)"""
+        series = self.load(pair)
+        return int(series['funding_time'][-1]) if len(series) > 0 else None
+
+    def append(self, pair: str, records: Iterable[Tuple[int, float]]) -> int:
+        """신규 레코드만 추가 (마지막 시각 이후), 추가된 행 수 반환"""
+        series = self.load(pair)
+        new_rows = self._normalize(records)
+
+        if len(series) > 0 and len(new_rows) > 0:
+            new_rows = new_rows[new_rows['funding_time'] > series['funding_time'][-1]]
+
+        if len(new_rows) == 0:
+            return 0
+
+        with self._lock:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._store_path(pair), 'ab') as f:
+                new_rows.tofile(f)
+            self._series[pair] = np.concatenate([self._series[pair], new_rows])
+
+        return len(new_rows)
+
+    def needs_sync(self, pair: str, now_ms: int) -> bool:
+        """새 자금 조달 정산이 있었을 수 있는지 확인"""
+        last_time = self.last_funding_time(pair)
+        if last_time is None:
+            return now_ms - self._last_sync.get(pair, 0) >= FUNDING_INTERVAL_MS // 8
+        return now_ms >= last_time + FUNDING_INTERVAL_MS and \
+            now_ms - self._last_sync.get(pair, 0) >= 60 * 1000
+
+    def sync_from_exchange(self, pair: str, exchange, limit: int = 1000) -> int:
+        """거래소에서 마지막 저장 시각 이후의 자금 조달료만 가져와 추가"""
+        last_time = self.last_funding_time(pair)
+        since = last_time + 1 if last_time is not None else None
+
+        try:
+            history = exchange.fetch_funding_rate_history(pair, since=since, limit=limit)
+        except Exception as e:
+            logger.error(f"Failed to fetch funding history for {pair}: {e}")
+            return 0
+        finally:
+            self._last_sync[pair] = int(time.time() * 1000)
+
+        return self.append(pair, (
+            (int(item['timestamp']), float(item['fundingRate']))
+            for item in history
+            if item.get('timestamp') is not None and item.get('fundingRate') is not None
+        ))
+
+    @staticmethod
+    def to_epoch_ms(dates) -> np.ndarray:
+        """datetime 컬럼을 epoch ms 배열로 변환"""
+        index = pd.DatetimeIndex(dates)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return index.values.astype('datetime64[ms]').astype(np.int64)
+
+    def rates_asof(self, pair: str, timestamps_ms: np.ndarray, default: float = np.nan) -> np.ndarray:
+        """각 시각 기준 가장 최근 자금 조달료 (as-of 병합)"""
+        series = self.load(pair)
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+
+        if len(series) == 0:
+            return np.full(len(timestamps_ms), default, dtype=np.float64)
+
+        positions = np.searchsorted(series['funding_time'], timestamps_ms, side='right') - 1
+        rates = series['rate'][np.clip(positions, 0, None)]
+        return np.where(positions >= 0, rates, default)
+
+    def merge_asof(self, pair: str, dates, default: float = np.nan) -> np.ndarray:
+        """캔들 date 컬럼에 맞춘 자금 조달료 배열"""
+        return self.rates_asof(pair, self.to_epoch_ms(dates), default)
+
+_stores: Dict[Tuple[str, str], FundingHistoryStore] = {}
+_stores_lock = threading.Lock()
+
+def get_funding_history_store(config: Optional[Dict] = None) -> FundingHistoryStore:
+    """설정의 datadir 기준 공유 저장소 (전략 간 공유)"""
+    datadir = (config or {}).get('datadir')
+    if datadir:
+        datadir = Path(datadir)
+    else:
+        datadir = Path(__file__).resolve().parent.parent.parent / 'data' / 'binance'
+
+    store_dir = datadir / 'funding_history'
+    seed_dir = datadir / 'futures'
+    key = (str(store_dir), str(seed_dir))
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = FundingHistoryStore(store_dir, seed_dir)
+            _stores[key] = store
+        return store
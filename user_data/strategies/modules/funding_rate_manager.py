@@ -12,13 +12,18 @@ Funding Rate Manager
 import requests
 import time
 import asyncio
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 import logging
 from dataclasses import dataclass
 
+from rate_limiter import TokenBucket
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -32,6 +37,124 @@ class FundingRateData:
     estimated_income: float
     recommendation: str
 
+@dataclass
+class _FundingCacheEntry:
+    """캐시 항목 (만료 시각은 epoch 초)"""
+    data: FundingRateData
+    expires_at: float
+
+class FundingRateCache:
+    """페어별 자금 조달료 캐시
+
+    - 다음 자금 조달 시각(next_funding_time)에 맞춰 항목 만료
+    - 동일 페어에 대한 동시 조회는 하나의 요청으로 병합
+    - 히트/미스 카운터 제공
+    """
+
+    def __init__(self, max_age: float = 900, settle_grace: float = 30):
+        self.max_age = max_age              # 최대 보관 시간 (초)
+        self.settle_grace = settle_grace    # 자금 조달 정산 후 유예 시간 (초)
+
+        self._entries: Dict[str, _FundingCacheEntry] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _expiry_for(self, data: FundingRateData, now: float) -> float:
+        """항목 만료 시각 계산 (다음 자금 조달 직후 또는 max_age 중 빠른 쪽)
+
+        ccxt 의 fundingTimestamp(funding_time)는 Binance 에서 이미 다음 정산 시각이므로,
+        미래 시각이면 그대로 기준으로 쓰고 지난 시각이면 next_funding_time 사용
+        """
+        expires_at = now + self.max_age
+        for settle_time in (data.funding_time, data.next_funding_time):
+            try:
+                settled_at = settle_time.timestamp() + self.settle_grace
+            except (AttributeError, OverflowError, OSError, ValueError):
+                continue
+            if settled_at > now:
+                return min(expires_at, settled_at)
+        return expires_at
+
+    def get_cached(self, pair: str) -> Optional[FundingRateData]:
+        """만료되지 않은 캐시 항목 조회 (카운터 미변경)"""
+        with self._lock:
+            entry = self._entries.get(pair)
+            if entry and entry.expires_at > time.time():
+                return entry.data
+        return None
+
+    def put(self, pair: str, data: FundingRateData):
+        """캐시 항목 저장"""
+        now = time.time()
+        with self._lock:
+            self._entries[pair] = _FundingCacheEntry(data, self._expiry_for(data, now))
+
+    def invalidate(self, pair: Optional[str] = None):
+        """캐시 무효화 (pair 미지정 시 전체)"""
+        with self._lock:
+            if pair is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(pair, None)
+
+    def get(self, pair: str, loader: Callable[[str], Optional[FundingRateData]],
+            force_refresh: bool = False) -> Optional[FundingRateData]:
+        """캐시 조회, 없으면 loader 로 가져오기 (동시 요청 병합)"""
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(pair)
+                if not force_refresh and entry and entry.expires_at > time.time():
+                    self.hits += 1
+                    return entry.data
+
+                event = self._inflight.get(pair)
+                if event is None:
+                    # 이 스레드가 대표로 조회
+                    event = threading.Event()
+                    self._inflight[pair] = event
+                    self.misses += 1
+                    break
+
+                self.coalesced += 1
+
+            # 다른 스레드의 조회 완료 대기 후 결과 재사용
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(pair)
+                if entry and entry.expires_at > time.time():
+                    return entry.data
+                if self._inflight.get(pair) is None:
+                    # 대표 조회가 실패한 경우 재시도하지 않음
+                    return None
+            force_refresh = False
+
+        try:
+            data = loader(pair)
+            if data is not None:
+                self.put(pair, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(pair, None)
+            event.set()
+
+    def get_stats(self) -> Dict:
+        """캐시 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': self.hits / total if total > 0 else 0.0
+            }
+
 class FundingRateManager:
     """자금 조달 수수료 관리 시스템"""
 
@@ -44,36 +167,112 @@ class FundingRateManager:
         self.funding_history = {}
         self.position_recommendations = {}
 
-    def get_current_funding_rate(self, pair: str) -> Optional[FundingRateData]:
-        """현재 자금 조달 수수료 조회"""
+        # 자금조달료는 8시간마다 바뀌므로 다음 정산 시각까지 캐시
+        self.funding_cache = FundingRateCache()
+
+        # 다중 페어 조회 설정 (모든 조회가 하나의 토큰 버킷 공유)
+        self.rate_limiter = TokenBucket(rate=20, capacity=40)
+        self.max_workers = 8
+
+    def get_current_funding_rate(self, pair: str, force_refresh: bool = False) -> Optional[FundingRateData]:
+        """현재 자금 조달 수수료 조회 (캐시 우선)"""
+        return self.funding_cache.get(pair, self._fetch_funding_rate, force_refresh=force_refresh)
+
+    def get_cache_stats(self) -> Dict:
+        """자금조달료 캐시 통계"""
+        return self.funding_cache.get_stats()
+
+    def _fetch_funding_rate(self, pair: str) -> Optional[FundingRateData]:
+        """거래소에서 자금 조달 수수료 조회"""
         try:
             # Binance Futures API에서 자금조달료 가져오기
+            self.rate_limiter.acquire()
             funding_info = self.exchange.fetch_funding_rate(pair)
+            return self._build_funding_data(pair, funding_info)
+
+        except Exception as e:
+            logger.error(f"Failed to fetch funding rate for {pair}: {e}")
+            return None
 
-            current_rate = funding_info.get('fundingRate', 0)
-            funding_time = datetime.fromtimestamp(funding_info.get('fundingTimestamp', 0) / 1000)
-            next_time = self._calculate_next_funding_time(funding_time)
-            mark_price = funding_info.get('markPrice', 0)
+    def _supports_bulk_fetch(self) -> bool:
+        """전체 페어 자금조달료 일괄 조회 지원 여부"""
+        if not callable(getattr(self.exchange, 'fetch_funding_rates', None)):
+            return False
 
-            # 8시간당 예상 수익 계산
-            estimated_income = abs(current_rate) if current_rate != 0 else 0
+        has = getattr(self.exchange, 'has', None)
+        if isinstance(has, dict):
+            return bool(has.get('fetchFundingRates'))
+        return True
 
-            # 추천 생성
-            recommendation = self._generate_recommendation(current_rate)
+    def _fetch_funding_rates_bulk(self, pairs: List[str]) -> Dict[str, FundingRateData]:
+        """한 번의 API 호출로 여러 페어 자금조달료 조회"""
+        results = {}
+        try:
+            self.rate_limiter.acquire()
+            funding_infos = self.exchange.fetch_funding_rates(pairs)
 
-            return FundingRateData(
-                symbol=pair,
-                funding_rate=current_rate,
-                funding_time=funding_time,
-                next_funding_time=next_time,
-                mark_price=mark_price,
-                estimated_income=estimated_income,
-                recommendation=recommendation
-            )
+            for pair in pairs:
+                funding_info = funding_infos.get(pair)
+                if funding_info:
+                    results[pair] = self._build_funding_data(pair, funding_info)
 
         except Exception as e:
-            logger.error(f"Failed to fetch funding rate for {pair}: {e}")
-            return None
+            logger.warning(f"Bulk funding rate fetch failed, falling back to per-pair: {e}")
+
+        return results
+
+    def prefetch_funding_rates(self, pairs: List[str]) -> Dict[str, FundingRateData]:
+        """여러 페어 자금조달료를 캐시에 미리 적재
+
+        일괄 조회를 지원하면 한 번에 가져오고, 나머지는 속도 제한 안에서 병렬 조회
+        """
+        results = {}
+        missing = []
+        for pair in dict.fromkeys(pairs):
+            cached = self.funding_cache.get_cached(pair)
+            if cached:
+                results[pair] = cached
+            else:
+                missing.append(pair)
+
+        if missing and self._supports_bulk_fetch():
+            bulk_results = self._fetch_funding_rates_bulk(missing)
+            for pair, funding_data in bulk_results.items():
+                self.funding_cache.put(pair, funding_data)
+                results[pair] = funding_data
+            missing = [pair for pair in missing if pair not in bulk_results]
+
+        if missing:
+            workers = max(1, min(self.max_workers, len(missing)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for pair, funding_data in zip(missing, executor.map(self.get_current_funding_rate, missing)):
+                    if funding_data:
+                        results[pair] = funding_data
+
+        return results
+
+    def _build_funding_data(self, pair: str, funding_info: Dict) -> FundingRateData:
+        """거래소 응답을 FundingRateData 로 변환"""
+        current_rate = funding_info.get('fundingRate', 0)
+        funding_time = datetime.fromtimestamp(funding_info.get('fundingTimestamp', 0) / 1000)
+        next_time = self._calculate_next_funding_time(funding_time)
+        mark_price = funding_info.get('markPrice', 0)
+
+        # 8시간당 예상 수익 계산
+        estimated_income = abs(current_rate) if current_rate != 0 else 0
+
+        # 추천 생성
+        recommendation = self._generate_recommendation(current_rate)
+
+        return FundingRateData(
+            symbol=pair,
+            funding_rate=current_rate,
+            funding_time=funding_time,
+            next_funding_time=next_time,
+            mark_price=mark_price,
+            estimated_income=estimated_income,
+            recommendation=recommendation
+        )
 
     def _calculate_next_funding_time(self, current_funding_time: datetime) -> datetime:
         """다음 자금 조달 시간 계산 (8시간마다)"""
@@ -208,20 +407,22 @@ class FundingRateManager:
     def get_multi_pair_analysis(self, pairs: List[str]) -> Dict[str, Dict]:
         """여러 페어의 자금 조달료 분석"""
 
+        # 일괄/병렬 조회로 캐시를 채운 뒤 분석은 캐시에서 수행
+        self.prefetch_funding_rates(pairs)
+
         results = {}
         for pair in pairs:
             try:
                 analysis = self.analyze_funding_opportunity(pair)
                 results[pair] = analysis
-                time.sleep(0.1)  # API 호출 제한 방지
             except Exception as e:
                 logger.error(f"Failed to analyze {pair}: {e}")
                 results[pair] = {"status": "error", "message": str(e)}
 
         return results
 
-    def find_best_funding_opportunities(self, pairs: List[str], min_score: int = 6) -> List[Dict]:
-        """최고의 자금 조달료 기회 찾기"""
+    def _collect_funding_opportunities(self, pairs: List[str], min_score: int) -> List[Dict]:
+        """최소 점수 이상의 자금 조달료 기회 수집 (정렬 없음)"""
 
         analyses = self.get_multi_pair_analysis(pairs)
         opportunities = []
@@ -242,14 +443,25 @@ class FundingRateManager:
                     'hours_to_funding': analysis['hours_to_funding']
                 })
 
-        # 점수순으로 정렬
+        return opportunities
+
+    def find_best_funding_opportunities(self, pairs: List[str], min_score: int = 6,
+                                        top_k: Optional[int] = None) -> List[Dict]:
+        """최고의 자금 조달료 기회 찾기 (top_k 지정 시 상위 k개만)"""
+
+        opportunities = self._collect_funding_opportunities(pairs, min_score)
+
+        # 점수순으로 정렬 (상위 k개는 힙으로 선택)
+        if top_k is not None:
+            return heapq.nlargest(top_k, opportunities, key=lambda x: x['score'])
+
         opportunities.sort(key=lambda x: x['score'], reverse=True)
         return opportunities
 
     def generate_funding_report(self, pairs: List[str]) -> str:
         """자금 조달료 분석 리포트 생성"""
 
-        opportunities = self.find_best_funding_opportunities(pairs, min_score=4)
+        opportunities = self._collect_funding_opportunities(pairs, min_score=4)
 
         report = "🏦 FUNDING RATE ANALYSIS REPORT\n"
         report += "=" * 50 + "\n\n"
@@ -260,7 +472,8 @@ class FundingRateManager:
 
         report += f"✅ Found {len(opportunities)} funding opportunities:\n\n"
 
-        for i, opp in enumerate(opportunities[:5], 1):  # 상위 5개만 표시
+        top_opportunities = heapq.nlargest(5, opportunities, key=lambda x: x['score'])
+        for i, opp in enumerate(top_opportunities, 1):  # 상위 5개만 표시
             report += f"{i}. {opp['pair']}\n"
             report += f"   📊 Score: {opp['score']}/10\n"
             report += f"   💰 Funding Rate: {opp['funding_rate']*100:.3f}%\n"
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Incremental Indicators
+======================
+
+새 캔들만 반영하는 증분 지표 커널
+- TA-Lib 과 같은 초기값/연산 순서 (EMA, SMA, RSI, BBANDS, ATR, MACD)
+- init(): 전체 히스토리로 상태 초기화 + 전체 출력
+- update(): 새 행만 받아 상태 갱신 + 새 행 출력 (행당 O(1))
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+Outputs = Dict[Optional[str], np.ndarray]
+
+def _is_zero(value: float) -> bool:
+    """TA_IS_ZERO"""
+    return -0.00000001 < value < 0.00000001
+
+def _to_k(period: int) -> float:
+    """EMA 평활 계수 (PER_TO_K)"""
+    return 2.0 / (period + 1)
+
+class IncrementalKernel:
+    """증분 지표 커널 기본 클래스"""
+
+    def __init__(self, timeperiod: int = 14, price: str = 'close'):
+        self.period = int(timeperiod)
+        self.price = price
+
+    def lookback(self) -> int:
+        """첫 출력 전까지 필요한 행 수"""
+        raise NotImplementedError
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        raise NotImplementedError
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        raise NotImplementedError
+
+class EMAKernel(IncrementalKernel):
+    """지수이동평균 (첫 값은 SMA 시드)"""
+
+    def __init__(self, timeperiod: int = 30, price: str = 'close'):
+        super().__init__(timeperiod, price)
+        self.k = _to_k(self.period)
+        self.prev_ma = math.nan
+
+    def lookback(self) -> int:
+        return self.period - 1
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        out = np.full(len(values), np.nan)
+
+        total = 0.0
+        for i in range(self.period):
+            total += values[i]
+        prev_ma = total / self.period
+        out[self.period - 1] = prev_ma
+
+        k = self.k
+        for i in range(self.period, len(values)):
+            prev_ma = ((values[i] - prev_ma) * k) + prev_ma
+            out[i] = prev_ma
+
+        self.prev_ma = prev_ma
+        return {None: out}
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        out = np.empty(len(values))
+
+        prev_ma, k = self.prev_ma, self.k
+        for i in range(len(values)):
+            prev_ma = ((values[i] - prev_ma) * k) + prev_ma
+            out[i] = prev_ma
+
+        self.prev_ma = prev_ma
+        return {None: out}
+
+class SMAKernel(IncrementalKernel):
+    """단순이동평균 (누적합 - 이탈값 방식)"""
+
+    def __init__(self, timeperiod: int = 30, price: str = 'close'):
+        super().__init__(timeperiod, price)
+        self.period_total = 0.0
+        self.window = deque(maxlen=self.period)
+
+    def lookback(self) -> int:
+        return self.period - 1
+
+    def _step(self, value: float) -> float:
+        """한 행 반영 후 평균 반환"""
+        self.window.append(value)
+        self.period_total += value
+        temp = self.period_total
+        self.period_total -= self.window[0]
+        return temp / self.period
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        out = np.full(len(values), np.nan)
+
+        self.period_total = 0.0
+        self.window.clear()
+        for i in range(self.period - 1):
+            self.period_total += values[i]
+            self.window.append(values[i])
+
+        for i in range(self.period - 1, len(values)):
+            out[i] = self._step(values[i])
+        return {None: out}
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        return {None: np.array([self._step(value) for value in values], dtype=np.float64)}
+
+class BBandsKernel(IncrementalKernel):
+    """볼린저밴드 (SMA + 제곱합 기반 표준편차)"""
+
+    def __init__(self, timeperiod: int = 5, nbdevup: float = 2.0, nbdevdn: float = 2.0,
+                 matype: int = 0, price: str = 'close'):
+        if matype != 0:
+            raise ValueError("Incremental BBANDS supports SMA (matype=0) only")
+        super().__init__(timeperiod, price)
+        self.nbdevup = float(nbdevup)
+        self.nbdevdn = float(nbdevdn)
+        self.period_total = 0.0
+        self.period_total2 = 0.0
+        self.window = deque(maxlen=self.period)
+
+    def lookback(self) -> int:
+        return self.period - 1
+
+    def _step(self, value: float):
+        self.window.append(value)
+        trailing = self.window[0]
+
+        self.period_total += value
+        middle = self.period_total / self.period
+        self.period_total -= trailing
+
+        self.period_total2 += value * value
+        mean_value2 = self.period_total2 / self.period
+        self.period_total2 -= trailing * trailing
+        mean_value2 -= middle * middle
+
+        stddev = math.sqrt(mean_value2) if mean_value2 >= 0.00000001 else 0.0
+        return middle + stddev * self.nbdevup, middle, middle - stddev * self.nbdevdn
+
+    def _outputs(self, rows) -> Outputs:
+        upper, middle, lower = (np.array(column, dtype=np.float64) for column in zip(*rows)) \
+            if rows else (np.empty(0), np.empty(0), np.empty(0))
+        return {'upperband': upper, 'middleband': middle, 'lowerband': lower}
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        head = self.period - 1
+
+        self.period_total = 0.0
+        self.period_total2 = 0.0
+        self.window.clear()
+        for i in range(head):
+            self.period_total += values[i]
+            self.period_total2 += values[i] * values[i]
+            self.window.append(values[i])
+
+        outputs = self._outputs([self._step(values[i]) for i in range(head, len(values))])
+        return {name: np.concatenate([np.full(head, np.nan), column]) for name, column in outputs.items()}
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        return self._outputs([self._step(value) for value in inputs[self.price]])
+
+class RSIKernel(IncrementalKernel):
+    """RSI (Wilder 평활)"""
+
+    def __init__(self, timeperiod: int = 14, price: str = 'close'):
+        super().__init__(timeperiod, price)
+        self.prev_value = math.nan
+        self.prev_gain = 0.0
+        self.prev_loss = 0.0
+
+    def lookback(self) -> int:
+        return self.period
+
+    def _rsi(self) -> float:
+        total = self.prev_gain + self.prev_loss
+        return 100.0 * (self.prev_gain / total) if not _is_zero(total) else 0.0
+
+    def _step(self, value: float) -> float:
+        change = value - self.prev_value
+        self.prev_value = value
+
+        self.prev_loss *= (self.period - 1)
+        self.prev_gain *= (self.period - 1)
+        if change < 0:
+            self.prev_loss -= change
+        else:
+            self.prev_gain += change
+        self.prev_loss /= self.period
+        self.prev_gain /= self.period
+
+        return self._rsi()
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        out = np.full(len(values), np.nan)
+
+        self.prev_value = values[0]
+        self.prev_gain = 0.0
+        self.prev_loss = 0.0
+        for i in range(1, self.period + 1):
+            change = values[i] - self.prev_value
+            self.prev_value = values[i]
+            if change < 0:
+                self.prev_loss -= change
+            else:
+                self.prev_gain += change
+        self.prev_loss /= self.period
+        self.prev_gain /= self.period
+        out[self.period] = self._rsi()
+
+        for i in range(self.period + 1, len(values)):
+            out[i] = self._step(values[i])
+        return {None: out}
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        return {None: np.array([self._step(value) for value in inputs[self.price]], dtype=np.float64)}
+
+class ATRKernel(IncrementalKernel):
+    """ATR (True Range 의 Wilder 평활)"""
+
+    def __init__(self, timeperiod: int = 14):
+        super().__init__(timeperiod)
+        self.prev_close = math.nan
+        self.prev_atr = math.nan
+
+    def lookback(self) -> int:
+        return self.period
+
+    @staticmethod
+    def _true_range(high: float, low: float, prev_close: float) -> float:
+        greatest = high - low
+        value2 = abs(prev_close - high)
+        if value2 > greatest:
+            greatest = value2
+        value3 = abs(prev_close - low)
+        if value3 > greatest:
+            greatest = value3
+        return greatest
+
+    def _step(self, high: float, low: float, close: float) -> float:
+        true_range = self._true_range(high, low, self.prev_close)
+        self.prev_close = close
+
+        self.prev_atr *= self.period - 1
+        self.prev_atr += true_range
+        self.prev_atr /= self.period
+        return self.prev_atr
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        high, low, close = inputs['high'], inputs['low'], inputs['close']
+        out = np.full(len(close), np.nan)
+
+        total = 0.0
+        for i in range(1, self.period + 1):
+            total += self._true_range(high[i], low[i], close[i - 1])
+        self.prev_atr = total / self.period
+        self.prev_close = close[self.period]
+        out[self.period] = self.prev_atr
+
+        for i in range(self.period + 1, len(close)):
+            out[i] = self._step(high[i], low[i], close[i])
+        return {None: out}
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        high, low, close = inputs['high'], inputs['low'], inputs['close']
+        return {None: np.array([self._step(high[i], low[i], close[i]) for i in range(len(close))],
+                               dtype=np.float64)}
+
+class MACDKernel(IncrementalKernel):
+    """MACD (빠른/느린 EMA 를 같은 시점에서 시드, 시그널은 MACD 의 EMA)"""
+
+    def __init__(self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9,
+                 price: str = 'close'):
+        fastperiod, slowperiod = int(fastperiod), int(slowperiod)
+        if slowperiod < fastperiod:
+            fastperiod, slowperiod = slowperiod, fastperiod
+        super().__init__(slowperiod, price)
+
+        self.fast_period = fastperiod
+        self.slow_period = slowperiod
+        self.signal_period = int(signalperiod)
+        self.k_fast = _to_k(fastperiod)
+        self.k_slow = _to_k(slowperiod)
+        self.k_signal = _to_k(self.signal_period)
+
+        self.fast_ema = math.nan
+        self.slow_ema = math.nan
+        self.signal_ema = math.nan
+
+    def lookback(self) -> int:
+        return (self.signal_period - 1) + (self.slow_period - 1)
+
+    @staticmethod
+    def _seed(values, end: int, period: int) -> float:
+        """values[end-period+1 .. end] 평균"""
+        total = 0.0
+        for i in range(end - period + 1, end + 1):
+            total += values[i]
+        return total / period
+
+    def _step(self, value: float):
+        self.fast_ema = ((value - self.fast_ema) * self.k_fast) + self.fast_ema
+        self.slow_ema = ((value - self.slow_ema) * self.k_slow) + self.slow_ema
+        macd = self.fast_ema - self.slow_ema
+        self.signal_ema = ((macd - self.signal_ema) * self.k_signal) + self.signal_ema
+        return macd, self.signal_ema, macd - self.signal_ema
+
+    def init(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        values = inputs[self.price]
+        n = len(values)
+        start = self.slow_period - 1             # 두 EMA 모두 이 시점에서 시드
+        first_output = self.lookback()
+
+        fast = self._seed(values, start, self.fast_period)
+        slow = self._seed(values, start, self.slow_period)
+        macd_values = [fast - slow]
+        for i in range(start + 1, first_output + 1):
+            fast = ((values[i] - fast) * self.k_fast) + fast
+            slow = ((values[i] - slow) * self.k_slow) + slow
+            macd_values.append(fast - slow)
+
+        self.fast_ema, self.slow_ema = fast, slow
+        self.signal_ema = self._seed(macd_values, len(macd_values) - 1, self.signal_period)
+
+        out = {name: np.full(n, np.nan) for name in ('macd', 'macdsignal', 'macdhist')}
+        out['macd'][first_output] = macd_values[-1]
+        out['macdsignal'][first_output] = self.signal_ema
+        out['macdhist'][first_output] = macd_values[-1] - self.signal_ema
+
+        for i in range(first_output + 1, n):
+            out['macd'][i], out['macdsignal'][i], out['macdhist'][i] = self._step(values[i])
+        return out
+
+    def update(self, inputs: Dict[str, np.ndarray]) -> Outputs:
+        rows = [self._step(value) for value in inputs[self.price]]
+        columns = zip(*rows) if rows else ((), (), ())
+        return {name: np.array(column, dtype=np.float64)
+                for name, column in zip(('macd', 'macdsignal', 'macdhist'), columns)}
+
+KERNELS = {
+    'EMA': EMAKernel,
+    'SMA': SMAKernel,
+    'RSI': RSIKernel,
+    'BBANDS': BBandsKernel,
+    'ATR': ATRKernel,
+    'MACD': MACDKernel,
+}
+
+def create_kernel(name: str, params: Dict) -> Optional[IncrementalKernel]:
+    """지표명/파라미터에 맞는 커널 (증분 미지원이면 None)"""
+    kernel_class = KERNELS.get(name)
+    if kernel_class is None:
+        return None
+    try:
+        return kernel_class(**params)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Indicator Cube
+==============
+
+하이퍼옵트용 파라미터 공간 지표 캐시
+- RSI 기간 / 볼린저밴드 기간 전체 조합을 페어당 한 번만 계산
+- (컬럼 수, 행 수) 메모리 맵 파일로 저장 - 하이퍼옵트 워커 프로세스가 재계산 없이 공유
+- 에포크마다 파라미터 값에 해당하는 컬럼만 선택
+- IndicatorCubeMixin: 전략 공용 큐브 생성/선택 (rsi_period / bb_period / bb_deviation 파라미터 사용)
+"""
+
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+import logging
+
+import numpy as np
+from pandas import DataFrame, Series
+import talib.abstract as ta
+
+from indicator_engine import Indicator, IndicatorEngine, is_hyperopt_mode
+
+logger = logging.getLogger(__name__)
+
+class IndicatorCube:
+    """한 페어의 파라미터별 지표 컬럼 묶음 (읽기 전용 메모리 맵)"""
+
+    def __init__(self, values: np.ndarray, dates: np.ndarray, columns: Dict[Tuple[str, int], int]):
+        self.values = values      # (컬럼 수, 행 수)
+        self.dates = dates        # 행별 캔들 시각 (epoch ms)
+        self.columns = columns    # (지표, 기간) -> 행렬 행 번호
+
+    def _rows(self, dataframe: DataFrame) -> slice:
+        """데이터프레임 구간에 해당하는 행 범위 (하이퍼옵트는 시작 캔들을 잘라낸 뒤 호출)"""
+        dates = dataframe['date'].values.astype('datetime64[ms]').astype(np.int64)
+        start = int(np.searchsorted(self.dates, dates[0]))
+        if start + len(dates) > len(self.dates) or self.dates[start] != dates[0] \
+                or self.dates[start + len(dates) - 1] != dates[-1]:
+            raise KeyError("Dataframe range is not covered by the indicator cube")
+        return slice(start, start + len(dates))
+
+    def column(self, name: str, period: int, dataframe: DataFrame) -> np.ndarray:
+        """(지표, 기간) 컬럼 (데이터프레임 구간)"""
+        return self.values[self.columns[(name, int(period))], self._rows(dataframe)]
+
+    def rsi(self, period: int, dataframe: DataFrame) -> Series:
+        """RSI(period)"""
+        return Series(self.column('rsi', period, dataframe), index=dataframe.index)
+
+    def bbands(self, period: int, deviation: float, dataframe: DataFrame) -> Tuple[Series, Series, Series]:
+        """BBANDS(period, deviation) 상단/중간/하단
+
+        TA-Lib BBANDS 와 같은 방식 (SMA ± 표준편차 * 편차) 으로 조립하므로
+        편차 값마다 따로 저장하지 않는다.
+        """
+        rows = self._rows(dataframe)
+        middle = self.values[self.columns[('bb_middle', int(period))], rows]
+        deviation_band = self.values[self.columns[('bb_std', int(period))], rows] * float(deviation)
+
+        index = dataframe.index
+        return (Series(middle + deviation_band, index=index),
+                Series(np.array(middle), index=index),
+                Series(middle - deviation_band, index=index))
+
+class IndicatorCubeStore:
+    """페어별 지표 큐브 저장소 (메모리 맵 파일)"""
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+        self._cubes: Dict[str, IndicatorCube] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cube_name(pair: str, timeframe: str, rsi_periods: Tuple[int, ...],
+                   bb_periods: Tuple[int, ...]) -> str:
+        """페어/파라미터 범위 기준 파일명 (워커 프로세스가 같은 파일을 찾도록 결정적)"""
+        digest = hashlib.sha1(repr((rsi_periods, bb_periods)).encode()).hexdigest()[:12]
+        return f"{pair.replace('/', '_').replace(':', '_')}-{timeframe}-{digest}"
+
+    @staticmethod
+    def _layout(rsi_periods: Tuple[int, ...], bb_periods: Tuple[int, ...]) -> Dict[Tuple[str, int], int]:
+        """(지표, 기간) -> 행렬 행 번호 (첫 행은 데이터 검증용 종가)"""
+        keys = [('close', 0)] + [('rsi', period) for period in rsi_periods]
+        for period in bb_periods:
+            keys += [('bb_middle', period), ('bb_std', period)]
+        return {key: i for i, key in enumerate(keys)}
+
+    @staticmethod
+    def _compute(dataframe: DataFrame, key: Tuple[str, int]) -> np.ndarray:
+        """한 컬럼 계산 (BBANDS(matype=SMA) 의 중간선/표준편차와 같은 값)"""
+        name, period = key
+        if name == 'close':
+            values = dataframe['close']
+        elif name == 'rsi':
+            values = ta.RSI(dataframe, timeperiod=period)
+        elif name == 'bb_middle':
+            values = ta.SMA(dataframe, timeperiod=period)
+        else:
+            values = ta.STDDEV(dataframe, timeperiod=period, nbdev=1.0)
+        return np.asarray(values, dtype=np.float64)
+
+    def _write(self, path: Path, dataframe: DataFrame, dates: np.ndarray, columns: Dict):
+        """임시 파일에 기록 후 교체 (동시에 여러 프로세스가 만들어도 안전)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        dates_path = path.with_suffix('.dates.npy')
+        tmp_dates_path = path.with_suffix(f".dates.{os.getpid()}.tmp")
+
+        cube = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64,
+                                         shape=(len(columns), len(dates)))
+        for key, i in columns.items():
+            cube[i] = self._compute(dataframe, key)
+        cube.flush()
+        del cube
+
+        with open(tmp_dates_path, 'wb') as f:
+            np.save(f, dates)
+        os.replace(tmp_dates_path, dates_path)
+        os.replace(tmp_path, path)
+
+    def _open(self, name: str, columns: Dict) -> Optional[IndicatorCube]:
+        """저장된 큐브를 메모리 맵으로 열기"""
+        path = self.cache_dir / f"{name}.npy"
+        if not path.exists():
+            return None
+        values = np.load(path, mmap_mode='r')
+        if values.shape[0] != len(columns):
+            return None
+        return IndicatorCube(values, np.load(path.with_suffix('.dates.npy')), columns)
+
+    @staticmethod
+    def _matches(cube: Optional[IndicatorCube], dates: np.ndarray, dataframe: DataFrame) -> bool:
+        """큐브가 같은 캔들 데이터로 만들어졌는지 (시각 + 종가 비교)"""
+        if cube is None or len(cube.dates) != len(dates) or not np.array_equal(cube.dates, dates):
+            return False
+        return np.array_equal(cube.values[0], dataframe['close'].to_numpy(dtype=np.float64), equal_nan=True)
+
+    def build(self, dataframe: DataFrame, pair: str, timeframe: str,
+              rsi_periods: Iterable[int], bb_periods: Iterable[int]) -> IndicatorCube:
+        """전체 데이터 구간의 지표 큐브 (같은 데이터로 만든 파일이 있으면 재사용)"""
+        rsi_periods = tuple(sorted(int(p) for p in rsi_periods))
+        bb_periods = tuple(sorted(int(p) for p in bb_periods))
+        name = self._cube_name(pair, timeframe, rsi_periods, bb_periods)
+        columns = self._layout(rsi_periods, bb_periods)
+        dates = dataframe['date'].values.astype('datetime64[ms]').astype(np.int64)
+
+        with self._lock:
+            cube = self._cubes.get(name)
+            if not self._matches(cube, dates, dataframe):
+                cube = self._open(name, columns)
+            if not self._matches(cube, dates, dataframe):
+                self._write(self.cache_dir / f"{name}.npy", dataframe, dates, columns)
+                cube = self._open(name, columns)
+                logger.info(f"Indicator cube built for {pair} {timeframe}: "
+                            f"{len(columns)} columns x {len(dates)} rows")
+            self._cubes[name] = cube
+            return cube
+
+    def load(self, pair: str, timeframe: str, rsi_periods: Iterable[int],
+             bb_periods: Iterable[int]) -> Optional[IndicatorCube]:
+        """build() 로 만들어 둔 큐브 (워커 프로세스에서는 파일을 메모리 맵으로 열기만 함)"""
+        rsi_periods = tuple(sorted(int(p) for p in rsi_periods))
+        bb_periods = tuple(sorted(int(p) for p in bb_periods))
+        name = self._cube_name(pair, timeframe, rsi_periods, bb_periods)
+
+        with self._lock:
+            cube = self._cubes.get(name)
+            if cube is None:
+                try:
+                    cube = self._open(name, self._layout(rsi_periods, bb_periods))
+                except Exception as e:
+                    logger.error(f"Indicator cube load failed for {pair}: {e}")
+                    return None
+                if cube is not None:
+                    self._cubes[name] = cube
+            return cube
+
+class IndicatorCubeMixin:
+    """전략용 지표 큐브 헬퍼 (rsi_period / bb_period / bb_deviation 파라미터를 가진 IStrategy 와 함께 사용)"""
+
+    # 하이퍼옵트 파라미터에 따라 바뀌는 컬럼 (지표 큐브에서 선택)
+    CUBE_COLUMNS = ('rsi', 'bb_upper', 'bb_middle', 'bb_lower')
+
+    def _populate_with_cube(self, engine: IndicatorEngine, dataframe: DataFrame, pair: str,
+                            spec: Dict[str, Indicator], incremental: bool = False) -> DataFrame:
+        """명세 지표 계산 - 하이퍼옵트 시 CUBE_COLUMNS 는 큐브에서 선택 (실패 시 엔진으로 계산)"""
+        cube = self._build_indicator_cube(dataframe, pair)
+        cube_spec = {}
+        if cube is not None:
+            cube_spec = {column: spec.pop(column) for column in self.CUBE_COLUMNS}
+
+        dataframe = engine.populate(dataframe, pair, spec, self.timeframe, incremental=incremental)
+        if cube_spec and not self._apply_indicator_cube(dataframe, pair, cube):
+            dataframe = engine.populate(dataframe, pair, cube_spec, self.timeframe, incremental=incremental)
+        return dataframe
+
+    def _build_indicator_cube(self, dataframe: DataFrame, pair: str) -> Optional[IndicatorCube]:
+        """하이퍼옵트 시 RSI/볼밴 파라미터 공간 지표 큐브 생성 (그 외 모드는 None)"""
+        if not is_hyperopt_mode(getattr(self, 'dp', None)):
+            return None
+        try:
+            return get_indicator_cube_store(self.config).build(
+                dataframe, pair, self.timeframe, self.rsi_period.range, self.bb_period.range
+            )
+        except Exception as e:
+            logger.error(f"Indicator cube build failed for {pair}: {e}")
+            return None
+
+    def _apply_indicator_cube(self, dataframe: DataFrame, pair: str,
+                              cube: Optional[IndicatorCube] = None) -> bool:
+        """현재 파라미터 값의 RSI/볼밴 컬럼을 큐브에서 선택"""
+        if cube is None:
+            cube = get_indicator_cube_store(self.config).load(
+                pair, self.timeframe, self.rsi_period.range, self.bb_period.range
+            )
+            if cube is None:
+                return False
+        try:
+            rsi = cube.rsi(self.rsi_period.value, dataframe)
+            bands = cube.bbands(self.bb_period.value, self.bb_deviation.value, dataframe)
+        except KeyError as e:
+            logger.error(f"Indicator cube lookup failed for {pair}: {e}")
+            return False
+
+        dataframe['rsi'] = rsi
+        dataframe['bb_upper'], dataframe['bb_middle'], dataframe['bb_lower'] = bands
+        return True
+
+_stores: Dict[str, IndicatorCubeStore] = {}
+_stores_lock = threading.Lock()
+
+def get_indicator_cube_store(config: Optional[Dict] = None) -> IndicatorCubeStore:
+    """설정의 user_data_dir 기준 공유 저장소"""
+    user_data_dir = (config or {}).get('user_data_dir')
+    if user_data_dir:
+        user_data_dir = Path(user_data_dir)
+    else:
+        user_data_dir = Path(__file__).resolve().parent.parent.parent
+
+    cache_dir = str(user_data_dir / 'hyperopt_results' / 'indicator_cube')
+    with _stores_lock:
+        store = _stores.get(cache_dir)
+        if store is None:
+            store = IndicatorCubeStore(cache_dir)
+            _stores[cache_dir] = store
+        return store
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Indicator Engine
+================
+
+전략 공용 지표 계산 엔진
+- 전략별 선언형 지표 명세 (컬럼명 -> 지표, 파라미터, 출력)
+- (pair, 캔들) 당 (지표, 파라미터) 조합을 한 번만 계산
+- 라이브 모드: 같은 페어를 보는 모든 전략이 계산 결과를 공유
+- 라이브 모드: 지표 상태를 유지하고 새 캔들만 반영 (증분 계산)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+import logging
+
+import numpy as np
+from pandas import DataFrame
+import talib.abstract as ta
+
+from incremental_indicators import IncrementalKernel, create_kernel
+from ohlcv_cache import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+class Indicator(NamedTuple):
+    """지표 요청 (TA-Lib 함수명, 파라미터, 다중 출력 중 선택할 출력명)"""
+    name: str
+    params: Tuple[Tuple[str, object], ...]
+    output: Optional[str] = None
+
+    @property
+    def key(self) -> Tuple[str, Tuple[Tuple[str, object], ...]]:
+        """계산 단위 (출력 선택과 무관)"""
+        return (self.name, self.params)
+
+def indicator(name: str, output: Optional[str] = None, **params) -> Indicator:
+    """지표 명세 생성 (예: indicator('BBANDS', 'upperband', timeperiod=20))"""
+    return Indicator(name.upper(), tuple(sorted(params.items())), output)
+
+# 여러 전략이 같은 캐시 키를 쓰도록 기본 파라미터 명시
+MACD_DEFAULTS = {'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9}
+
+class _CandleCache:
+    """한 페어/타임프레임의 현재 캔들 구간 계산 결과"""
+
+    def __init__(self, candle_key: Tuple):
+        self.candle_key = candle_key
+        self.results: Dict[Tuple, Dict[Optional[str], np.ndarray]] = {}
+
+class _IncrementalState:
+    """한 페어/타임프레임의 증분 계산 상태 (마지막 데이터 구간 기준)"""
+
+    def __init__(self, dates: np.ndarray, last_close: float):
+        self.dates = dates
+        self.last_close = last_close
+        self.kernels: Dict[Tuple, IncrementalKernel] = {}
+        self.outputs: Dict[Tuple, Dict[Optional[str], np.ndarray]] = {}
+
+class IndicatorEngine:
+    """공용 지표 계산 엔진"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Tuple[str, str], _CandleCache]" = OrderedDict()
+        self._incremental: "OrderedDict[Tuple[str, str], _IncrementalState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.incremental_updates = 0
+        self.full_recomputes = 0
+
+    @staticmethod
+    def _candle_key(dataframe: DataFrame) -> Tuple:
+        """데이터 구간 식별자 (행 수, 첫/마지막 캔들 시각)"""
+        if len(dataframe) == 0:
+            return (0, None, None)
+        dates = dataframe['date']
+        return (len(dataframe), dates.iloc[0], dates.iloc[-1])
+
+    def _get_entry(self, pair: str, timeframe: str, candle_key: Tuple) -> _CandleCache:
+        key = (pair, timeframe)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.candle_key != candle_key:
+                entry = _CandleCache(candle_key)
+                self._entries[key] = entry
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            return entry
+
+    @staticmethod
+    def _compute(dataframe: DataFrame, spec: Indicator) -> Dict[Optional[str], np.ndarray]:
+        """TA-Lib 계산 (다중 출력은 출력명별로 보관)"""
+        result = getattr(ta, spec.name)(dataframe, **dict(spec.params))
+
+        if isinstance(result, DataFrame):
+            outputs = {column: result[column].to_numpy() for column in result.columns}
+        else:
+            outputs = {None: np.asarray(result)}
+
+        # 캐시 배열은 여러 전략이 공유하므로 읽기 전용
+        for values in outputs.values():
+            values.setflags(write=False)
+        return outputs
+
+    @staticmethod
+    def _inputs(dataframe: DataFrame) -> Dict[str, np.ndarray]:
+        """커널 입력 (OHLCV float 배열)"""
+        return {column: dataframe[column].to_numpy(dtype=np.float64)
+                for column in ('open', 'high', 'low', 'close', 'volume')}
+
+    def _new_row_count(self, state: _IncrementalState, dates: np.ndarray,
+                       closes: np.ndarray, tf_ms: int) -> Optional[int]:
+        """이전 구간 이후 추가된 행 수 (이어 붙일 수 없으면 None)"""
+        if len(dates) == 0 or len(state.dates) == 0:
+            return None
+
+        last = state.dates[-1]
+        position = int(np.searchsorted(dates, last))
+        if position >= len(dates) or dates[position] != last or closes[position] != state.last_close:
+            return None
+
+        # 겹치는 구간이 이전 구간 안에 있어야 기존 출력을 재사용 가능
+        overlap = position + 1
+        if overlap > len(state.dates) or state.dates[-overlap] != dates[0]:
+            return None
+
+        # 새 행 사이에 누락 캔들이 있으면 상태를 이어갈 수 없음
+        if np.any(np.diff(dates[position:]) != tf_ms):
+            return None
+
+        return len(dates) - overlap
+
+    def _init_kernel(self, state: _IncrementalState, key: Tuple,
+                     inputs: Dict[str, np.ndarray]) -> bool:
+        """전체 구간으로 커널 초기화 (미지원 지표/데이터 부족이면 False)"""
+        kernel = create_kernel(key[0], dict(key[1]))
+        if kernel is None or len(inputs['close']) <= kernel.lookback():
+            return False
+
+        outputs = kernel.init(inputs)
+        for values in outputs.values():
+            values.setflags(write=False)
+        state.kernels[key] = kernel
+        state.outputs[key] = outputs
+        return True
+
+    def _advance(self, state: _IncrementalState, inputs: Dict[str, np.ndarray],
+                 new_rows: int):
+        """모든 커널에 새 행만 반영하고 출력 구간을 현재 데이터에 맞춤"""
+        length = len(inputs['close'])
+        tail = {column: values[length - new_rows:] for column, values in inputs.items()}
+
+        for key, kernel in state.kernels.items():
+            new_outputs = kernel.update(tail)
+            outputs = {}
+            for name, values in state.outputs[key].items():
+                merged = np.concatenate([values[len(values) - (length - new_rows):], new_outputs[name]])
+                merged.setflags(write=False)
+                outputs[name] = merged
+            state.outputs[key] = outputs
+
+    def _get_incremental_state(self, dataframe: DataFrame, pair: str,
+                               timeframe: str) -> Tuple[_IncrementalState, Dict[str, np.ndarray]]:
+        """현재 데이터 구간에 맞춘 증분 상태 (연속되지 않으면 새로 초기화)"""
+        dates = dataframe['date'].values.astype('datetime64[ms]').astype(np.int64)
+        inputs = self._inputs(dataframe)
+        key = (pair, timeframe)
+
+        state = self._incremental.get(key)
+        new_rows = None
+        if state is not None:
+            new_rows = self._new_row_count(state, dates, inputs['close'], timeframe_to_ms(timeframe))
+
+        if new_rows is None:
+            if state is not None:
+                logger.info(f"Indicator state reset for {pair} {timeframe} (candle gap or history change)")
+            state = _IncrementalState(dates, inputs['close'][-1])
+            self._incremental[key] = state
+            if len(self._incremental) > self.max_entries:
+                self._incremental.popitem(last=False)
+        else:
+            self._incremental.move_to_end(key)
+            if new_rows > 0:
+                self._advance(state, inputs, new_rows)
+                self.incremental_updates += 1
+            state.dates = dates
+            state.last_close = inputs['close'][-1]
+
+        return state, inputs
+
+    def compute(self, dataframe: DataFrame, pair: str, spec: Dict[str, Indicator],
+                timeframe: str = '', incremental: bool = False) -> Dict[str, np.ndarray]:
+        """명세의 컬럼별 지표 배열 반환 (캐시된 조합은 재계산하지 않음)
+
+        incremental=True (라이브/드라이런) 이면 결과를 (페어, 타임프레임) 캐시에 보관해
+        전략 간 공유하고, 지원 지표(EMA/SMA/RSI/BBANDS/ATR/MACD)를 페어별 상태로
+        이어서 계산 - 새 캔들만 반영하고, 캔들 누락/이력 변경 시 전체 재계산.
+        백테스트/하이퍼옵트는 페어당 한 번만 계산하므로 결과를 이 호출 안에서만 공유.
+        """
+        state = inputs = None
+        if incremental:
+            entry = self._get_entry(pair, timeframe, self._candle_key(dataframe))
+            results = entry.results
+            if timeframe and len(dataframe) > 0:
+                with self._lock:
+                    state, inputs = self._get_incremental_state(dataframe, pair, timeframe)
+        else:
+            results = {}
+
+        columns = {}
+        for column, request in spec.items():
+            with self._lock:
+                outputs = results.get(request.key)
+                if outputs is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+            if outputs is None:
+                if state is not None:
+                    with self._lock:
+                        if request.key in state.outputs or self._init_kernel(state, request.key, inputs):
+                            outputs = state.outputs[request.key]
+                if outputs is None:
+                    outputs = self._compute(dataframe, request)
+                    self.full_recomputes += 1
+
+                # 다른 전략이 먼저 넣었으면 그 결과 사용
+                with self._lock:
+                    outputs = results.setdefault(request.key, outputs)
+
+            columns[column] = outputs[request.output] if request.output else next(iter(outputs.values()))
+
+        return columns
+
+    def populate(self, dataframe: DataFrame, pair: str, spec: Dict[str, Indicator],
+                 timeframe: str = '', incremental: bool = False) -> DataFrame:
+        """명세의 컬럼을 데이터프레임에 추가 (공유 배열의 복사본)"""
+        for column, values in self.compute(dataframe, pair, spec, timeframe, incremental).items():
+            dataframe[column] = values.copy()
+        return dataframe
+
+    def get_stats(self) -> Dict:
+        """캐시 통계"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0,
+            'incremental_pairs': len(self._incremental),
+            'incremental_updates': self.incremental_updates,
+            'full_recomputes': self.full_recomputes
+        }
+
+def is_live_mode(dp) -> bool:
+    """실거래/드라이런 여부 (증분 계산 사용 조건)"""
+    runmode = getattr(dp, 'runmode', None)
+    return getattr(runmode, 'value', None) in ('live', 'dry_run')
+
+def is_hyperopt_mode(dp) -> bool:
+    """하이퍼옵트 여부 (파라미터 공간 지표 큐브 사용 조건)"""
+    runmode = getattr(dp, 'runmode', None)
+    return getattr(runmode, 'value', None) == 'hyperopt'
+
+_engine: Optional[IndicatorEngine] = None
+_engine_lock = threading.Lock()
+
+def get_indicator_engine() -> IndicatorEngine:
+    """프로세스 공용 엔진 (전략 간 공유)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine()
+        return _engine
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+OHLCV Cache
+===========
+
+캔들 단위 OHLCV 캐시
+- (pair, timeframe) 별 하나의 메모리 배열을 여러 분석에서 공유
+- 새 캔들이 열렸을 때만 갱신, 누락된 마지막 구간만 요청
+- 갱신될 때마다 버전 증가 (파생 계산 캐시 무효화용)
+"""
+
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 컬럼 순서: timestamp, open, high, low, close, volume
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_TIMEFRAME_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """타임프레임 문자열을 밀리초로 변환 (예: '1h' -> 3600000)"""
+    return int(timeframe[:-1]) * _TIMEFRAME_UNITS_MS[timeframe[-1]]
+
+def next_candle_close(timeframe: str, now_ms: Optional[int] = None) -> int:
+    """현재 진행 중인 캔들의 마감 시각 (epoch ms)"""
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    tf_ms = timeframe_to_ms(timeframe)
+    return now_ms - now_ms % tf_ms + tf_ms
+
+@dataclass
+class _OHLCVEntry:
+    data: np.ndarray         # shape (n, 6), 시간순
+    max_rows: int            # 지금까지 전체 요청에 사용한 최대 limit
+    version: int = 0
+
+class OHLCVCache:
+    """(pair, timeframe) 별 OHLCV 캐시"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+        self._entries: Dict[Tuple[str, str], _OHLCVEntry] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self.fetch_count = 0
+
+    def _lock_for(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _fetch(self, pair: str, timeframe: str, since: Optional[int] = None,
+               limit: Optional[int] = None) -> np.ndarray:
+        self.fetch_count += 1
+        if since is not None:
+            ohlcv = self.exchange.fetch_ohlcv(pair, timeframe, since=since, limit=limit)
+        else:
+            ohlcv = self.exchange.fetch_ohlcv(pair, timeframe, limit=limit)
+
+        if not ohlcv:
+            return np.empty((0, len(OHLCV_COLUMNS)), dtype=np.float64)
+        return np.asarray(ohlcv, dtype=np.float64)
+
+    @staticmethod
+    def _has_history(entry: _OHLCVEntry, limit: int) -> bool:
+        """요청 길이를 충족하는지 (이미 limit 이상으로 요청했는데 짧게 왔다면 거래소 히스토리 전체로 간주)"""
+        if len(entry.data) == 0:
+            return False
+        return len(entry.data) >= limit or entry.max_rows >= limit
+
+    def _is_fresh(self, entry: _OHLCVEntry, timeframe: str, limit: int, now_ms: int) -> bool:
+        """마지막 캔들이 현재 캔들이고 요청 길이를 충족하는지"""
+        if not self._has_history(entry, limit):
+            return False
+        tf_ms = timeframe_to_ms(timeframe)
+        current_open = now_ms - now_ms % tf_ms
+        return entry.data[-1, 0] >= current_open
+
+    def get(self, pair: str, timeframe: str, limit: int) -> np.ndarray:
+        """최근 limit 개 캔들 (필요 시에만 거래소 요청)"""
+        key = (pair, timeframe)
+        now_ms = int(time.time() * 1000)
+
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry, timeframe, limit, now_ms):
+            return entry.data[-limit:]
+
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, timeframe, limit, now_ms):
+                return entry.data[-limit:]
+
+            if entry is None or not self._has_history(entry, limit):
+                # 캐시 없음 또는 더 긴 히스토리 필요 → 전체 요청
+                data = self._fetch(pair, timeframe, limit=limit)
+                max_rows = max(limit, entry.max_rows if entry else 0)
+                version = entry.version + 1 if entry else 1
+            else:
+                # 마지막 캔들(미완성일 수 있음)부터 이어서 요청
+                last_open = int(entry.data[-1, 0])
+                tail = self._fetch(pair, timeframe, since=last_open)
+                if len(tail) > 0:
+                    keep = entry.data[entry.data[:, 0] < tail[0, 0]]
+                    data = np.concatenate([keep, tail])
+                else:
+                    data = entry.data
+                max_rows = entry.max_rows
+                version = entry.version + 1
+
+            data = data[-max_rows:]
+            data.setflags(write=False)
+            entry = _OHLCVEntry(data=data, max_rows=max_rows, version=version)
+            self._entries[key] = entry
+
+            return entry.data[-limit:]
+
+    def version(self, pair: str, timeframe: str) -> int:
+        """캐시 배열 버전 (갱신 시마다 증가, 캐시 없으면 0)"""
+        entry = self._entries.get((pair, timeframe))
+        return entry.version if entry else 0
+
+    def invalidate(self, pair: Optional[str] = None):
+        """캐시 무효화 (pair 미지정 시 전체)"""
+        if pair is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == pair]:
+            self._entries.pop(key, None)
+
+_caches: Dict[int, OHLCVCache] = {}
+_caches_lock = threading.Lock()
+
+def get_ohlcv_cache(exchange) -> OHLCVCache:
+    """거래소 인스턴스별 공유 캐시"""
+    with _caches_lock:
+        cache = _caches.get(id(exchange))
+        if cache is None or cache.exchange is not exchange:
+            cache = OHLCVCache(exchange)
+            _caches[id(exchange)] = cache
+        return cache
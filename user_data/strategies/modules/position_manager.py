@@ -11,12 +11,17 @@ Position Manager
 """
 
 import time
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 
+from rate_limiter import TokenBucket
+
 logger = logging.getLogger(__name__)
 
 class PositionMode(Enum):
@@ -29,7 +34,7 @@ class MarginMode(Enum):
     ISOLATED = "ISOLATED"   # 격리 마진
     CROSS = "CROSSED"       # 교차 마진
 
-@dataclass
+@dataclass(frozen=True)
 class PositionInfo:
     """포지션 정보"""
     symbol: str
@@ -47,6 +52,47 @@ class PositionInfo:
     margin_mode: str
     risk_level: str
 
+@dataclass(frozen=True)
+class PositionSnapshot:
+    """한 틱 시점의 포지션/계좌 스냅샷 (읽기 전용)"""
+    taken_at: float                                   # time.monotonic()
+    timestamp: datetime
+    positions: Optional[Tuple[PositionInfo, ...]]     # 조회 실패 시 None
+    account: Mapping[str, Any]                        # 조회 실패 시 빈 매핑
+    by_symbol: Mapping[str, Tuple[PositionInfo, ...]]
+    by_symbol_side: Mapping[Tuple[str, str], PositionInfo]
+
+    @classmethod
+    def build(cls, positions: Optional[List[PositionInfo]], account: Dict) -> 'PositionSnapshot':
+        """심볼 인덱스를 포함한 스냅샷 생성"""
+        by_symbol: Dict[str, Tuple[PositionInfo, ...]] = {}
+        by_symbol_side: Dict[Tuple[str, str], PositionInfo] = {}
+
+        for position in positions or []:
+            by_symbol[position.symbol] = by_symbol.get(position.symbol, ()) + (position,)
+            by_symbol_side[(position.symbol, position.side)] = position
+
+        return cls(
+            taken_at=time.monotonic(),
+            timestamp=datetime.now(),
+            positions=tuple(positions) if positions is not None else None,
+            account=MappingProxyType(dict(account)),
+            by_symbol=MappingProxyType(by_symbol),
+            by_symbol_side=MappingProxyType(by_symbol_side)
+        )
+
+    @property
+    def age(self) -> float:
+        """스냅샷 경과 시간 (초)"""
+        return time.monotonic() - self.taken_at
+
+    def get(self, symbol: str, side: Optional[str] = None) -> Optional[PositionInfo]:
+        """심볼(+방향) 포지션 조회 - O(1)"""
+        if side:
+            return self.by_symbol_side.get((symbol, side.upper()))
+        positions = self.by_symbol.get(symbol)
+        return positions[0] if positions else None
+
 class PositionManager:
     """포지션 모드 및 마진 관리"""
 
@@ -54,9 +100,17 @@ class PositionManager:
         self.exchange = exchange
         self.current_position_mode = PositionMode.ONE_WAY
         self.default_margin_mode = MarginMode.ISOLATED
-        self.position_cache = {}
         self.last_update = datetime.now()
 
+        # 틱 단위 포지션/계좌 스냅샷 (모든 조회가 공유)
+        self.snapshot_ttl = 1.0  # 초
+        self._snapshot: Optional[PositionSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+
+        # 긴급 청산 주문 속도 제한 (Binance 주문 한도 내 순간 20건)
+        self.order_rate_limiter = TokenBucket(rate=20, capacity=20)
+        self.max_close_workers = 20
+
     def set_position_mode(self, hedge_mode: bool = False) -> bool:
         """포지션 모드 설정"""
         try:
@@ -91,6 +145,7 @@ class PositionManager:
                 marginType=margin_type.value
             )
 
+            self.invalidate_snapshot()
             logger.info(f"✅ {pair} margin mode set to {margin_type.value}")
             return True
 
@@ -111,6 +166,7 @@ class PositionManager:
                 leverage=leverage
             )
 
+            self.invalidate_snapshot()
             logger.info(f"✅ {pair} leverage set to {leverage}x")
             return result
 
@@ -118,30 +174,65 @@ class PositionManager:
             logger.error(f"Leverage adjustment error for {pair}: {e}")
             return None
 
-    def get_position_info(self, pair: str = None) -> Union[PositionInfo, List[PositionInfo], None]:
-        """포지션 정보 조회"""
+    def get_snapshot(self, max_age: Optional[float] = None,
+                     force_refresh: bool = False) -> PositionSnapshot:
+        """현재 틱 스냅샷 (max_age 초 이내면 재사용)"""
+        max_age = self.snapshot_ttl if max_age is None else max_age
+
+        snapshot = self._snapshot
+        if not force_refresh and snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+
+        with self._snapshot_lock:
+            # 대기 중 다른 스레드가 갱신했으면 재사용
+            current = self._snapshot
+            if current is not None and current is not snapshot and current.age <= max_age:
+                return current
+            if not force_refresh and current is not None and current.age <= max_age:
+                return current
+
+            return self._refresh_snapshot()
+
+    def _refresh_snapshot(self) -> PositionSnapshot:
+        """포지션/계좌 정보를 한 번씩 조회하여 스냅샷 갱신"""
+        positions = self._fetch_positions()
+        account = self._fetch_account_balance()
+
+        snapshot = PositionSnapshot.build(positions, account)
+        self._snapshot = snapshot
+        self.last_update = snapshot.timestamp
+        return snapshot
+
+    def invalidate_snapshot(self):
+        """주문/설정 변경 후 스냅샷 무효화"""
+        self._snapshot = None
+
+    def _fetch_positions(self) -> Optional[List[PositionInfo]]:
+        """활성 포지션 조회 (API)"""
         try:
             positions = self.exchange._api.futures_position_information()
-
-            if pair:
-                # 특정 페어 포지션 정보
-                symbol = pair.replace('/', '')
-                for pos in positions:
-                    if pos['symbol'] == symbol and float(pos['positionAmt']) != 0:
-                        return self._format_position_info(pos)
-                return None
-            else:
-                # 모든 활성 포지션 정보
-                active_positions = []
-                for pos in positions:
-                    if float(pos['positionAmt']) != 0:
-                        active_positions.append(self._format_position_info(pos))
-                return active_positions
+            return [self._format_position_info(pos) for pos in positions
+                    if float(pos['positionAmt']) != 0]
 
         except Exception as e:
             logger.error(f"Position info fetch error: {e}")
             return None
 
+    def get_position_info(self, pair: str = None,
+                          side: Optional[str] = None) -> Union[PositionInfo, List[PositionInfo], None]:
+        """포지션 정보 조회 (스냅샷 기반, side 는 헤지 모드용 LONG/SHORT)"""
+        snapshot = self.get_snapshot()
+        if snapshot.positions is None:
+            return None
+
+        if pair:
+            # 특정 페어 포지션 정보
+            symbol = pair.replace('/', '')
+            return snapshot.get(symbol, side)
+        else:
+            # 모든 활성 포지션 정보
+            return list(snapshot.positions)
+
     def _format_position_info(self, position: Dict) -> PositionInfo:
         """포지션 정보 포맷팅"""
 
@@ -200,8 +291,12 @@ class PositionManager:
         else:
             return "LOW"
 
-    def get_account_balance(self) -> Dict:
-        """계좌 잔고 정보 조회"""
+    def get_account_balance(self) -> Mapping[str, Any]:
+        """계좌 잔고 정보 조회 (스냅샷 기반, 읽기 전용)"""
+        return self.get_snapshot().account
+
+    def _fetch_account_balance(self) -> Dict:
+        """계좌 잔고 정보 조회 (API)"""
         try:
             account_info = self.exchange._api.futures_account()
 
@@ -314,6 +409,7 @@ class PositionManager:
                 params={'reduceOnly': True}  # 포지션 감소 전용
             )
 
+            self.invalidate_snapshot()
             logger.info(f"✅ {percentage}% of {pair} position closed")
             return order
 
@@ -322,44 +418,94 @@ class PositionManager:
             return None
 
     def emergency_close_all_positions(self) -> List[Dict]:
-        """모든 포지션 긴급 청산"""
+        """모든 포지션 긴급 청산 (동시 주문)"""
 
-        results = []
-        positions = self.get_position_info()
+        started = time.perf_counter()
+
+        # 하나의 스냅샷에서 청산 수량 결정
+        snapshot = self.get_snapshot(force_refresh=True)
+        positions = snapshot.positions
 
         if not positions:
             logger.info("No active positions to close")
-            return results
-
-        for position in positions:
-            try:
-                pair = position.symbol.replace('USDT', '/USDT:USDT')  # 페어 형식 변환
-                result = self.close_position(pair, 100)
-                if result:
-                    results.append({
-                        'symbol': position.symbol,
-                        'status': 'success',
-                        'order': result
-                    })
-                else:
-                    results.append({
-                        'symbol': position.symbol,
-                        'status': 'failed',
-                        'error': 'Close order failed'
-                    })
-
-                time.sleep(0.1)  # API 호출 제한 방지
-
-            except Exception as e:
-                results.append({
-                    'symbol': position.symbol,
-                    'status': 'error',
-                    'error': str(e)
-                })
+            return []
+
+        workers = min(self.max_close_workers, len(positions))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self._submit_close_order, positions))
+
+        self.invalidate_snapshot()
 
-        logger.info(f"Emergency close completed: {len(results)} positions processed")
+        failed = len([r for r in results if r['status'] != 'success'])
+        logger.info(f"Emergency close completed: {len(results)} positions processed, "
+                    f"{failed} failed in {(time.perf_counter() - started) * 1000:.0f}ms")
         return results
 
+    def _submit_close_order(self, position: PositionInfo) -> Dict:
+        """스냅샷 포지션 전량 시장가 청산 주문"""
+
+        pair = position.symbol.replace('USDT', '/USDT:USDT')  # 페어 형식 변환
+        side = 'sell' if position.side == 'LONG' else 'buy'
+
+        # 헤지 모드는 reduceOnly 대신 positionSide 로 해당 방향만 감소
+        if self.current_position_mode == PositionMode.HEDGE:
+            params = {'positionSide': position.side}
+        else:
+            params = {'reduceOnly': True}
+
+        self.order_rate_limiter.acquire()
+        started = time.perf_counter()
+
+        try:
+            order = self.exchange.create_market_order(
+                symbol=pair,
+                side=side,
+                amount=position.size,
+                params=params
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            if not order:
+                return {
+                    'symbol': position.symbol,
+                    'side': position.side,
+                    'status': 'failed',
+                    'error': 'Close order failed',
+                    'latency_ms': latency_ms
+                }
+
+            filled = float(order.get('filled') or 0)
+            return {
+                'symbol': position.symbol,
+                'side': position.side,
+                'status': 'success',
+                'order': order,
+                'requested': position.size,
+                'filled': filled,
+                'fill_status': self._get_fill_status(order, position.size, filled),
+                'latency_ms': latency_ms
+            }
+
+        except Exception as e:
+            logger.error(f"Emergency close error for {pair}: {e}")
+            return {
+                'symbol': position.symbol,
+                'side': position.side,
+                'status': 'error',
+                'error': str(e),
+                'latency_ms': (time.perf_counter() - started) * 1000
+            }
+
+    def _get_fill_status(self, order: Dict, requested: float, filled: float) -> str:
+        """주문 체결 상태 (FILLED / PARTIAL / PENDING)"""
+
+        if order.get('status') == 'closed' or (requested > 0 and filled >= requested):
+            return "FILLED"
+        elif filled > 0:
+            return "PARTIAL"
+        else:
+            return "PENDING"
+
     def optimize_margin_allocation(self) -> Dict:
         """마진 할당 최적화"""
 
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter
+============
+
+거래소 API 호출 속도 제한
+- 토큰 버킷 방식 (초당 요청 수 + 순간 허용량)
+- 여러 스레드가 하나의 버킷을 공유
+"""
+
+import time
+import threading
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """스레드 안전 토큰 버킷"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate                                  # 초당 충전 토큰 수
+        self.capacity = capacity if capacity else rate    # 최대 보관 토큰 수
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """경과 시간만큼 토큰 충전"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """토큰 즉시 획득 시도 (대기 없음)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """토큰 획득 (부족하면 충전될 때까지 대기)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+    @property
+    def available(self) -> float:
+        """현재 사용 가능한 토큰 수"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
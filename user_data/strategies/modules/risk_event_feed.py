@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Risk Event Feed
+===============
+
+리스크 모니터용 포지션/마크 가격 이벤트 스트림
+- RiskEventFeed: 구독/발행 공통 인터페이스
+- LocalRiskEventFeed: 테스트/리플레이용 로컬 피드
+- BinanceFuturesRiskFeed: Binance 선물 웹소켓 (마크 가격 + 유저 데이터)
+"""
+
+import json
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 이벤트 종류
+MARK_PRICE = "mark_price"
+POSITION = "position"
+
+@dataclass
+class RiskEvent:
+    """포지션/가격 변경 이벤트"""
+    event_type: str                 # MARK_PRICE, POSITION
+    symbol: str                     # BTCUSDT 형식
+    data: Dict
+    received_at: float = field(default_factory=time.monotonic)  # 수신 시각 (지연 측정 기준)
+
+class RiskEventFeed:
+    """이벤트 피드 기본 클래스"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[RiskEvent], None]] = []
+        self.last_event_at: Optional[float] = None
+        self.running = False
+
+    def subscribe(self, callback: Callable[[RiskEvent], None]):
+        """이벤트 구독"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[RiskEvent], None]):
+        """구독 해제"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _emit(self, event: RiskEvent):
+        """구독자에게 이벤트 전달"""
+        self.last_event_at = event.received_at
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Risk feed subscriber error: {e}")
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def is_healthy(self, max_silence: float) -> bool:
+        """최근 max_silence 초 이내에 이벤트가 있었는지"""
+        if not self.running or self.last_event_at is None:
+            return False
+        return time.monotonic() - self.last_event_at <= max_silence
+
+class LocalRiskEventFeed(RiskEventFeed):
+    """로컬 피드 (테스트/리플레이용)"""
+
+    def push_mark_price(self, symbol: str, mark_price: float):
+        """마크 가격 이벤트 발행"""
+        self._emit(RiskEvent(MARK_PRICE, symbol, {'mark_price': float(mark_price)}))
+
+    def push_position(self, symbol: str, side: str, one_way: bool = True, **fields):
+        """포지션 변경 이벤트 발행 (PositionInfo 필드명 사용, size=0 이면 종료)"""
+        self._emit(RiskEvent(POSITION, symbol, dict(fields, side=side, one_way=one_way)))
+
+    def replay(self, events: Iterable[RiskEvent], speed: float = 0):
+        """기록된 이벤트 재생 (speed=0 이면 대기 없이 즉시)"""
+        previous = None
+        for event in events:
+            if speed > 0 and previous is not None:
+                time.sleep(max(0.0, (event.received_at - previous) / speed))
+            previous = event.received_at
+            self._emit(RiskEvent(event.event_type, event.symbol, event.data))
+
+class BinanceFuturesRiskFeed(RiskEventFeed):
+    """Binance 선물 웹소켓 피드 (websockets 패키지 필요)"""
+
+    MAINNET_URL = "wss://fstream.binance.com/ws"
+    TESTNET_URL = "wss://stream.binancefuture.com/ws"
+
+    def __init__(self, exchange=None, testnet: bool = False, reconnect_delay: float = 5.0):
+        super().__init__()
+        self.exchange = exchange
+        self.base_url = self.TESTNET_URL if testnet else self.MAINNET_URL
+        self.reconnect_delay = reconnect_delay
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """백그라운드 스레드에서 스트림 시작"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("📡 Binance futures risk feed started")
+
+    def stop(self):
+        self.running = False
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        tasks = [self._stream(f"{self.base_url}/!markPrice@arr@1s", self._on_mark_prices)]
+        listen_key = self._get_listen_key()
+        if listen_key:
+            tasks.append(self._stream(f"{self.base_url}/{listen_key}", self._on_user_data))
+            tasks.append(self._keepalive_listen_key(listen_key))
+
+        try:
+            self._loop.run_until_complete(asyncio.gather(*tasks))
+        except RuntimeError:
+            pass  # stop() 에 의한 루프 종료
+        finally:
+            self._loop.close()
+
+    def _get_listen_key(self) -> Optional[str]:
+        """유저 데이터 스트림 listenKey 발급 (실패 시 마크 가격만 사용)"""
+        if self.exchange is None:
+            return None
+        try:
+            return self.exchange._api.futures_stream_get_listen_key()
+        except Exception as e:
+            logger.error(f"Listen key request failed, position stream disabled: {e}")
+            return None
+
+    async def _keepalive_listen_key(self, listen_key: str):
+        """listenKey 30분마다 연장"""
+        while self.running:
+            await asyncio.sleep(30 * 60)
+            try:
+                await self._loop.run_in_executor(
+                    None, lambda: self.exchange._api.futures_stream_keepalive(listenKey=listen_key)
+                )
+            except Exception as e:
+                logger.error(f"Listen key keepalive failed: {e}")
+
+    async def _stream(self, url: str, handler: Callable[[Dict], None]):
+        """웹소켓 연결 유지 (끊기면 재연결)"""
+        import websockets
+
+        while self.running:
+            try:
+                async with websockets.connect(url, ping_interval=20) as websocket:
+                    async for message in websocket:
+                        if not self.running:
+                            return
+                        handler(json.loads(message))
+            except Exception as e:
+                logger.error(f"Risk feed stream error ({url.split('/')[-1][:16]}): {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _on_mark_prices(self, payload):
+        """!markPrice@arr 메시지 처리"""
+        for item in payload if isinstance(payload, list) else [payload]:
+            self._emit(RiskEvent(MARK_PRICE, item['s'], {'mark_price': float(item['p'])}))
+
+    def _on_user_data(self, payload: Dict):
+        """ACCOUNT_UPDATE 메시지의 포지션 변경 처리"""
+        if payload.get('e') != 'ACCOUNT_UPDATE':
+            return
+
+        for item in payload.get('a', {}).get('P', []):
+            position_amt = float(item['pa'])
+            side = item.get('ps', 'BOTH')
+            one_way = side == 'BOTH'
+            if one_way:
+                side = 'LONG' if position_amt >= 0 else 'SHORT'
+
+            self._emit(RiskEvent(POSITION, item['s'], {
+                'side': side,
+                'one_way': one_way,  # 단방향 모드: 심볼의 기존 포지션을 대체
+                'size': abs(position_amt),
+                'entry_price': float(item['ep']),
+                'unrealized_pnl': float(item['up'])
+            }))
@@ -13,12 +13,15 @@ Risk Monitor
 import time
 import threading
 import asyncio
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 
+from risk_event_feed import RiskEvent, RiskEventFeed, MARK_PRICE, POSITION
+
 logger = logging.getLogger(__name__)
 
 class AlertLevel(Enum):
@@ -58,9 +61,18 @@ class RiskMonitor:
         self.telegram_bot = telegram_bot
 
         self.monitoring = False
-        self.alert_history = []
         self.notification_handlers = []
 
+        # 알림 기록 (최근 100개 링 버퍼)
+        self.alert_history = deque(maxlen=100)
+
+        # 중복 판정 인덱스: (symbol, metric, level) -> 마지막 발송 시각
+        self._last_alert_at: Dict[Tuple[str, RiskMetric, AlertLevel], datetime] = {}
+
+        # 최근 24시간 레벨별 알림 수 (만료 시 차감)
+        self._recent_alerts = deque()  # (timestamp, level)
+        self._recent_alert_counts = {level: 0 for level in AlertLevel}
+
         # 리스크 임계값 설정
         self.thresholds = {
             'margin_ratio': {
@@ -88,6 +100,26 @@ class RiskMonitor:
             'log_all_alerts': True
         }
 
+        # 스트림 모드 (변경된 심볼만 재평가)
+        self.feed: Optional[RiskEventFeed] = None
+        self.feed_stale_after = 10.0    # 초, 이벤트가 끊기면 폴링으로 대체
+        self.resync_interval = 300      # 초, 스트림 중 전체 재조회 주기
+        self._live_positions: Dict[Tuple[str, str], object] = {}
+        self._dirty_symbols: Dict[str, float] = {}   # symbol -> 최초 이벤트 수신 시각
+        self._resync_requested = False
+        self._state_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+        # 심볼별 최신 평가 결과: symbol -> {side: (평가 시각, 알림)}
+        # 모니터/피드/전략 스레드가 공유 - 변경은 _risk_lock 안에서만
+        self._risk_state: Dict[str, Dict[str, Tuple[float, Tuple[RiskAlert, ...]]]] = {}
+        self._risk_lock = threading.Lock()
+        self._full_check_at: Optional[float] = None
+
+        # 이벤트 수신 → 알림 발송 지연 (ms)
+        self._event_received_at: Optional[float] = None
+        self.alert_latencies_ms = deque(maxlen=1000)
+
     def start_monitoring(self, interval: int = 30) -> bool:
         """리스크 모니터링 시작"""
         try:
@@ -112,9 +144,43 @@ class RiskMonitor:
             logger.error(f"Failed to start risk monitoring: {e}")
             return False
 
+    def start_streaming(self, feed: RiskEventFeed, interval: int = 30) -> bool:
+        """이벤트 기반 리스크 모니터링 시작 (피드가 끊기면 interval 주기 폴링)"""
+        try:
+            if self.monitoring:
+                logger.warning("Risk monitoring is already running")
+                return False
+
+            self.feed = feed
+            feed.subscribe(self._on_feed_event)
+            self.monitoring = True
+            feed.start()
+
+            stream_thread = threading.Thread(
+                target=self._stream_loop,
+                args=(interval,),
+                daemon=True
+            )
+            stream_thread.start()
+
+            logger.info(f"📡 Risk monitoring started in streaming mode (fallback interval: {interval}s)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start risk streaming: {e}")
+            self.monitoring = False
+            return False
+
     def stop_monitoring(self):
         """리스크 모니터링 중지"""
         self.monitoring = False
+
+        if self.feed is not None:
+            self.feed.unsubscribe(self._on_feed_event)
+            self.feed.stop()
+            self.feed = None
+        self._wakeup.set()
+
         logger.info("⏹️  Risk monitoring stopped")
 
     def _monitor_loop(self, interval: int):
@@ -127,39 +193,283 @@ class RiskMonitor:
                 logger.error(f"Monitoring loop error: {e}")
                 time.sleep(60)  # 에러 시 1분 대기
 
+    def _stream_loop(self, interval: int):
+        """스트림 모드 메인 루프"""
+        last_full_check = 0.0
+
+        while self.monitoring:
+            try:
+                # 피드가 살아있으면 가끔 전체 재조회, 끊겼으면 폴링 주기로 재조회
+                feed_healthy = self.feed is not None and self.feed.is_healthy(self.feed_stale_after)
+                full_check_interval = self.resync_interval if feed_healthy else interval
+
+                if self._resync_requested or time.monotonic() - last_full_check >= full_check_interval:
+                    self._resync_requested = False
+                    self._check_all_risks()
+                    last_full_check = time.monotonic()
+
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                self._check_dirty_symbols()
+
+            except Exception as e:
+                logger.error(f"Streaming loop error: {e}")
+                time.sleep(1)
+
+    def _on_feed_event(self, event: RiskEvent):
+        """피드 이벤트 반영 (피드 스레드에서 호출, 평가는 모니터 스레드에서)"""
+        with self._state_lock:
+            if event.event_type == MARK_PRICE:
+                changed = self._apply_mark_price(event.symbol, event.data['mark_price'])
+            elif event.event_type == POSITION:
+                changed = self._apply_position_update(event.symbol, event.data)
+            else:
+                changed = False
+
+            if changed:
+                self._dirty_symbols.setdefault(event.symbol, event.received_at)
+
+        if changed:
+            self._wakeup.set()
+
+    def _apply_mark_price(self, symbol: str, mark_price: float) -> bool:
+        """보유 포지션의 마크 가격 갱신"""
+        changed = False
+        for side in ('LONG', 'SHORT'):
+            position = self._live_positions.get((symbol, side))
+            if position is not None and position.mark_price != mark_price:
+                self._live_positions[(symbol, side)] = self._reprice_position(position, mark_price)
+                changed = True
+        return changed
+
+    def _apply_position_update(self, symbol: str, data: Dict) -> bool:
+        """포지션 변경 반영 (신규 포지션은 다음 전체 재조회에서 추가)"""
+        side = data['side']
+
+        if data.get('one_way'):
+            for other_side in ('LONG', 'SHORT'):
+                if other_side != side:
+                    self._live_positions.pop((symbol, other_side), None)
+
+        key = (symbol, side)
+        if data.get('size') == 0:
+            self._drop_risk_state(symbol, side)
+            return self._live_positions.pop(key, None) is not None
+
+        position = self._live_positions.get(key)
+        if position is None:
+            # 마진/청산가 정보가 없으므로 전체 재조회 요청
+            self._resync_requested = True
+            self._wakeup.set()
+            return False
+
+        fields = {name: value for name, value in data.items()
+                  if name in position.__dataclass_fields__ and name not in ('symbol', 'side')}
+        updated = replace(position, **fields)
+        self._live_positions[key] = self._reprice_position(updated, updated.mark_price, base=position)
+        return True
+
+    @staticmethod
+    def _reprice_position(position, mark_price: float, base=None):
+        """마크 가격 기준 미실현 손익/수익률/증거금/마진 비율 재계산
+
+        base: 증거금 값의 기준 포지션 (직전 상태, 기본값은 position 자신)
+        """
+        base = base or position
+        direction = 1 if position.side == 'LONG' else -1
+        entry_price = position.entry_price
+
+        unrealized_pnl = (mark_price - entry_price) * position.size * direction
+        percentage = direction * (mark_price - entry_price) / entry_price * 100 if entry_price > 0 else 0
+
+        # 유지 증거금은 명목가(마크 가격), 초기 증거금은 진입 금액에 비례
+        base_notional = base.mark_price * base.size
+        base_cost = base.entry_price * base.size
+        maintenance_margin = base.maintenance_margin
+        if base_notional > 0:
+            maintenance_margin *= mark_price * position.size / base_notional
+        initial_margin = base.initial_margin
+        if base_cost > 0:
+            initial_margin *= entry_price * position.size / base_cost
+
+        # 마진 비율 = 유지 증거금 / 마진 잔고 (초기 증거금 + 미실현 손익)
+        # 거래소 값과 맞추기 위해 직전 값에 두 항의 변화율만 적용
+        margin_ratio = base.margin_ratio
+        base_balance = base.initial_margin + base.unrealized_pnl
+        balance = initial_margin + unrealized_pnl
+        if base.maintenance_margin > 0 and base_balance > 0:
+            if balance <= 0:
+                margin_ratio = 1.0  # 마진 잔고 소진 (청산 수준)
+            else:
+                margin_ratio = base.margin_ratio * (maintenance_margin / base.maintenance_margin) \
+                    * (base_balance / balance)
+
+        return replace(position, mark_price=mark_price,
+                       unrealized_pnl=unrealized_pnl, percentage=percentage,
+                       maintenance_margin=maintenance_margin, initial_margin=initial_margin,
+                       margin_ratio=margin_ratio)
+
+    def _check_dirty_symbols(self):
+        """이벤트로 변경된 심볼만 재평가"""
+        with self._state_lock:
+            if not self._dirty_symbols:
+                return
+            dirty, self._dirty_symbols = self._dirty_symbols, {}
+            positions = [position for position in self._live_positions.values()
+                         if position.symbol in dirty]
+
+        for position in positions:
+            self._event_received_at = dirty[position.symbol]
+            try:
+                self._check_position_risks(position)
+            finally:
+                self._event_received_at = None
+
+    def check_position_risk(self, pair: str, max_age: float = 60.0,
+                            force_refresh: bool = False) -> List[RiskAlert]:
+        """페어의 최신 평가 알림 조회 (max_age 초 이내 평가 결과는 그대로 반환)
+
+        오래됐거나 force_refresh 이면 포지션 스냅샷 기준으로 해당 심볼만 재평가.
+        알림 발송/자동 대응은 하지 않고 저장된 평가 결과만 갱신하며, 포지션이
+        사라졌으면 그 심볼의 평가 결과를 제거.
+        """
+
+        symbol = pair.split(':')[0].replace('/', '')
+
+        if not force_refresh:
+            alerts = self._get_cached_alerts(symbol, max_age)
+            if alerts is not None:
+                return alerts
+
+        # 오래됐거나 강제 갱신: 포지션 스냅샷 기준으로 해당 심볼만 재평가
+        try:
+            snapshot = self.position_manager.get_snapshot(max_age=max_age, force_refresh=force_refresh)
+        except Exception as e:
+            logger.error(f"Position risk refresh failed for {pair}: {e}")
+            return self._get_cached_alerts(symbol, float('inf')) or []
+
+        if snapshot.positions is None:
+            return self._get_cached_alerts(symbol, float('inf')) or []
+
+        positions = snapshot.by_symbol.get(symbol, ())
+        if not positions:
+            self._drop_risk_state(symbol)
+            return []
+
+        # 평가만 수행 (알림 발송/자동 대응은 모니터 루프와 피드 경로에서만)
+        alerts = []
+        for position in positions:
+            alerts.extend(self._evaluate_position_risks(position))
+        return alerts
+
+    def _get_cached_alerts(self, symbol: str, max_age: float) -> Optional[List[RiskAlert]]:
+        """저장된 평가 결과 (max_age 초보다 오래됐으면 None)"""
+
+        # 스트림이 살아있으면 변경 즉시 재평가되므로 저장 결과가 최신
+        if self.feed is not None and self.feed.is_healthy(self.feed_stale_after):
+            max_age = float('inf')
+
+        now = time.monotonic()
+        with self._risk_lock:
+            state = dict(self._risk_state.get(symbol, {}))
+
+        if state:
+            if all(now - evaluated_at <= max_age for evaluated_at, _ in state.values()):
+                return [alert for _, alerts in state.values() for alert in alerts]
+            return None
+
+        # 평가 기록 없음: 최근 전체 확인에서 포지션이 없었으면 알림 없음
+        if self._full_check_at is not None and now - self._full_check_at <= max_age:
+            return []
+        return None
+
+    def get_latency_stats(self) -> Dict:
+        """이벤트 수신 → 알림 발송 지연 통계 (ms)"""
+        latencies = sorted(self.alert_latencies_ms)
+        if not latencies:
+            return {'count': 0}
+
+        return {
+            'count': len(latencies),
+            'avg_ms': sum(latencies) / len(latencies),
+            'p50_ms': latencies[len(latencies) // 2],
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'max_ms': latencies[-1]
+        }
+
     def _check_all_risks(self):
         """모든 리스크 확인"""
 
+        # 틱 시작 시 포지션/계좌 스냅샷 1회 갱신 (이후 조회는 스냅샷 공유)
+        self.position_manager.get_snapshot(force_refresh=True)
+
         # 활성 포지션 조회
         positions = self.position_manager.get_position_info()
+
+        if positions is None:
+            return
+
+        # 스트림 모드 기준 포지션 갱신, 종료된 포지션의 평가 결과 제거
+        with self._state_lock:
+            self._live_positions = {(pos.symbol, pos.side): pos for pos in positions}
+        active_symbols = {pos.symbol for pos in positions}
+        with self._risk_lock:
+            self._risk_state = {symbol: state for symbol, state in self._risk_state.items()
+                                if symbol in active_symbols}
+
         if not positions:
+            self._full_check_at = time.monotonic()
             return
 
         # 각 포지션별 리스크 확인
         for position in positions:
             self._check_position_risks(position)
+        self._full_check_at = time.monotonic()
 
         # 포트폴리오 전체 리스크 확인
         self._check_portfolio_risks(positions)
 
-    def _check_position_risks(self, position):
-        """개별 포지션 리스크 확인"""
+    def _check_position_risks(self, position) -> List[RiskAlert]:
+        """개별 포지션 리스크 확인 및 알림 처리 (모니터 루프/피드 경로 전용)"""
 
-        symbol = position.symbol
+        alerts = self._evaluate_position_risks(position)
+        for alert in alerts:
+            self._handle_alert(alert)
+
+        return alerts
+
+    def _evaluate_position_risks(self, position) -> List[RiskAlert]:
+        """개별 포지션 리스크 평가 (부수 효과 없음 - 평가 결과 저장만)"""
 
-        # 1. 마진 비율 확인
-        self._check_margin_ratio(position)
+        alerts = [alert for alert in (
+            self._check_margin_ratio(position),          # 1. 마진 비율 확인
+            self._check_liquidation_distance(position),  # 2. 청산가 거리 확인
+            self._check_unrealized_pnl(position),        # 3. 미실현 손익 확인
+            self._check_adl_risk(position)               # 4. ADL 위험도 확인
+        ) if alert is not None]
 
-        # 2. 청산가 거리 확인
-        self._check_liquidation_distance(position)
+        # 최신 평가 결과 저장 (중복 억제와 무관하게 현재 위반 중인 알림 전체)
+        with self._risk_lock:
+            sides = dict(self._risk_state.get(position.symbol, {}))
+            sides[position.side] = (time.monotonic(), tuple(alerts))
+            self._risk_state[position.symbol] = sides
 
-        # 3. 미실현 손익 확인
-        self._check_unrealized_pnl(position)
+        return alerts
 
-        # 4. ADL 위험도 확인
-        self._check_adl_risk(position)
+    def _drop_risk_state(self, symbol: str, side: Optional[str] = None):
+        """종료된 포지션의 평가 결과 제거 (side 없으면 심볼 전체)"""
 
-    def _check_margin_ratio(self, position):
+        with self._risk_lock:
+            if side is None:
+                self._risk_state.pop(symbol, None)
+            elif symbol in self._risk_state:
+                sides = {key: value for key, value in self._risk_state[symbol].items() if key != side}
+                if sides:
+                    self._risk_state[symbol] = sides
+                else:
+                    del self._risk_state[symbol]
+
+    def _check_margin_ratio(self, position) -> Optional[RiskAlert]:
         """마진 비율 확인"""
 
         margin_ratio = position.margin_ratio
@@ -177,7 +487,7 @@ class RiskMonitor:
                 suggested_action="IMMEDIATE_POSITION_REDUCTION_OR_CLOSE",
                 priority=10
             )
-            self._handle_alert(alert)
+            return alert
 
         elif margin_ratio >= self.thresholds['margin_ratio']['critical']:
             alert = RiskAlert(
@@ -191,7 +501,7 @@ class RiskMonitor:
                 suggested_action="REDUCE_LEVERAGE_OR_POSITION_SIZE",
                 priority=8
             )
-            self._handle_alert(alert)
+            return alert
 
         elif margin_ratio >= self.thresholds['margin_ratio']['warning']:
             alert = RiskAlert(
@@ -205,13 +515,13 @@ class RiskMonitor:
                 suggested_action="MONITOR_CLOSELY",
                 priority=5
             )
-            self._handle_alert(alert)
+            return alert
 
-    def _check_liquidation_distance(self, position):
+    def _check_liquidation_distance(self, position) -> Optional[RiskAlert]:
         """청산가 거리 확인"""
 
         if position.liquidation_price <= 0:
-            return
+            return None
 
         mark_price = position.mark_price
         liquidation_price = position.liquidation_price
@@ -230,7 +540,7 @@ class RiskMonitor:
                 suggested_action="EMERGENCY_CLOSE_POSITION",
                 priority=10
             )
-            self._handle_alert(alert)
+            return alert
 
         elif distance <= self.thresholds['liquidation_distance']['critical']:
             alert = RiskAlert(
@@ -244,9 +554,9 @@ class RiskMonitor:
                 suggested_action="REDUCE_POSITION_IMMEDIATELY",
                 priority=9
             )
-            self._handle_alert(alert)
+            return alert
 
-    def _check_unrealized_pnl(self, position):
+    def _check_unrealized_pnl(self, position) -> Optional[RiskAlert]:
         """미실현 손익 확인"""
 
         pnl_percent = position.percentage / 100
@@ -264,9 +574,9 @@ class RiskMonitor:
                 suggested_action="CONSIDER_POSITION_CLOSE",
                 priority=8
             )
-            self._handle_alert(alert)
+            return alert
 
-    def _check_adl_risk(self, position):
+    def _check_adl_risk(self, position) -> Optional[RiskAlert]:
         """ADL (Auto-Deleveraging) 위험도 확인"""
 
         # ADL 위험도는 포지션 크기와 수익률에 따라 결정
@@ -288,7 +598,7 @@ class RiskMonitor:
                 suggested_action="CONSIDER_PARTIAL_PROFIT_TAKING",
                 priority=6
             )
-            self._handle_alert(alert)
+            return alert
 
     def _check_portfolio_risks(self, positions):
         """포트폴리오 전체 리스크 확인"""
@@ -328,12 +638,15 @@ class RiskMonitor:
         if self._is_duplicate_alert(alert):
             return
 
-        # 알림 기록에 추가
+        # 알림 기록에 추가 (최근 100개만 유지)
         self.alert_history.append(alert)
+        self._last_alert_at[(alert.symbol, alert.metric, alert.alert_level)] = alert.timestamp
+        self._recent_alerts.append((alert.timestamp, alert.alert_level))
+        self._recent_alert_counts[alert.alert_level] += 1
 
-        # 최근 100개 알림만 유지
-        if len(self.alert_history) > 100:
-            self.alert_history = self.alert_history[-100:]
+        # 만료 항목 정리 (요약 조회가 없어도 크기 유지)
+        self._expire_recent_alerts()
+        self._expire_alert_index()
 
         # 로그 기록
         if self.auto_actions['log_all_alerts']:
@@ -343,6 +656,10 @@ class RiskMonitor:
         if self.auto_actions['send_telegram_alerts'] and self.telegram_bot:
             self._send_telegram_alert(alert)
 
+        # 스트림 이벤트로 감지된 경우 지연 기록
+        if self._event_received_at is not None:
+            self.alert_latencies_ms.append((time.monotonic() - self._event_received_at) * 1000)
+
         # 자동 대응 조치
         self._execute_auto_actions(alert)
 
@@ -356,18 +673,33 @@ class RiskMonitor:
     def _is_duplicate_alert(self, alert: RiskAlert, window_minutes: int = 5) -> bool:
         """중복 알림 확인"""
 
+        last_alert_at = self._last_alert_at.get((alert.symbol, alert.metric, alert.alert_level))
+        if last_alert_at is None:
+            return False
+
+        return last_alert_at >= datetime.now() - timedelta(minutes=window_minutes)
+
+    def _expire_alert_index(self, window_minutes: int = 5):
+        """중복 판정 구간이 지난 인덱스 키 제거"""
+
         cutoff_time = datetime.now() - timedelta(minutes=window_minutes)
+        expired = [key for key, sent_at in self._last_alert_at.items() if sent_at < cutoff_time]
+        for key in expired:
+            del self._last_alert_at[key]
+
+    def _expire_recent_alerts(self, hours: int = 24):
+        """집계 구간이 지난 알림을 레벨별 개수에서 차감"""
 
-        for existing_alert in reversed(self.alert_history):
-            if existing_alert.timestamp < cutoff_time:
-                break
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        while self._recent_alerts and self._recent_alerts[0][0] <= cutoff_time:
+            _, level = self._recent_alerts.popleft()
+            self._recent_alert_counts[level] -= 1
 
-            if (existing_alert.symbol == alert.symbol and
-                existing_alert.metric == alert.metric and
-                existing_alert.alert_level == alert.alert_level):
-                return True
+    def _get_recent_alert_counts(self, hours: int = 24) -> Dict[str, int]:
+        """최근 알림 레벨별 개수 (만료된 항목만 차감)"""
 
-        return False
+        self._expire_recent_alerts(hours)
+        return {level.value: count for level, count in self._recent_alert_counts.items()}
 
     def _send_telegram_alert(self, alert: RiskAlert):
         """텔레그램 알림 발송"""
@@ -452,12 +784,7 @@ class RiskMonitor:
             total_unrealized_pnl += position.unrealized_pnl
 
         # 최근 알림 통계
-        recent_alerts = [a for a in self.alert_history
-                        if a.timestamp > datetime.now() - timedelta(hours=24)]
-        alert_counts = {}
-        for level in AlertLevel:
-            alert_counts[level.value] = len([a for a in recent_alerts
-                                           if a.alert_level == level])
+        alert_counts = self._get_recent_alert_counts(hours=24)
 
         return {
             'monitoring_active': self.monitoring,
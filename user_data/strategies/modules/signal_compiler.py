@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Signal Compiler
+===============
+
+진입/청산 조건 결합 및 조건별 발생 통계
+- 이름 붙은 조건들을 (조건 수, 행 수) 불리언 행렬로 모아 한 번에 AND/OR 축약
+- 조건별 충족 횟수 / 단독으로 신호를 막은 횟수 기록 (어떤 조건이 진입을 막는지 확인)
+- 조건이 없으면 데이터프레임 길이의 False 배열
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+import logging
+
+import numpy as np
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _SignalCounts:
+    """한 신호/페어의 최근 평가 결과"""
+    rows: int
+    signals: int
+    fired: Dict[str, int]       # 조건별 충족 행 수
+    blocking: Dict[str, int]    # AND: 이 조건만 불충족 / OR: 이 조건만 충족
+
+class SignalCompiler:
+    """조건 결합기 (신호별 조건 통계 보관)"""
+
+    def __init__(self):
+        # (신호명, 페어) -> 최근 평가 결과 (라이브에서 같은 구간을 중복 집계하지 않도록 덮어씀)
+        self._counts: Dict[Tuple[str, str], _SignalCounts] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stack(conditions: Mapping[str, object], rows: int) -> np.ndarray:
+        """조건들을 연속된 (조건 수, 행 수) 불리언 행렬로 변환"""
+        matrix = np.empty((len(conditions), rows), dtype=bool)
+        for i, condition in enumerate(conditions.values()):
+            values = getattr(condition, 'values', condition)
+            matrix[i] = np.broadcast_to(np.asarray(values, dtype=bool), rows)
+        return matrix
+
+    def evaluate(self, dataframe: DataFrame, conditions: Mapping[str, object], signal: str,
+                 pair: str = '', any_condition: bool = False) -> np.ndarray:
+        """조건 결합 결과 (데이터프레임 행과 정렬된 불리언 배열)
+
+        any_condition=False 이면 AND, True 이면 OR.
+        """
+        rows = len(dataframe)
+        if not conditions:
+            return np.zeros(rows, dtype=bool)
+
+        matrix = self._stack(conditions, rows)
+        fired = np.count_nonzero(matrix, axis=1)
+
+        fired_per_row = np.count_nonzero(matrix, axis=0)
+        if any_condition:
+            result = fired_per_row > 0
+            # 이 조건 하나만 충족된 행 = 이 조건이 단독으로 신호를 만든 행
+            blocking = np.count_nonzero(matrix & (fired_per_row == 1), axis=1)
+        else:
+            result = fired_per_row == len(conditions)
+            # 이 조건 하나만 불충족인 행 = 이 조건이 단독으로 신호를 막은 행
+            blocking = np.count_nonzero(~matrix & (fired_per_row == len(conditions) - 1), axis=1)
+
+        names = list(conditions)
+        counts = _SignalCounts(
+            rows=rows,
+            signals=int(np.count_nonzero(result)),
+            fired=dict(zip(names, fired.tolist())),
+            blocking=dict(zip(names, blocking.tolist()))
+        )
+        with self._lock:
+            self._counts[(signal, pair)] = counts
+
+        return result
+
+    def get_stats(self, signal: Optional[str] = None) -> Dict:
+        """신호별 조건 통계 (페어 합산)"""
+        with self._lock:
+            items = list(self._counts.items())
+
+        stats: Dict[str, Dict] = {}
+        for (name, _pair), counts in items:
+            if signal is not None and name != signal:
+                continue
+
+            entry = stats.setdefault(name, {'pairs': 0, 'rows': 0, 'signals': 0, 'conditions': {}})
+            entry['pairs'] += 1
+            entry['rows'] += counts.rows
+            entry['signals'] += counts.signals
+            for condition, fired in counts.fired.items():
+                condition_stats = entry['conditions'].setdefault(condition, {'fired': 0, 'blocking': 0})
+                condition_stats['fired'] += fired
+                condition_stats['blocking'] += counts.blocking[condition]
+
+        for entry in stats.values():
+            rows = entry['rows']
+            for condition_stats in entry['conditions'].values():
+                condition_stats['fire_rate'] = condition_stats['fired'] / rows if rows > 0 else 0.0
+
+        return stats
+
+_compiler: Optional[SignalCompiler] = None
+_compiler_lock = threading.Lock()
+
+def get_signal_compiler() -> SignalCompiler:
+    """프로세스 공용 조건 결합기 (전략 간 공유, 신호명으로 구분)"""
+    global _compiler
+    with _compiler_lock:
+        if _compiler is None:
+            _compiler = SignalCompiler()
+        return _compiler